@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -167,6 +168,147 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
 TESSERACT_CMD = os.getenv('TESSERACT_CMD', 'tesseract')
 
+# LLM 클라이언트 설정
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')  # openai | stub (네트워크 없는 결정적 응답, 부하 테스트/CI용)
+LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4o-mini')
+LLM_MAX_TOKENS = int(os.getenv('LLM_MAX_TOKENS', '5000'))
+LLM_RESPONSE_FORMAT = os.getenv('LLM_RESPONSE_FORMAT', 'json_schema')  # json_schema (strict 스키마 강제) | json_object
+# 문장 크기/복잡도에 따른 모델 라우팅 (언어별 기준은 prompt_loader.LANGUAGE_MODEL_ROUTES)
+LLM_ROUTING_ENABLED = os.getenv('LLM_ROUTING_ENABLED', '1') == '1'  # 0이면 모든 호출에 LLM_MODEL/LLM_MAX_TOKENS
+LLM_COMPLEX_MODEL = os.getenv('LLM_COMPLEX_MODEL') or LLM_MODEL  # 길거나 절이 많은 문장에 사용할 모델
+LLM_ESCALATION_MODEL = os.getenv('LLM_ESCALATION_MODEL', '')  # 응답 검증 실패 시 재시도할 더 비싼 모델 (기본값 비어 있음 = 사용 안 함)
+LLM_MIN_MAX_TOKENS = int(os.getenv('LLM_MIN_MAX_TOKENS', '400'))  # 짧은 문장에도 보장하는 최소 응답 토큰 (상한은 LLM_MAX_TOKENS)
+LLM_MODEL_ROUTES = json.loads(os.getenv('LLM_MODEL_ROUTES_JSON') or '{}')  # 언어별 라우팅 기준 덮어쓰기 {"english": {...}}
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))  # 초
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '60'))  # 초
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60'))  # 유휴 keep-alive 연결 유지 시간 (초)
+LLM_STUB_LATENCY = float(os.getenv('LLM_STUB_LATENCY', '0'))  # stub 공급자의 인위적 지연 (초)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# 프롬프트 파일 변경 확인 간격 (초, 수정하면 재시작 없이 반영 / 음수면 시작 시 한 번만 로드)
+PROMPT_RELOAD_INTERVAL = float(os.getenv('PROMPT_RELOAD_INTERVAL', '5'))
+
+# LLM 호출 속도 제한 (모든 워커가 Redis 토큰 버킷을 공유, Redis가 없으면 호스트 단위 파일 버킷)
+LLM_RATE_LIMIT_PER_SECOND = float(os.getenv('LLM_RATE_LIMIT_PER_SECOND', '10'))  # 0이면 제한 없음
+LLM_RATE_LIMIT_BURST = float(os.getenv('LLM_RATE_LIMIT_BURST', '20'))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv('LLM_RATE_LIMIT_MAX_WAIT', '10'))  # 토큰 대기 최대 시간 (초)
+LLM_RATE_LIMIT_STATE_DIR = os.getenv('LLM_RATE_LIMIT_STATE_DIR')  # Redis가 없을 때 파일 버킷/회로 차단기 상태 위치 (기본 임시 디렉토리)
+
+# LLM 재시도 백오프 (지수 백오프 + full jitter, 초)
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+
+# LLM 회로 차단기 (모든 워커 공유, window 초 동안 min_calls 이상 호출 중 오류율이 error_rate 이상이면 cooldown 초 동안 즉시 실패)
+LLM_BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5'))
+LLM_BREAKER_MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', '10'))
+LLM_BREAKER_WINDOW = float(os.getenv('LLM_BREAKER_WINDOW', '30'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+
+# LLM 문장 분석 마감 시간과 hedging
+LLM_CALL_DEADLINE = float(os.getenv('LLM_CALL_DEADLINE', '45'))  # 문장 하나의 재시도 포함 최대 분석 시간 (초, 0이면 제한 없음)
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', '1') == '1'
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))  # 최근 소요 시간의 이 백분위수를 넘기면 같은 요청을 한 번 더 보냄
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))  # 표본이 이보다 적으면 hedging 하지 않음
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))  # hedge 전송 최소 대기 시간 (초)
+LLM_LATENCY_WINDOW = int(os.getenv('LLM_LATENCY_WINDOW', '200'))  # 백분위수 계산에 쓰는 최근 호출 수
+
+# LLM 호출 지표 (엔드포인트/모델/언어별 소요 시간 히스토그램, 토큰, 비용)
+LLM_LATENCY_BUCKETS = [float(v) for v in os.getenv('LLM_LATENCY_BUCKETS', '0.5,1,2,3,5,8,13,21,34,60').split(',')]  # 초
+LLM_METRICS_FLUSH_INTERVAL = float(os.getenv('LLM_METRICS_FLUSH_INTERVAL', '5'))  # 워커 지표를 Redis로 합치는 간격 (초)
+# 모델별 100만 토큰당 가격 (USD, [입력, 출력]), LLM_PRICING_JSON으로 덮어쓰기 가능
+LLM_PRICING = json.loads(os.getenv('LLM_PRICING_JSON') or '{}') or {
+    'gpt-4o-mini': [0.15, 0.60],
+    'gpt-4o': [2.50, 10.00],
+    'gpt-4.1-mini': [0.40, 1.60],
+    'gpt-4.1': [2.00, 8.00],
+}
+
+# LLM 문장 분석 동시성 설정
+# 워커 프로세스 하나가 동시에 보낼 수 있는 최대 LLM 호출 수 (모든 요청이 공유)
+LLM_MAX_INFLIGHT_PER_WORKER = int(os.getenv('LLM_MAX_INFLIGHT_PER_WORKER', '8'))
+# 요청 하나가 동시에 보낼 수 있는 최대 LLM 호출 수
+LLM_MAX_CONCURRENCY_PER_REQUEST = int(os.getenv('LLM_MAX_CONCURRENCY_PER_REQUEST', '4'))
+# 프로세스당 LLM HTTP 연결 풀 크기 (동시 호출 수 이상)
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', str(LLM_MAX_INFLIGHT_PER_WORKER * 2)))
+
+# Redis (docker-compose.prod.yml의 redis 서비스)
+REDIS_URL = os.getenv('REDIS_URL')
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.5'))
+
+# 문장 분석 결과 캐시
+# 프로세스 내 LRU (1차) → Redis (2차) 순서로 조회
+ANALYSIS_CACHE_ENABLED = os.getenv('ANALYSIS_CACHE_ENABLED', '1') == '1'
+ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', str(60 * 60 * 24 * 7)))  # Redis TTL (초)
+ANALYSIS_CACHE_LOCAL_TTL = int(os.getenv('ANALYSIS_CACHE_LOCAL_TTL', '600'))  # 프로세스 내 TTL (초)
+ANALYSIS_CACHE_LOCAL_MAXSIZE = int(os.getenv('ANALYSIS_CACHE_LOCAL_MAXSIZE', '1024'))
+
+# 같은 문장의 동시 분석 합치기 (프로세스 내 singleflight + 워커 간 Redis 잠금)
+ANALYSIS_SINGLEFLIGHT_ENABLED = os.getenv('ANALYSIS_SINGLEFLIGHT_ENABLED', '1') == '1'
+ANALYSIS_SINGLEFLIGHT_LOCK_TTL = float(os.getenv('ANALYSIS_SINGLEFLIGHT_LOCK_TTL', '120'))  # 잠금 만료 (초, 재시도를 포함한 분석 시간보다 길게)
+ANALYSIS_SINGLEFLIGHT_WAIT = float(os.getenv('ANALYSIS_SINGLEFLIGHT_WAIT', '120'))  # 결과 최대 대기 시간 (초)
+ANALYSIS_SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv('ANALYSIS_SINGLEFLIGHT_POLL_INTERVAL', '0.2'))  # 캐시 폴링 간격 (초)
+
+# 분석 초안 (분석 결과를 서버에 보관, 단어장 저장 시 draft_id와 선택/수정 사항만 전송)
+ANALYSIS_DRAFT_TTL = int(os.getenv('ANALYSIS_DRAFT_TTL', '3600'))  # 초안 보관 시간 (초)
+ANALYSIS_DRAFT_LOCAL_MAXSIZE = int(os.getenv('ANALYSIS_DRAFT_LOCAL_MAXSIZE', '256'))  # Redis 미설정 시 프로세스 내 최대 초안 수
+
+# 복습 주기: 마지막 복습 후 이 일수가 지난 단어는 다시 복습 대상 (단어장 목록의 due_count)
+REVIEW_DUE_DAYS = int(os.getenv('REVIEW_DUE_DAYS', '3'))
+
+# 단어장 저장 Idempotency-Key 보관 시간 (초, 이 시간 안의 같은 키 재시도는 처음 응답을 반환)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(60 * 60 * 24)))
+
+# NDJSON 단어장 가져오기 (wordbooks/import/: 한 줄씩 검증하고 조각 단위로 저장)
+WORDBOOK_IMPORT_MAX_BYTES = int(os.getenv('WORDBOOK_IMPORT_MAX_BYTES', str(50 * 1024 * 1024)))  # 업로드 파일 최대 크기
+WORDBOOK_IMPORT_CHUNK_SIZE = int(os.getenv('WORDBOOK_IMPORT_CHUNK_SIZE', '500'))  # 한 트랜잭션에 저장할 문장 수
+WORDBOOK_IMPORT_MAX_ERRORS = int(os.getenv('WORDBOOK_IMPORT_MAX_ERRORS', '100'))  # 줄별 오류를 알려줄 최대 개수 (나머지는 개수만)
+
+# 단어장 내보내기 (wordbooks/export/: 서버 측 커서로 읽어 바로 스트리밍)
+WORDBOOK_EXPORT_CHUNK_SIZE = int(os.getenv('WORDBOOK_EXPORT_CHUNK_SIZE', '2000'))  # 커서에서 한 번에 가져올 행 수
+
+# 번역 메모리 (저장된 문장 중 대소문자/문장 부호만 다른 문장의 분석을 LLM 호출 없이 재사용)
+# 단어가 다른 문장의 분석 조정은 아직 없으므로 기본값은 꺼짐
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', '0') == '1'
+TRANSLATION_MEMORY_THRESHOLD = float(os.getenv('TRANSLATION_MEMORY_THRESHOLD', '0.6'))  # 문자 3-gram 자카드 유사도 하한 (후보 선별용)
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '50000'))  # 사용자/언어별 인덱스 최대 문장 수 (최근 문장 우선)
+TRANSLATION_MEMORY_MAX_INDEXES = int(os.getenv('TRANSLATION_MEMORY_MAX_INDEXES', '256'))  # 프로세스에 유지할 사용자/언어별 인덱스 수 (오래 쓰지 않은 것부터 버림)
+TRANSLATION_MEMORY_REFRESH_INTERVAL = float(os.getenv('TRANSLATION_MEMORY_REFRESH_INTERVAL', '30'))  # 새로 저장된 문장 반영 간격 (초)
+
+# 배치 분석 (여러 문장을 하나의 LLM 요청으로 묶음)
+ANALYSIS_BATCH_MAX_CHARS = int(os.getenv('ANALYSIS_BATCH_MAX_CHARS', '600'))  # 배치당 입력 문자 수 합계 상한
+ANALYSIS_BATCH_MAX_ITEMS = int(os.getenv('ANALYSIS_BATCH_MAX_ITEMS', '8'))  # 배치당 최대 문장 수
+ANALYSIS_BATCH_MAX_TOKENS = int(os.getenv('ANALYSIS_BATCH_MAX_TOKENS', '16000'))  # 배치 응답 max_tokens 상한
+
+# 요청 단위 분석 시간 예산 (초과하면 끝나지 않은 문장은 pending으로 표시하고 바로 응답, 0이면 제한 없음)
+ANALYSIS_REQUEST_TIME_BUDGET = float(os.getenv('ANALYSIS_REQUEST_TIME_BUDGET', '0'))
+ANALYSIS_REQUEST_TIME_BUDGET_MAX = float(os.getenv('ANALYSIS_REQUEST_TIME_BUDGET_MAX', '120'))  # 요청에서 지정할 수 있는 최대값
+
+# 비동기 분석 작업 워커 (python manage.py run_analysis_worker)
+ANALYSIS_WORKER_BATCH_SIZE = int(os.getenv('ANALYSIS_WORKER_BATCH_SIZE', '16'))  # 한 번에 가져올 항목 수
+ANALYSIS_WORKER_IDLE_SLEEP = float(os.getenv('ANALYSIS_WORKER_IDLE_SLEEP', '1.0'))  # 빈 큐 대기 시간 (초)
+ANALYSIS_JOB_ITEM_LEASE_SECONDS = int(os.getenv('ANALYSIS_JOB_ITEM_LEASE_SECONDS', '600'))  # 중단된 항목 회수 기준 (초)
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))  # 항목을 가져갈 수 있는 최대 횟수 (넘으면 회수하지 않고 failed)
+
+# 긴 텍스트 분석 (analyze/text/: 문장 분할 → 중복/무의미 문장 제거 → 분석 작업 등록)
+ANALYSIS_INGEST_MAX_CHARS = int(os.getenv('ANALYSIS_INGEST_MAX_CHARS', '50000'))  # 요청 텍스트 최대 길이
+ANALYSIS_INGEST_MAX_SENTENCES = int(os.getenv('ANALYSIS_INGEST_MAX_SENTENCES', '1000'))  # 작업 하나에 등록할 최대 문장 수
+ANALYSIS_INGEST_MIN_UNITS = int(os.getenv('ANALYSIS_INGEST_MIN_UNITS', '2'))  # 이보다 단어(중국어는 글자) 수가 적은 문장은 제외
+ANALYSIS_INGEST_MAX_SENTENCE_CHARS = int(os.getenv('ANALYSIS_INGEST_MAX_SENTENCE_CHARS', '400'))  # 더 긴 문장은 조각으로 나눔
+
+# 자막 파일 분석 (analyze/subtitles/: SRT/VTT 큐 → 문장 합치기 → 분석 작업 등록)
+SUBTITLE_MAX_BYTES = int(os.getenv('SUBTITLE_MAX_BYTES', str(5 * 1024 * 1024)))  # 업로드 파일 최대 크기
+SUBTITLE_MAX_SENTENCES = int(os.getenv('SUBTITLE_MAX_SENTENCES', '3000'))  # 작업 하나에 등록할 최대 문장 수
+SUBTITLE_MERGE_GAP_MS = int(os.getenv('SUBTITLE_MERGE_GAP_MS', '1500'))  # 큐 사이 간격이 이보다 길면 문장을 끊음 (ms)
+
+# 이미지 OCR (extract/ocr/: 워커마다 spawn 프로세스 풀에서 띠(band) 단위로 병렬 인식)
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'tesseract')  # tesseract | stub (tesseract 없는 결정적 결과, 부하 테스트/CI용)
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '3'))  # gunicorn 워커 수 (Dockerfile과 같은 값)
+OCR_PROCESSES = int(os.getenv('OCR_PROCESSES', '0'))  # 워커당 OCR 프로세스 수, 0이면 CPU 코어 수 / WEB_CONCURRENCY
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', '2000'))  # 긴 변이 이보다 크면 축소해서 인식 (px)
+OCR_BAND_HEIGHT = int(os.getenv('OCR_BAND_HEIGHT', '600'))  # 이미지를 나눠 병렬 인식할 띠의 목표 높이 (px, 축소 후 기준)
+OCR_TIMEOUT = float(os.getenv('OCR_TIMEOUT', '60'))  # 이미지 한 장 인식 제한 시간 (초)
+OCR_MAX_UPLOAD_BYTES = int(os.getenv('OCR_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))  # 업로드 이미지 최대 크기
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
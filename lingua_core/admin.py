@@ -0,0 +1,31 @@
+from django.contrib import admin
+from .models import AnalysisJob, AnalysisJobItem
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    search_fields = ["id", "user__username"]
+    list_display = [
+        "id",
+        "user",
+        "language",
+        "status",
+        "total_count",
+        "created_at",
+        "finished_at",
+        ]
+    list_filter = ["status", "language", "created_at"]
+
+
+@admin.register(AnalysisJobItem)
+class AnalysisJobItemAdmin(admin.ModelAdmin):
+    search_fields = ["sentence", "job__id"]
+    list_display = [
+        "id",
+        "job",
+        "index",
+        "status",
+        "attempts",
+        "updated_at",
+        ]
+    list_filter = ["status"]
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class LinguaCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lingua_core'
+
+    def ready(self):
+        from lingua_core.utils.prompt_loader import prompt_registry
+
+        # 프롬프트 파일이 없거나 잘못되었으면 요청을 받기 전에 서버 시작을 실패시킴
+        interval = settings.PROMPT_RELOAD_INTERVAL
+        prompt_registry.reload_interval = interval if interval >= 0 else None
+        try:
+            prompt_registry.load_all()
+        except (FileNotFoundError, ValueError) as e:
+            raise ImproperlyConfigured(f"프롬프트 로드 실패: {e}")
@@ -0,0 +1,72 @@
+import signal
+import time
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from lingua_core.utils.analysis_jobs import claim_job_items, process_job_items, reclaim_stale_items
+from lingua_core.utils.telemetry import get_telemetry, set_llm_endpoint
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "대기 중인 문장 분석 작업(AnalysisJob)을 처리하는 워커를 실행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ANALYSIS_WORKER_BATCH_SIZE,
+            help="한 번에 가져올 최대 항목 수",
+        )
+        parser.add_argument(
+            '--idle-sleep',
+            type=float,
+            default=settings.ANALYSIS_WORKER_IDLE_SLEEP,
+            help="처리할 항목이 없을 때 대기할 시간(초)",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="대기 중인 항목을 한 번만 처리하고 종료",
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        batch_size = options['batch_size']
+        idle_sleep = options['idle_sleep']
+        self.stdout.write(f"분석 워커 시작 (batch_size={batch_size})")
+        # 워커의 LLM 호출은 모두 analysis_worker 엔드포인트로 집계
+        set_llm_endpoint('analysis_worker')
+
+        while not self._stopping:
+            close_old_connections()
+            try:
+                reclaim_stale_items()
+                items = claim_job_items(batch_size)
+                if items:
+                    processed = process_job_items(items)
+                    logger.info(f"분석 항목 {processed}개 처리")
+            except Exception as e:
+                logger.exception(f"분석 워커 오류: {e}")
+                items = []
+
+            if options['once'] and not items:
+                break
+            if not items:
+                time.sleep(idle_sleep)
+
+        close_old_connections()
+        get_telemetry().flush()
+        self.stdout.write("분석 워커 종료")
+
+    def _request_stop(self, signum, frame):
+        # 현재 처리 중인 항목까지 저장하고 종료
+        logger.info(f"종료 신호 수신 ({signum})")
+        self._stopping = True
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lingua_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjobitem',
+            name='meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
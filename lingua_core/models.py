@@ -0,0 +1,70 @@
+import uuid
+
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class AnalysisJob(models.Model):
+    """
+    비동기 문장 분석 작업
+    웹 요청은 작업만 등록하고, run_analysis_worker 관리 명령이 항목을 처리한다.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name='analysis_jobs', on_delete=models.CASCADE, null=True, blank=True)
+    language = models.CharField(max_length=50)
+    options = models.JSONField(default=dict, blank=True)  # refresh, batch 등 분석 옵션
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"AnalysisJob {self.id} ({self.status})"
+
+
+class AnalysisJobItem(models.Model):
+    """
+    분석 작업의 문장 하나 (워커 큐의 단위)
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(AnalysisJob, related_name='items', on_delete=models.CASCADE)
+    index = models.IntegerField()
+    sentence = models.TextField()
+    meta = models.JSONField(default=dict, blank=True)  # 문장 부가 정보 (자막이면 start_ms, end_ms)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)  # 워커가 가져간 시각 (중단된 항목 회수용)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_analysis_job_item_index')
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='analysis_item_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id}[{self.index}] {self.sentence[:20]}"
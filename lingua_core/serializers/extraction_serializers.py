@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from lingua_core.utils.prompt_loader import get_supported_languages
+
 class ContentProcessingSerializer(serializers.Serializer):
     """
     이미지, 텍스트, 유튜브 링크 중 하나를 입력받는 Serializer
@@ -19,4 +22,67 @@ class GPTSentenceAnalyzeSerializer(serializers.Serializer):
     각 문장의 번역과 주요 단어 정보를 반환하는 Serializer
     """
     sentences = serializers.ListField(child=serializers.CharField()) 
-    language = serializers.CharField(required=False, default='english')
\ No newline at end of file
+    language = serializers.CharField(required=False, default='english')
+    max_concurrency = serializers.IntegerField(required=False, min_value=1)
+    refresh = serializers.BooleanField(required=False, default=False, help_text="True면 캐시를 무시하고 새로 분석")
+    batch = serializers.BooleanField(required=False, default=False, help_text="True면 여러 문장을 묶어서 한 번에 분석")
+    use_known_words = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="True면 사용자가 이미 학습한 단어의 저장된 의미를 재사용 (로그인 필요, batch와 함께 사용 불가)",
+    )
+    time_budget = serializers.FloatField(
+        required=False,
+        min_value=1,
+        help_text="요청 전체 분석 시간 예산(초), 넘기면 끝나지 않은 문장은 pending으로 반환 (sync 모드)",
+    )
+    mode = serializers.ChoiceField(
+        choices=['sync', 'job'],
+        required=False,
+        default='sync',
+        help_text="sync: 분석 결과를 바로 반환, job: 작업 ID를 즉시 반환하고 워커에서 분석",
+    )
+
+    def validate_max_concurrency(self, value):
+        # 요청에서 지정한 동시성은 서버 설정값을 넘을 수 없음
+        return min(value, settings.LLM_MAX_CONCURRENCY_PER_REQUEST)
+
+    def validate_time_budget(self, value):
+        return min(value, settings.ANALYSIS_REQUEST_TIME_BUDGET_MAX)
+
+    def validate(self, data):
+        # 학습 단어 힌트는 문장별 프롬프트에만 넣을 수 있음
+        if data.get('use_known_words') and data.get('batch'):
+            raise serializers.ValidationError("use_known_words와 batch는 함께 사용할 수 없습니다.")
+        return data
+
+class TextIngestSerializer(serializers.Serializer):
+    """
+    긴 텍스트(기사 등)를 문장으로 나눠 분석 작업으로 등록하는 Serializer
+    """
+    text = serializers.CharField(max_length=settings.ANALYSIS_INGEST_MAX_CHARS)
+    language = serializers.CharField(required=False, default='english')
+    refresh = serializers.BooleanField(required=False, default=False, help_text="True면 캐시를 무시하고 새로 분석")
+    batch = serializers.BooleanField(required=False, default=True, help_text="True면 여러 문장을 묶어서 한 번에 분석")
+
+    def validate_language(self, value):
+        # 언어별 문장 분할기를 고르므로 지원하는 언어만 허용
+        if value not in get_supported_languages():
+            raise serializers.ValidationError(f"지원하지 않는 언어입니다. 지원 언어: {get_supported_languages()}")
+        return value
+
+class SubtitleIngestSerializer(TextIngestSerializer):
+    """
+    SRT/VTT 자막 파일을 문장으로 합쳐 분석 작업으로 등록하는 Serializer
+    """
+    SUBTITLE_EXTENSIONS = ('.srt', '.vtt')
+
+    text = None
+    file = serializers.FileField()
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(self.SUBTITLE_EXTENSIONS):
+            raise serializers.ValidationError("SRT(.srt) 또는 VTT(.vtt) 자막 파일만 업로드할 수 있습니다.")
+        if value.size > settings.SUBTITLE_MAX_BYTES:
+            raise serializers.ValidationError(f"자막 파일은 {settings.SUBTITLE_MAX_BYTES // (1024 * 1024)}MB 이하만 업로드할 수 있습니다.")
+        return value
\ No newline at end of file
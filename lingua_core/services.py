@@ -1,138 +1,288 @@
-# import re
+import re
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
 
-# from functools import lru_cache
+from django.conf import settings
 
-# from django.conf import settings
-# from PIL import Image
-# import pytesseract
-# import spacy
+from lingua_core.utils.analysis_cache import normalize_sentence
+from lingua_core.utils.model_router import estimate_complexity
+from lingua_core.utils.ocr import run_ocr
+from lingua_core.utils.subtitles import Cue, CueParser, iter_lines
+
+logger = logging.getLogger(__name__)
 
-# pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
+# 빈 줄로 구분된 문단 (줄바꿈 하나는 같은 문단으로 봄)
+PARAGRAPH_PATTERN = re.compile(r'(?:[^\n]|\n(?![ \t]*\n))+')
+# punkt를 쓸 수 없을 때의 규칙 기반 분할 (문장 부호 + 닫는 따옴표/괄호까지 한 문장)
+SENTENCE_PATTERN = re.compile(r'.+?(?:[.!?…]+["\'”’)\]]*(?=\s|$)|$)', re.S)
+CJK_SENTENCE_PATTERN = re.compile(r'.+?(?:[。！？!?…]+["\'”’」』）)]*|$)', re.S)
+# 문장 부호로 끝나는지 (자막 큐 합치기)
+SENTENCE_END_PATTERN = re.compile(r'[.!?…。！？]["\'”’」』)）\]]*$')
+URL_PATTERN = re.compile(r'^(?:https?://|www\.)\S+$')
+LETTER_PATTERN = re.compile(r'[^\W\d_]')
+# 띄어쓰기가 없어서 punkt를 쓸 수 없는 언어
+CJK_LANGUAGES = {'chinese'}
+
+# import spacy
 
 
 # @lru_cache(maxsize=1)
 # def _load_spacy_model():
 #     return spacy.load(settings.SPACY_MODEL)
 
-# def split_sentences(text: str) -> list[str]:
-#     doc = _load_spacy_model()(text)
-#     sentences = [sent.text.strip() for sent in doc.sents]
-#     return sentences
-
-# def extract_sentences_from_image(image_file) -> list[str]:
-#     image = Image.open(image_file)
-#     # 한국어, 영어, 중국어 간체, 중국어 번체 지원
-#     text = pytesseract.image_to_string(image, lang='kor+eng+chi_sim+chi_tra')
-#     return split_sentences(text)
-
-
-
-# def extract_sentences_with_boxes(image_file) -> list[dict]:
-#     """
-#     이미지에서 문장과 각 문장의 박스 위치를 추출합니다.
-#     """
-#     image = Image.open(image_file)
-#     data = pytesseract.image_to_data(image, lang='kor+eng', output_type=pytesseract.Output.DICT)
-    
-#     # 줄(line) 단위로 텍스트와 박스 정보를 수집
-#     lines = {}
-#     for i in range(len(data['text'])):
-#         level = data['level'][i]
-#         if level == 4:  # 4는 줄(line) 레벨
-#             line_num = data['line_num'][i]
-#             if line_num not in lines:
-#                 lines[line_num] = {
-#                     'text': '',
-#                     'left': float('inf'),
-#                     'top': float('inf'),
-#                     'right': 0,
-#                     'bottom': 0
-#                 }
-#         elif level == 5:  # 5는 단어 레벨
-#             word = data['text'][i].strip()
-#             if word:
-#                 line_num = data['line_num'][i]
-#                 if line_num in lines:
-#                     # 텍스트 추가
-#                     if lines[line_num]['text']:
-#                         lines[line_num]['text'] += ' ' + word
-#                     else:
-#                         lines[line_num]['text'] = word
-                    
-#                     # 박스 위치 업데이트 (단어들의 박스를 합침)
-#                     left = data['left'][i]
-#                     top = data['top'][i]
-#                     width = data['width'][i]
-#                     height = data['height'][i]
-                    
-#                     lines[line_num]['left'] = min(lines[line_num]['left'], left)
-#                     lines[line_num]['top'] = min(lines[line_num]['top'], top)
-#                     lines[line_num]['right'] = max(lines[line_num]['right'], left + width)
-#                     lines[line_num]['bottom'] = max(lines[line_num]['bottom'], top + height)
-    
-#     # 줄들을 문장으로 변환
-#     results = []
-#     for line_num in sorted(lines.keys()):
-#         line_data = lines[line_num]
-#         line_text = line_data['text'].strip()
-        
-#         if line_text:
-#             # 한 줄을 여러 문장으로 분할할 수 있음
-#             sentences = re.split(r'(?<=[,.!?])\s+', line_text)
-            
-#             if len(sentences) == 1:
-#                 # 한 줄에 한 문장만 있는 경우
-#                 results.append({
-#                     "text": sentences[0].strip(),
-#                     "box": {
-#                         "left": int(line_data['left']) if line_data['left'] != float('inf') else 0,
-#                         "top": int(line_data['top']) if line_data['top'] != float('inf') else 0,
-#                         "width": int(line_data['right'] - line_data['left']) if line_data['left'] != float('inf') else 0,
-#                         "height": int(line_data['bottom'] - line_data['top']) if line_data['top'] != float('inf') else 0
-#                     }
-#                 })
-#             else:
-#                 # 한 줄에 여러 문장이 있는 경우, 전체 줄의 박스를 공유
-#                 for sentence in sentences:
-#                     sentence = sentence.strip()
-#                     if sentence:
-#                         results.append({
-#                             "text": sentence,
-#                             "box": {
-#                                 "left": int(line_data['left']) if line_data['left'] != float('inf') else 0,
-#                                 "top": int(line_data['top']) if line_data['top'] != float('inf') else 0,
-#                                 "width": int(line_data['right'] - line_data['left']) if line_data['left'] != float('inf') else 0,
-#                                 "height": int(line_data['bottom'] - line_data['top']) if line_data['top'] != float('inf') else 0
-#                             }
-#                         })
-    
-#     return results
-
-# def extract_words_from_image(image_file) -> list[str]:
-#     image = Image.open(image_file)
-#     # 한국어, 영어, 중국어 간체, 중국어 번체 지원
-#     text = pytesseract.image_to_string(image, lang='kor+eng+chi_sim+chi_tra')
-#     words = text.strip().split()
-#     return words
-
-
-# def extract_words_with_boxes(image_file) -> list[dict]:
-#     image = Image.open(image_file)
-#     # 한국어, 영어, 중국어 간체, 중국어 번체 지원
-#     data = pytesseract.image_to_data(image, lang='kor+eng+chi_sim+chi_tra', output_type=pytesseract.Output.DICT)
-
-#     results = []
-#     for i in range(len(data['text'])):
-#         word = data['text'][i].strip()
-#         if word:  # 빈 문자열 제외
-#             results.append({
-#                 "text": word,
-#                 "box": {
-#                     "left": data['left'][i],
-#                     "top": data['top'][i],
-#                     "width": data['width'][i],
-#                     "height": data['height'][i]
-#                 }
-#             })
-    
-#     return results
+
+@lru_cache(maxsize=None)
+def _load_punkt(language: str):
+    """언어별 punkt 문장 분할기 (프로세스당 한 번 로드, 데이터가 없으면 None → 규칙 기반 분할)"""
+    try:
+        from nltk.tokenize import PunktTokenizer
+
+        return PunktTokenizer(language)
+    except (ImportError, LookupError, ValueError, OSError) as e:
+        logger.warning(f"punkt 문장 분할기를 사용할 수 없어 규칙 기반으로 분할합니다 ({language}): {e}")
+        return None
+
+
+def get_splitter_name(language: str) -> str:
+    if language in CJK_LANGUAGES or _load_punkt(language) is None:
+        return 'regex'
+    return 'punkt'
+
+
+def split_sentences(text: str, language: str = 'english') -> Iterator[str]:
+    """
+    텍스트를 문장 단위로 나눠 순서대로 반환 (제너레이터)
+    문단별로 처리하므로 긴 텍스트도 전체 문장 리스트를 한 번에 만들지 않는다.
+    """
+    tokenizer = None if language in CJK_LANGUAGES else _load_punkt(language)
+    pattern = CJK_SENTENCE_PATTERN if language in CJK_LANGUAGES else SENTENCE_PATTERN
+
+    for match in PARAGRAPH_PATTERN.finditer(text):
+        # 문단 안의 줄바꿈/연속 공백은 공백 하나로 (중국어는 줄바꿈을 그냥 이어 붙임)
+        joiner = '' if language in CJK_LANGUAGES else ' '
+        paragraph = joiner.join(match.group().split())
+        if not paragraph:
+            continue
+        if tokenizer is not None:
+            sentences = tokenizer.tokenize(paragraph)
+        else:
+            sentences = (m.group() for m in pattern.finditer(paragraph))
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if sentence:
+                yield sentence
+
+
+def _chunk_long_sentence(sentence: str, max_chars: int, language: str) -> Iterator[str]:
+    """문장 부호 없이 너무 긴 문장을 max_chars 이하 조각으로 나눔 (단어 중간에서 자르지 않음)"""
+    if language in CJK_LANGUAGES:
+        for start in range(0, len(sentence), max_chars):
+            yield sentence[start:start + max_chars]
+        return
+    chunk = []
+    size = 0
+    for word in sentence.split():
+        if chunk and size + len(word) + 1 > max_chars:
+            yield ' '.join(chunk)
+            chunk, size = [], 0
+        chunk.append(word)
+        size += len(word) + 1
+    if chunk:
+        yield ' '.join(chunk)
+
+
+class SentenceFilter:
+    """
+    분석할 문장 고르기
+    - 너무 긴 문장은 ANALYSIS_INGEST_MAX_SENTENCE_CHARS 이하 조각으로 나눔
+    - 중복 문장(정규화 후 대소문자 무시)과 의미 없는 문장(단어 수 부족, 숫자/기호/URL만 있는 문장) 제외
+    - max_sentences를 넘으면 full이 되고 stats['truncated']
+    """
+
+    def __init__(self, language: str, max_sentences: int, stats: dict):
+        self.language = language
+        self.unit = 'char' if language in CJK_LANGUAGES else 'word'
+        self.max_sentences = max_sentences
+        self.stats = stats
+        self.stats.update({'split': 0, 'chunked': 0, 'duplicates': 0, 'trivial': 0, 'kept': 0, 'truncated': False})
+        self._seen = set()
+
+    @property
+    def full(self) -> bool:
+        return self.stats['truncated']
+
+    def add(self, sentence: str) -> List[str]:
+        """받아들인 문장(또는 조각) 목록 반환 (모두 제외되면 빈 리스트)"""
+        self.stats['split'] += 1
+        pieces = [sentence]
+        if len(sentence) > settings.ANALYSIS_INGEST_MAX_SENTENCE_CHARS:
+            pieces = list(_chunk_long_sentence(sentence, settings.ANALYSIS_INGEST_MAX_SENTENCE_CHARS, self.language))
+            self.stats['chunked'] += 1
+
+        accepted = []
+        for piece in pieces:
+            units, _ = estimate_complexity(piece, self.unit)
+            if units < settings.ANALYSIS_INGEST_MIN_UNITS or not LETTER_PATTERN.search(piece) or URL_PATTERN.match(piece):
+                self.stats['trivial'] += 1
+                continue
+
+            key = normalize_sentence(piece).casefold()
+            if key in self._seen:
+                self.stats['duplicates'] += 1
+                continue
+
+            if self.stats['kept'] >= self.max_sentences:
+                self.stats['truncated'] = True
+                break
+            self._seen.add(key)
+            self.stats['kept'] += 1
+            accepted.append(piece)
+        return accepted
+
+
+@dataclass
+class IngestResult:
+    """긴 텍스트/자막에서 분석할 문장을 고른 결과 (metas는 문장별 부가 정보, 자막이면 시각)"""
+    sentences: List[str] = field(default_factory=list)
+    stats: dict = field(default_factory=dict)
+    metas: List[dict] = field(default_factory=list)
+
+
+def prepare_sentences(text: str, language: str = 'english') -> IngestResult:
+    """
+    긴 텍스트(기사 등)를 분석할 문장 목록으로 변환
+    문장 분할 후 SentenceFilter로 긴 문장 조각내기/중복·무의미 문장 제외, 최대 ANALYSIS_INGEST_MAX_SENTENCES 문장
+    """
+    result = IngestResult(stats={'characters': len(text), 'splitter': get_splitter_name(language)})
+    sentence_filter = SentenceFilter(language, settings.ANALYSIS_INGEST_MAX_SENTENCES, result.stats)
+
+    for sentence in split_sentences(text, language):
+        result.sentences.extend(sentence_filter.add(sentence))
+        if sentence_filter.full:
+            break
+    return result
+
+
+def merge_cues(cues: Iterable[Cue], language: str = 'english') -> Iterator[Tuple[str, int, int]]:
+    """
+    자막 큐 조각을 문장 단위로 합침 (제너레이터)
+    문장이 끝나지 않은 큐는 다음 큐와 이어 붙이고, 큐 사이 간격이 SUBTITLE_MERGE_GAP_MS보다 길면 끊는다.
+
+    Returns:
+        (문장, 시작 ms, 끝 ms): 시각은 문장이 걸친 첫 큐의 시작과 마지막 큐의 끝
+    """
+    joiner = '' if language in CJK_LANGUAGES else ' '
+    buffer = ''
+    start_ms = end_ms = 0
+
+    for cue in cues:
+        if buffer and (
+            cue.start_ms - end_ms > settings.SUBTITLE_MERGE_GAP_MS
+            or len(buffer) + len(cue.text) > settings.ANALYSIS_INGEST_MAX_SENTENCE_CHARS
+        ):
+            yield buffer, start_ms, end_ms
+            buffer = ''
+
+        if buffer:
+            buffer = buffer + joiner + cue.text
+        else:
+            buffer, start_ms = cue.text, cue.start_ms
+        end_ms = cue.end_ms
+
+        sentences = list(split_sentences(buffer, language))
+        # 완성된 문장만 내보내고, 끝나지 않은 마지막 문장은 다음 큐와 합침
+        buffer = sentences.pop() if sentences and not SENTENCE_END_PATTERN.search(sentences[-1]) else ''
+        for sentence in sentences:
+            yield sentence, start_ms, end_ms
+            # 첫 문장 이후는 이 큐에서 시작한 문장
+            start_ms = cue.start_ms
+
+    if buffer:
+        yield buffer, start_ms, end_ms
+
+
+def prepare_subtitle_sentences(chunks: Iterable[bytes], language: str = 'english') -> IngestResult:
+    """
+    SRT/VTT 자막 파일(바이트 조각)을 분석할 문장 목록으로 변환
+    파일을 한 줄씩 읽어 큐 → 문장으로 합치고 SentenceFilter를 거친다. 문장별 시각은 metas ({start_ms, end_ms})
+    """
+    result = IngestResult(stats={'splitter': get_splitter_name(language)})
+    parser = CueParser(joiner='' if language in CJK_LANGUAGES else ' ')
+    sentence_filter = SentenceFilter(language, settings.SUBTITLE_MAX_SENTENCES, result.stats)
+
+    for sentence, start_ms, end_ms in merge_cues(parser.parse(iter_lines(chunks)), language):
+        for piece in sentence_filter.add(sentence):
+            result.sentences.append(piece)
+            result.metas.append({'start_ms': start_ms, 'end_ms': end_ms})
+        if sentence_filter.full:
+            break
+
+    result.stats['cues'] = parser.cues
+    result.stats['repeated_lines'] = parser.repeated_lines
+    return result
+
+
+def _union_box(boxes: List[dict]) -> dict:
+    left = min(box['left'] for box in boxes)
+    top = min(box['top'] for box in boxes)
+    right = max(box['left'] + box['width'] for box in boxes)
+    bottom = max(box['top'] + box['height'] for box in boxes)
+    return {'left': left, 'top': top, 'width': right - left, 'height': bottom - top}
+
+
+def lines_to_words(lines: List[dict]) -> List[dict]:
+    """OCR 줄 목록을 단어 목록 [{text, box}]으로"""
+    return [word for line in lines for word in line['words']]
+
+
+def lines_to_sentences(lines: List[dict], language: str = 'english') -> List[dict]:
+    """
+    OCR 줄 목록을 문장 목록 [{text, box}]으로
+    같은 문단의 줄을 이어 붙여 문장으로 나누고, 문장 박스는 문장에 포함된 단어 박스를 합친 영역
+    (줄 단위로 자르지 않으므로 여러 줄에 걸친 문장도 한 문장이 된다)
+    """
+    joiner = '' if language in CJK_LANGUAGES else ' '
+    paragraphs = []
+    for line in lines:
+        if not paragraphs or paragraphs[-1][0] != line['paragraph']:
+            paragraphs.append((line['paragraph'], []))
+        paragraphs[-1][1].extend(line['words'])
+
+    results = []
+    for _, words in paragraphs:
+        text = ''
+        spans = []
+        for word in words:
+            if text:
+                text += joiner
+            spans.append((len(text), len(text) + len(word['text']), word['box']))
+            text += word['text']
+
+        cursor = 0
+        for sentence in split_sentences(text, language):
+            start = text.find(sentence, cursor)
+            start = cursor if start < 0 else start
+            end = cursor = start + len(sentence)
+            boxes = [box for word_start, word_end, box in spans if word_start < end and word_end > start]
+            if boxes:
+                results.append({'text': sentence, 'box': _union_box(boxes)})
+    return results
+
+
+def extract_sentences_with_boxes(image_file, language: str = 'english') -> List[dict]:
+    """
+    이미지에서 문장과 각 문장의 박스 위치를 추출합니다.
+    (동기 코드용, 요청 처리에서는 utils.ocr.aiter_ocr로 이벤트 루프를 막지 않고 처리)
+    """
+    return lines_to_sentences(run_ocr(image_file.read(), language)['lines'], language)
+
+
+def extract_sentences_from_image(image_file, language: str = 'english') -> List[str]:
+    return [sentence['text'] for sentence in extract_sentences_with_boxes(image_file, language)]
+
+
+def extract_words_with_boxes(image_file, language: str = 'english') -> List[dict]:
+    """이미지에서 단어와 각 단어의 박스 위치를 추출합니다. (동기 코드용)"""
+    return lines_to_words(run_ocr(image_file.read(), language)['lines'])
@@ -0,0 +1,435 @@
+import json
+import time
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from lingua_core.models import AnalysisJob, AnalysisJobItem
+from lingua_core import views
+from lingua_core.utils import analysis_cache, circuit_breaker, llm_client, ocr, rate_limiter, telemetry
+from lingua_core.utils import translation_memory
+from lingua_core.utils.analysis_cache import (
+    cached_call_gpt_for_sentence,
+    get_cached_analysis,
+    get_cache_stats,
+    store_analysis,
+)
+from lingua_core.utils.analysis_jobs import claim_job_items, create_analysis_job, reclaim_stale_items
+from lingua_core.utils.analysis_runner import run_analyses
+from lingua_core.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from lingua_core.utils.known_words import KnownWordHints, candidate_words
+from lingua_core.utils.llm_client import StubProvider
+from lingua_management.models import Sentence, SentenceWord, Word, Wordbook
+
+
+class StubLLMMixin:
+    """
+    네트워크 없이 stub 공급자로 분석 (속도 제한/hedging은 끄고, 회로 차단기 상태는 테스트마다 새 디렉토리)
+    LLM 클라이언트/캐시 싱글톤은 테스트마다 새로 만들어 설정 변경이 반영되도록 함
+    """
+    stub_latency = 0
+
+    def setUp(self):
+        super().setUp()
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        overrides = override_settings(
+            LLM_PROVIDER='stub',
+            LLM_STUB_LATENCY=self.stub_latency,
+            LLM_RATE_LIMIT_PER_SECOND=0,
+            LLM_RATE_LIMIT_STATE_DIR=state_dir.name,
+            LLM_HEDGE_ENABLED=False,
+            REDIS_URL=None,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for module, name in [
+            (llm_client, '_client'),
+            (rate_limiter, '_limiter'),
+            (circuit_breaker, '_breaker'),
+            (analysis_cache, '_cache'),
+        ]:
+            patcher = mock.patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class AnalysisRunnerTests(SimpleTestCase):
+    def test_results_keep_input_order_and_report_failures(self):
+        """완료 순서와 관계없이 입력 순서로 정리되고, 실패한 문장은 failed에 index와 함께 남음"""
+        delays = {'first': 0.05, 'second': 0.0, 'broken': 0.0, 'empty': 0.02, 'last': 0.0}
+
+        def analyze(sentence, language):
+            time.sleep(delays[sentence])
+            if sentence == 'broken':
+                raise RuntimeError('boom')
+            if sentence == 'empty':
+                return None
+            return {'text': sentence}
+
+        outcome = run_analyses(list(delays), analyze=analyze, max_concurrency=5)
+
+        self.assertEqual([result['text'] for result in outcome.selected], ['first', 'second', 'last'])
+        self.assertEqual([item['index'] for item in outcome.failed], [2, 3])
+        self.assertEqual(outcome.failed[0]['error'], 'boom')
+        self.assertEqual(outcome.failed[1]['error'], 'GPT 응답 실패')
+        self.assertEqual(outcome.pending, [])
+
+    def test_duplicate_sentences_are_analyzed_once(self):
+        calls = []
+
+        def analyze(sentence, language):
+            calls.append(sentence)
+            return {'text': sentence}
+
+        outcome = run_analyses(['a b', ' a  b ', 'c'], analyze=analyze)
+
+        self.assertEqual(sorted(calls), ['a b', 'c'])
+        self.assertEqual(len(outcome.selected), 3)
+
+    def test_selected_results_carry_their_input_index(self):
+        """초안에서 문장을 고를 때 쓰는 index는 실패한 문장을 건너뛰어도 입력 위치 그대로"""
+        outcome = run_analyses(
+            ['first', 'broken', 'last'],
+            analyze=lambda sentence, language: None if sentence == 'broken' else {'text': sentence},
+        )
+
+        self.assertEqual(outcome.selected, [{'text': 'first', 'index': 0}, {'text': 'last', 'index': 2}])
+        self.assertEqual([item['index'] for item in outcome.failed], [1])
+
+    def test_batch_mode_rejects_analyze(self):
+        """batch 모드는 묶음 프롬프트로만 분석하므로 문장별 analyze와 함께 쓸 수 없음"""
+        with self.assertRaises(ValueError):
+            run_analyses(['a'], analyze=lambda sentence, language: {}, batch=True)
+
+
+@override_settings(ANALYSIS_CACHE_ENABLED=False)
+class AnalysisSpeedupTests(StubLLMMixin, SimpleTestCase):
+    stub_latency = 0.1
+
+    def analyze_all(self, sentences, max_concurrency):
+        started = time.monotonic()
+        outcome = run_analyses(
+            sentences,
+            analyze=lambda sentence, language: cached_call_gpt_for_sentence(sentence, language),
+            max_concurrency=max_concurrency,
+        )
+        return outcome, time.monotonic() - started
+
+    def test_concurrent_analysis_is_faster_with_stub_llm(self):
+        """stub 공급자의 지연(0.1초) 기준으로 동시 실행이 순차 실행보다 빠르고 결과는 같음"""
+        sentences = [f"Sentence number {i}." for i in range(8)]
+
+        sequential, sequential_elapsed = self.analyze_all(sentences, max_concurrency=1)
+        concurrent, concurrent_elapsed = self.analyze_all(sentences, max_concurrency=8)
+
+        self.assertEqual(concurrent.selected, sequential.selected)
+        self.assertEqual([result['text'] for result in concurrent.selected], sentences)
+        self.assertGreaterEqual(sequential_elapsed, 0.8)
+        self.assertLess(concurrent_elapsed, sequential_elapsed / 3)
+
+
+@override_settings(REDIS_URL=None, ANALYSIS_CACHE_ENABLED=True)
+class AnalysisCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(analysis_cache, '_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def analyze(self, sentence, language):
+        self.calls.append(sentence)
+        return {'text': sentence, 'meaning': 'm', 'words': []}
+
+    def test_second_call_is_served_from_cache(self):
+        first = cached_call_gpt_for_sentence('Hello there.', 'english', analyze=self.analyze)
+        second = cached_call_gpt_for_sentence('  Hello   there. ', 'english', analyze=self.analyze)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ['Hello there.'])
+        stats = get_cache_stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+
+    def test_refresh_bypasses_cache_and_updates_it(self):
+        cached_call_gpt_for_sentence('Hello there.', 'english', analyze=self.analyze)
+        cached_call_gpt_for_sentence('Hello there.', 'english', refresh=True, analyze=self.analyze)
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(get_cache_stats()['bypasses'], 1)
+
+    def test_languages_are_cached_separately(self):
+        cached_call_gpt_for_sentence('Hola.', 'english', analyze=self.analyze)
+        cached_call_gpt_for_sentence('Hola.', 'spanish', analyze=self.analyze)
+
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failed_result_is_not_cached(self):
+        cached_call_gpt_for_sentence('Hello there.', 'english', analyze=lambda sentence, language: None)
+
+        self.assertIsNone(get_cached_analysis('Hello there.', 'english'))
+
+    def test_batch_results_are_keyed_by_batch_prompt(self):
+        store_analysis('Hello there.', 'english', {'text': 'batch'}, variant='batch')
+
+        self.assertIsNone(get_cached_analysis('Hello there.', 'english'))
+        self.assertEqual(get_cached_analysis('Hello there.', 'english', variant='batch'), {'text': 'batch'})
+
+
+@override_settings(ANALYSIS_JOB_MAX_ATTEMPTS=2, ANALYSIS_JOB_ITEM_LEASE_SECONDS=60)
+class AnalysisJobReclaimTests(TestCase):
+    def abandon(self, job):
+        """워커가 항목을 가져간 뒤 중단된 상태로 만듦"""
+        claim_job_items(limit=10)
+        job.items.update(locked_at=timezone.now() - timedelta(seconds=120))
+
+    def test_stale_items_are_retried_until_max_attempts(self):
+        job = create_analysis_job(['Poison sentence.'], 'english')
+
+        self.abandon(job)
+        self.assertEqual(reclaim_stale_items(), 1)
+        self.assertEqual(job.items.get().status, AnalysisJobItem.STATUS_PENDING)
+
+        self.abandon(job)
+        reclaim_stale_items()
+
+        item = job.items.get()
+        self.assertEqual((item.status, item.attempts), (AnalysisJobItem.STATUS_FAILED, 2))
+        self.assertTrue(item.error)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_COMPLETED)
+
+    def test_job_with_other_pending_items_stays_open(self):
+        job = create_analysis_job(['Poison sentence.', 'Fine sentence.'], 'english')
+        self.abandon(job)
+        job.items.filter(index=0).update(attempts=2)
+
+        reclaim_stale_items()
+
+        statuses = dict(job.items.values_list('index', 'status'))
+        self.assertEqual(statuses, {0: AnalysisJobItem.STATUS_FAILED, 1: AnalysisJobItem.STATUS_PENDING})
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_RUNNING)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        overrides = override_settings(LLM_RATE_LIMIT_STATE_DIR=state_dir.name, REDIS_URL=None)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def make_breaker(self):
+        return CircuitBreaker('test', error_rate=0.5, min_calls=4, window=30, cooldown=0.2)
+
+    def trip(self, breaker):
+        for ok in (True, True, False, False):
+            breaker.before_call()
+            breaker.record_success() if ok else breaker.record_failure()
+
+    def test_state_is_shared_between_workers(self):
+        """한 워커에서 열린 회로를 다른 워커(인스턴스)도 보고, 시험 호출은 하나만 허용"""
+        worker_a, worker_b = self.make_breaker(), self.make_breaker()
+        self.trip(worker_a)
+
+        self.assertEqual(worker_b.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            worker_b.before_call()
+
+        time.sleep(0.25)
+        worker_b.before_call()
+        with self.assertRaises(CircuitOpenError):
+            worker_a.before_call()
+        worker_b.record_success()
+
+        self.assertEqual(worker_a.state, CircuitBreaker.CLOSED)
+        worker_a.before_call()
+
+    def test_falls_back_to_file_state_when_redis_fails(self):
+        broken = mock.Mock()
+        broken.register_script.return_value = mock.Mock(side_effect=ConnectionError('redis down'))
+        breaker = self.make_breaker()
+
+        with mock.patch.object(circuit_breaker, 'get_redis', return_value=broken):
+            self.trip(breaker)
+
+        self.assertEqual(self.make_breaker().state, CircuitBreaker.OPEN)
+
+    def test_stub_provider_only_counts_timeouts_as_transient(self):
+        self.assertTrue(StubProvider.is_transient(TimeoutError()))
+        self.assertTrue(StubProvider.is_transient(ConnectionError()))
+        self.assertFalse(StubProvider.is_transient(ValueError()))
+
+
+class LLMClientBreakerTests(StubLLMMixin, SimpleTestCase):
+    @override_settings(LLM_BREAKER_MIN_CALLS=1)
+    def test_only_transient_errors_open_the_circuit(self):
+        client = llm_client.get_llm_client()
+        with mock.patch.object(client.provider, 'complete', side_effect=ValueError('bad request')):
+            for _ in range(3):
+                with self.assertRaises(ValueError):
+                    client.complete('prompt')
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+        with mock.patch.object(client.provider, 'complete', side_effect=TimeoutError('slow')):
+            with self.assertRaises(TimeoutError):
+                client.complete('prompt')
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+
+class KnownWordHintsTests(StubLLMMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='learner', password='pw')
+        wordbook = Wordbook.objects.create(user=self.user, name='book', language='english', input_type='text')
+        sentence = Sentence.objects.create(user=self.user, wordbook=wordbook, text='I gave up apples.')
+        for text, meaning in [('apples', '내 사과'), ('give up', '포기하다'), ('look forward to', '고대하다')]:
+            word = Word.objects.create(user=self.user, text=text)
+            SentenceWord.objects.create(word=word, sentence=sentence, meaning=meaning)
+
+    def test_candidates_include_phrases_up_to_the_given_length(self):
+        candidates = candidate_words('I look forward to it.', max_phrase_words=3)
+
+        self.assertIn('look forward to', candidates)
+        self.assertNotIn('i look forward to', candidates)
+        self.assertNotIn('look forward', candidate_words('I look forward to it.'))
+
+    def test_for_user_finds_multi_word_entries(self):
+        hints = KnownWordHints.for_user(self.user, 'english', ['Never give up.', 'I look forward to apples.'])
+
+        self.assertEqual(set(hints.senses), {'apples', 'give up', 'look forward to'})
+        self.assertEqual(set(hints.select('Never give up.')), {'give up'})
+
+    def test_hinted_analysis_skips_shared_cache(self):
+        """학습 단어가 있는 문장은 공유 캐시를 읽지도 쓰지도 않음 (다른 사용자에게 의미가 새지 않음)"""
+        generic = cached_call_gpt_for_sentence('I like apples.', 'english')
+        hints = KnownWordHints.for_user(self.user, 'english', ['I like apples.'])
+
+        hinted = cached_call_gpt_for_sentence('I like apples.', 'english', hints=hints)
+
+        meanings = {word['text']: word['meaning'] for word in hinted['words']}
+        self.assertEqual(meanings['apples'], '내 사과')
+        summary = hints.summary()
+        self.assertEqual(summary['merged_words'], 1)
+        self.assertIn('estimated_tokens_saved', summary)
+        self.assertEqual(get_cached_analysis('I like apples.', 'english'), generic)
+        self.assertEqual(cached_call_gpt_for_sentence('I like apples.', 'english'), generic)
+
+    def test_sentences_without_known_words_use_shared_cache(self):
+        generic = cached_call_gpt_for_sentence('I like pears.', 'english')
+        hints = KnownWordHints({'apples': {'meaning': '내 사과', 'pos': 'noun', 'others': None}})
+
+        with mock.patch.object(hints, 'analyze') as analyze:
+            self.assertEqual(cached_call_gpt_for_sentence('I like pears.', 'english', hints=hints), generic)
+        analyze.assert_not_called()
+
+
+class HedgedCompleteTests(StubLLMMixin, SimpleTestCase):
+    @override_settings(LLM_RATE_LIMIT_MAX_WAIT=30)
+    def test_rate_limit_wait_is_bounded_by_the_deadline(self):
+        client = llm_client.get_llm_client()
+
+        with mock.patch.object(client.rate_limiter, 'acquire', return_value=False) as acquire:
+            with self.assertRaises(llm_client.LLMUnavailableError):
+                client.complete_hedged('prompt', deadline=time.monotonic() + 0.5)
+
+        self.assertLessEqual(acquire.call_args.kwargs['timeout'], 0.5)
+
+
+class TelemetryFlushTests(SimpleTestCase):
+    def test_idle_worker_publishes_pending_counters(self):
+        """기록 후 더 이상 호출이 없어도 flush_interval 안에 Redis로 증가분을 보냄"""
+        client = mock.Mock()
+        metrics = telemetry.LLMTelemetry(buckets=[0.5, 1, 5], flush_interval=0.05)
+
+        with mock.patch.object(telemetry, 'get_redis', return_value=client), mock.patch('atexit.register') as at_exit:
+            metrics.record_call('sentence', 'gpt-4o-mini', 'english', latency=0.2, attempts=1)
+            time.sleep(0.2)
+
+        pipe = client.pipeline.return_value
+        pipe.execute.assert_called()
+        fields = {call.args[1] for call in pipe.hincrbyfloat.call_args_list}
+        self.assertIn('unknown|sentence|gpt-4o-mini|english#calls', fields)
+        at_exit.assert_called_once_with(metrics.flush)
+        self.assertFalse(metrics._pending)
+
+
+class OcrEngineErrorTests(SimpleTestCase):
+    class BrokenEngine:
+        def __init__(self, cmd=None):
+            pass
+
+        def recognize(self, image, lang):
+            raise RuntimeError('tesseract exited with status 1')
+
+    def test_engine_exceptions_are_wrapped_in_ocr_error(self):
+        with mock.patch.dict(ocr.OCR_ENGINES, {'broken': self.BrokenEngine}), mock.patch.dict(ocr._engines, clear=True):
+            with self.assertRaises(ocr.OCREngineError) as raised:
+                ocr.recognize_band('broken', None, 'eng', 0, band=None, scale=1.0)
+
+        self.assertIn('RuntimeError', str(raised.exception))
+
+    def test_engine_failure_is_a_503_json_response(self):
+        async def failing_ocr(data, language):
+            raise ocr.OCREngineError('tesseract exited with status 1')
+            yield
+
+        with mock.patch.object(views, 'aiter_ocr', failing_ocr):
+            lines, error = async_to_sync(views.OcrBaseView().collect_lines)(b'image', 'english')
+
+        self.assertIsNone(lines)
+        self.assertEqual(error.status_code, 503)
+        self.assertIn('error', json.loads(error.content))
+
+
+@override_settings(TRANSLATION_MEMORY_ENABLED=True)
+class TranslationMemoryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(translation_memory, '_indexes', translation_memory.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        wordbook = Wordbook.objects.create(user=self.owner, name='book', language='english', input_type='text')
+        sentence = Sentence.objects.create(
+            user=self.owner, wordbook=wordbook, text='She is my sister.', meaning='그녀는 내 여동생이다.'
+        )
+        word = Word.objects.create(user=self.owner, text='sister')
+        SentenceWord.objects.create(word=word, sentence=sentence, meaning='여동생 (내가 고친 뜻)')
+
+    def find(self, sentence, user=None):
+        return translation_memory.find_in_translation_memory(sentence, 'english', user or self.owner)
+
+    def test_case_and_punctuation_differences_reuse_the_stored_analysis(self):
+        remembered = self.find('she is my SISTER!')
+
+        self.assertEqual(remembered['text'], 'she is my SISTER!')
+        self.assertEqual(remembered['meaning'], '그녀는 내 여동생이다.')
+        self.assertEqual(remembered['words'][0]['meaning'], '여동생 (내가 고친 뜻)')
+        self.assertEqual(remembered['words'][0]['original_text'], 'SISTER')
+        self.assertEqual(remembered['memory']['source_text'], 'She is my sister.')
+
+    def test_sentences_with_different_words_go_to_the_llm(self):
+        """단어 하나 차이도 번역이 달라질 수 있으므로 (부정, 어순) 재사용하지 않음"""
+        self.assertIsNone(self.find('She is not my sister.'))
+        self.assertIsNone(self.find('She is my brother.'))
+        self.assertIsNone(self.find('Is she my sister?'))
+
+    def test_memory_only_returns_the_users_own_sentences(self):
+        self.assertIsNone(self.find('She is my sister.', self.other))
+        self.assertIsNone(translation_memory.find_in_translation_memory('She is my sister.', 'english', None))
+
+    def test_database_errors_fall_back_to_the_llm(self):
+        with mock.patch.object(translation_memory, '_load_analysis', side_effect=RuntimeError('connection lost')):
+            self.assertIsNone(self.find('She is my sister.'))
+
+    @override_settings(TRANSLATION_MEMORY_ENABLED=False)
+    def test_disabled_by_setting(self):
+        self.assertIsNone(self.find('She is my sister.'))
@@ -1,17 +1,31 @@
 from django.urls import path
 
 from lingua_core.views import (
-    # OcrView,
-    # OcrSentenceView,
+    OcrView,
+    OcrSentenceView,
+    OcrSentenceStreamView,
     SentenceAnalyzeView,
+    SentenceAnalyzeStreamView,
+    TextIngestView,
+    SubtitleIngestView,
+    AnalysisJobDetailView,
+    AnalysisJobStreamView,
+    LLMMetricsView,
     # SentenceSplitView,
 )
 
 app_name = 'lingua_core'
 
 urlpatterns = [
-    # path('extract/ocr/', OcrView.as_view(), name='extract-ocr'),
-    # path('extract/ocr/sentence/', OcrSentenceView.as_view(), name='extract-ocr-sentence'),
+    path('extract/ocr/', OcrView.as_view(), name='extract-ocr'),
+    path('extract/ocr/sentence/', OcrSentenceView.as_view(), name='extract-ocr-sentence'),
+    path('extract/ocr/sentence/stream/', OcrSentenceStreamView.as_view(), name='extract-ocr-sentence-stream'),
     path('analyze/sentences/', SentenceAnalyzeView.as_view(), name='extract-sentences'),
+    path('analyze/sentences/stream/', SentenceAnalyzeStreamView.as_view(), name='extract-sentences-stream'),
+    path('analyze/text/', TextIngestView.as_view(), name='analyze-text'),
+    path('analyze/subtitles/', SubtitleIngestView.as_view(), name='analyze-subtitles'),
+    path('analyze/jobs/<uuid:job_id>/', AnalysisJobDetailView.as_view(), name='analysis-job-detail'),
+    path('analyze/jobs/<uuid:job_id>/stream/', AnalysisJobStreamView.as_view(), name='analysis-job-stream'),
+    path('metrics/llm/', LLMMetricsView.as_view(), name='llm-metrics'),
     # path('split/sentences/', SentenceSplitView.as_view(), name='extract-sentences-split'),
 ]
@@ -0,0 +1,287 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from .call_gpt_for_sentence import call_gpt_for_sentence
+from .prompt_loader import get_prompt_version
+from .redis_client import get_redis
+from .singleflight import get_singleflight, run_exclusive
+from .telemetry import get_telemetry
+from .translation_memory import find_in_translation_memory
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'analysis:v1'
+
+
+def normalize_sentence(sentence: str) -> str:
+    """캐시 키용 문장 정규화 (유니코드 NFKC, 앞뒤 공백 제거, 연속 공백 축약)"""
+    return ' '.join(unicodedata.normalize('NFKC', sentence).split())
+
+
+def make_cache_key(sentence: str, language: str, variant: str = 'single') -> str:
+    """
+    정규화된 문장 + 언어 + 프롬프트 버전으로 만든 내용 기반 캐시 키
+    variant는 결과를 만든 프롬프트 (single: 문장 하나, batch: 배치), 그 프롬프트가 바뀌면 키도 바뀐다.
+    """
+    payload = '\x1f'.join([language, get_prompt_version(language, variant), normalize_sentence(sentence)])
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{language}:{digest}"
+
+
+class LocalLRUCache:
+    """프로세스 내 LRU 캐시 (항목 수 상한 + TTL 만료)"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AnalysisCache:
+    """
+    문장 분석 결과 캐시
+    1차: 프로세스 내 LRU, 2차: Redis (설정되지 않았거나 장애 시 1차만 사용)
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache(
+            maxsize=settings.ANALYSIS_CACHE_LOCAL_MAXSIZE,
+            ttl=settings.ANALYSIS_CACHE_LOCAL_TTL,
+        )
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'bypasses': 0,
+            'stores': 0,
+            'errors': 0,
+            'coalesced': 0,  # 진행 중인 동일 분석(프로세스 내/다른 워커)의 결과를 받은 횟수
+        }
+
+    def _incr(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: str):
+        """(값, 적중한 계층) 반환, 미스면 (None, None)"""
+        value = self.local.get(key)
+        if value is not None:
+            return value, 'local_hits'
+
+        client = get_redis()
+        if client is not None:
+            try:
+                raw = client.get(key)
+            except Exception as e:
+                self._incr('errors')
+                logger.warning(f"분석 캐시 Redis 조회 실패: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(key, value)
+                return value, 'redis_hits'
+        return None, None
+
+    def get(self, key: str) -> Optional[dict]:
+        value, tier = self._lookup(key)
+        self._incr(tier or 'misses')
+        return value
+
+    def peek(self, key: str) -> Optional[dict]:
+        """적중/미스 카운터에 반영하지 않는 조회 (singleflight 대기 중 폴링용)"""
+        return self._lookup(key)[0]
+
+    def set(self, key: str, value: dict) -> None:
+        self.local.set(key, value)
+        self._incr('stores')
+
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.set(key, json.dumps(value, ensure_ascii=False), ex=settings.ANALYSIS_CACHE_TTL)
+        except Exception as e:
+            self._incr('errors')
+            logger.warning(f"분석 캐시 Redis 저장 실패: {e}")
+
+    def mark_bypass(self) -> None:
+        self._incr('bypasses')
+
+    def mark_coalesced(self) -> None:
+        self._incr('coalesced')
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['redis_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['redis_hits']) / lookups, 4) if lookups else 0.0
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """프로세스 단위 AnalysisCache 싱글톤 반환"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache()
+    return _cache
+
+
+def _safe_cache_key(sentence: str, language: str, variant: str = 'single') -> Optional[str]:
+    """캐시 키 생성 (지원하지 않는 언어 등으로 실패하면 None → 캐시를 쓰지 않음)"""
+    try:
+        return make_cache_key(sentence, language, variant)
+    except (FileNotFoundError, ValueError) as e:
+        logger.warning(f"분석 캐시 키 생성 실패: {e}")
+        return None
+
+
+def get_cached_analysis(sentence: str, language: str, variant: str = 'single') -> Optional[dict]:
+    """캐시된 분석 결과 조회 (캐시 비활성화/미스 시 None)"""
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return None
+    key = _safe_cache_key(sentence, language, variant)
+    if key is None:
+        return None
+    return get_analysis_cache().get(key)
+
+
+def store_analysis(sentence: str, language: str, result: Optional[dict], variant: str = 'single') -> None:
+    """분석 결과를 캐시에 저장 (실패 결과는 저장하지 않음)"""
+    if not result or not settings.ANALYSIS_CACHE_ENABLED:
+        return
+    key = _safe_cache_key(sentence, language, variant)
+    if key is not None:
+        get_analysis_cache().set(key, result)
+
+
+def cached_call_gpt_for_sentence(
+    sentence: str,
+    language: str = 'english',
+    refresh: bool = False,
+    analyze: Optional[Callable] = None,
+    hints=None,
+    user=None,
+) -> Optional[dict]:
+    """
+    캐시를 거쳐 문장을 분석
+
+    Args:
+        sentence (str): 분석할 문장
+        language (str): 언어 코드
+        refresh (bool): True면 캐시, 번역 메모리와 singleflight를 건너뛰고 새로 분석한 결과로 캐시를 갱신
+        analyze (callable): 캐시 미스 시 호출할 분석 함수 (기본값 call_gpt_for_sentence)
+            같은 문장을 동시에 분석 중인 호출이 있으면 호출하지 않고 그 결과를 받는다.
+        hints (KnownWordHints): 사용자의 학습 단어 힌트
+            문장에 학습 단어가 있으면 결과에 사용자가 저장한 의미가 들어가므로 캐시, 번역 메모리와
+            singleflight를 모두 건너뛰고 hints.analyze로 분석한다. (결과는 캐시하지 않음)
+        user: 요청 사용자 (로그인 사용자만 자신이 저장한 문장의 번역 메모리를 사용)
+
+    Returns:
+        dict: 분석 결과 또는 None (실패 시, 실패 결과는 캐시하지 않음)
+    """
+    cache = get_analysis_cache()
+    if hints is not None and hints.select(sentence):
+        cache.mark_bypass()
+        return hints.analyze(sentence, language)
+
+    analyze = analyze or call_gpt_for_sentence
+    computed = []
+
+    def compute():
+        computed.append(True)
+        result = analyze(sentence, language)
+        store_analysis(sentence, language, result)
+        return result
+
+    if refresh:
+        cache.mark_bypass()
+        return compute()
+
+    cached = get_cached_analysis(sentence, language)
+    if cached is not None:
+        get_telemetry().record_cache_hit('sentence', language)
+        return cached
+
+    # 사용자가 저장한 문장 중 대소문자/문장 부호만 다른 문장이 있으면 그 분석을 사용
+    # (사용자가 고친 의미가 들어 있으므로 공유 분석 캐시에는 저장하지 않음)
+    remembered = find_in_translation_memory(sentence, language, user)
+    if remembered is not None:
+        return remembered
+
+    key = _safe_cache_key(sentence, language)
+    if key is None or not settings.ANALYSIS_SINGLEFLIGHT_ENABLED:
+        return compute()
+
+    # 같은 문장의 동시 분석은 LLM 호출 하나로 합침
+    # (프로세스 내에서는 singleflight, 워커 간에는 Redis 잠금 + 캐시 폴링)
+    def compute_exclusive():
+        if not settings.ANALYSIS_CACHE_ENABLED:
+            return compute()
+        return run_exclusive(
+            key,
+            compute,
+            poll=lambda: cache.peek(key),
+            lock_ttl=settings.ANALYSIS_SINGLEFLIGHT_LOCK_TTL,
+            wait_timeout=settings.ANALYSIS_SINGLEFLIGHT_WAIT,
+            poll_interval=settings.ANALYSIS_SINGLEFLIGHT_POLL_INTERVAL,
+        )
+
+    result = get_singleflight().do(key, compute_exclusive, timeout=settings.ANALYSIS_SINGLEFLIGHT_WAIT)
+    if not computed:
+        cache.mark_coalesced()
+        get_telemetry().record_cache_hit('sentence', language)
+    return result
+
+
+def get_cache_stats() -> dict:
+    """현재 프로세스의 캐시 적중/미스 카운터 반환"""
+    return get_analysis_cache().stats()
@@ -0,0 +1,107 @@
+import json
+import uuid
+import logging
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .analysis_cache import LocalLRUCache
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DRAFT_KEY_PREFIX = 'analysis:draft:v1'
+
+
+class DraftNotFound(Exception):
+    """초안이 없거나 만료됐거나 다른 사용자의 초안"""
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def _local_drafts() -> LocalLRUCache:
+    """Redis를 쓰지 않을 때의 프로세스 내 저장소 (개발용, 워커가 여러 개면 저장한 워커에서만 조회됨)"""
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocalLRUCache(maxsize=settings.ANALYSIS_DRAFT_LOCAL_MAXSIZE, ttl=settings.ANALYSIS_DRAFT_TTL)
+    return _local
+
+
+def _draft_key(draft_id: str) -> str:
+    return f"{DRAFT_KEY_PREFIX}:{draft_id}"
+
+
+def save_draft(user, language: str, results: Dict[int, dict]) -> Optional[dict]:
+    """
+    분석 결과를 초안으로 저장 (단어장 저장 시 전체 결과 대신 초안 ID와 선택/수정 사항만 보내도록)
+
+    Args:
+        user: 요청 사용자 (로그인하지 않았으면 저장하지 않음)
+        language (str): 분석 언어
+        results (dict): 입력 문장 index → 분석 결과 (실패/미완료 문장은 제외)
+
+    Returns:
+        dict: {id, expires_in} 또는 None (저장하지 않음/저장 실패)
+    """
+    if not results or user is None or not getattr(user, 'is_authenticated', False):
+        return None
+
+    draft_id = str(uuid.uuid4())
+    draft = {
+        'user_id': user.id,
+        'language': language,
+        'results': {str(index): result for index, result in results.items()},
+    }
+    client = get_redis()
+    if client is None:
+        _local_drafts().set(draft_id, draft)
+    else:
+        try:
+            client.set(_draft_key(draft_id), json.dumps(draft, ensure_ascii=False), ex=settings.ANALYSIS_DRAFT_TTL)
+        except Exception as e:
+            logger.warning(f"분석 초안 저장 실패: {e}")
+            return None
+    logger.info(f"분석 초안 저장: {draft_id} (문장 {len(results)}개)")
+    return {'id': draft_id, 'expires_in': settings.ANALYSIS_DRAFT_TTL}
+
+
+def load_draft(draft_id: str, user) -> dict:
+    """
+    초안 조회 ({user_id, language, results: {index(str): 분석 결과}})
+
+    Raises:
+        DraftNotFound: 없거나 만료됐거나 다른 사용자의 초안
+    """
+    draft_id = str(draft_id)
+    client = get_redis()
+    if client is None:
+        draft = _local_drafts().get(draft_id)
+    else:
+        try:
+            raw = client.get(_draft_key(draft_id))
+        except Exception as e:
+            logger.warning(f"분석 초안 조회 실패: {e}")
+            raw = None
+        draft = json.loads(raw) if raw is not None else None
+
+    if draft is None or draft['user_id'] != getattr(user, 'id', None):
+        raise DraftNotFound('분석 초안을 찾을 수 없습니다. (만료되었으면 다시 분석해주세요)')
+    return draft
+
+
+def delete_draft(draft_id: str) -> None:
+    """단어장 저장이 끝난 초안 삭제"""
+    draft_id = str(draft_id)
+    client = get_redis()
+    if client is None:
+        _local_drafts().delete(draft_id)
+        return
+    try:
+        client.delete(_draft_key(draft_id))
+    except Exception as e:
+        logger.warning(f"분석 초안 삭제 실패: {e}")
@@ -0,0 +1,216 @@
+import logging
+from datetime import timedelta
+from functools import partial
+from itertools import groupby
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from lingua_core.models import AnalysisJob, AnalysisJobItem
+from .analysis_cache import cached_call_gpt_for_sentence
+from .analysis_runner import iter_analyses, iter_batched_analyses
+from .known_words import KnownWordHints
+
+logger = logging.getLogger(__name__)
+
+
+def create_analysis_job(
+    sentences: List[str],
+    language: str,
+    user=None,
+    options: Optional[dict] = None,
+    metas: Optional[List[dict]] = None,
+) -> AnalysisJob:
+    """
+    분석 작업과 문장별 항목을 생성 (워커가 처리할 큐에 등록)
+
+    Args:
+        sentences (list): 분석할 문장 리스트 (항목의 index는 이 순서)
+        language (str): 언어 코드
+        user: 요청한 사용자 (비로그인 요청이면 None)
+        options (dict): 분석 옵션 (refresh, batch, use_known_words, 긴 텍스트/자막에서 만든 작업이면 source/ingest)
+        metas (list): 문장별 부가 정보 (자막이면 {start_ms, end_ms}), 결과와 함께 그대로 반환
+    """
+    with transaction.atomic():
+        job = AnalysisJob.objects.create(
+            user=user,
+            language=language,
+            options=options or {},
+            total_count=len(sentences),
+        )
+        AnalysisJobItem.objects.bulk_create(
+            [
+                AnalysisJobItem(job=job, index=index, sentence=sentence, meta=metas[index] if metas else {})
+                for index, sentence in enumerate(sentences)
+            ],
+            batch_size=500,
+        )
+    logger.info(f"분석 작업 생성: {job.id} ({len(sentences)}문장)")
+    return job
+
+
+def reclaim_stale_items() -> int:
+    """
+    워커가 중단되어 오래 running 상태로 남은 항목을 다시 대기 상태로 돌림
+    이미 ANALYSIS_JOB_MAX_ATTEMPTS번 가져간 항목은 워커를 죽이거나 멈추게 하는 문장일 수 있으므로 failed로 표시
+    """
+    lease = timedelta(seconds=settings.ANALYSIS_JOB_ITEM_LEASE_SECONDS)
+    stale = AnalysisJobItem.objects.filter(
+        status=AnalysisJobItem.STATUS_RUNNING,
+        locked_at__lt=timezone.now() - lease,
+    )
+    exhausted = stale.filter(attempts__gte=settings.ANALYSIS_JOB_MAX_ATTEMPTS)
+    with transaction.atomic():
+        exhausted_job_ids = set(exhausted.values_list('job_id', flat=True))
+        failed = exhausted.update(
+            status=AnalysisJobItem.STATUS_FAILED,
+            locked_at=None,
+            error=f"분석 중 워커가 {settings.ANALYSIS_JOB_MAX_ATTEMPTS}번 중단되어 더 이상 시도하지 않습니다.",
+            updated_at=timezone.now(),
+        )
+        reclaimed = stale.update(status=AnalysisJobItem.STATUS_PENDING, locked_at=None)
+
+    if failed:
+        logger.error(f"재시도 횟수를 넘은 분석 항목 {failed}개를 실패로 처리")
+        _finish_completed_jobs(exhausted_job_ids)
+    if reclaimed:
+        logger.warning(f"중단된 분석 항목 {reclaimed}개 회수")
+    return reclaimed + failed
+
+
+def claim_job_items(limit: int) -> List[AnalysisJobItem]:
+    """
+    대기 중인 항목을 최대 limit개 가져와 running으로 표시
+    SELECT ... FOR UPDATE SKIP LOCKED로 여러 워커가 같은 항목을 가져가지 않도록 한다.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        items = list(
+            AnalysisJobItem.objects.select_for_update(skip_locked=True)
+            .filter(status=AnalysisJobItem.STATUS_PENDING)
+            .select_related('job')
+            .order_by('id')[:limit]
+        )
+        if not items:
+            return []
+
+        for item in items:
+            item.status = AnalysisJobItem.STATUS_RUNNING
+            item.locked_at = now
+            item.attempts += 1
+            item.updated_at = now  # bulk_update는 auto_now를 갱신하지 않음
+        AnalysisJobItem.objects.bulk_update(items, ['status', 'locked_at', 'attempts', 'updated_at'])
+
+        job_ids = {item.job_id for item in items}
+        AnalysisJob.objects.filter(id__in=job_ids, status=AnalysisJob.STATUS_PENDING).update(
+            status=AnalysisJob.STATUS_RUNNING,
+            started_at=now,
+        )
+    return items
+
+
+def _finish_completed_jobs(job_ids) -> None:
+    """남은 항목이 없는 작업을 completed로 표시"""
+    for job_id in job_ids:
+        unfinished = AnalysisJobItem.objects.filter(
+            job_id=job_id,
+            status__in=[AnalysisJobItem.STATUS_PENDING, AnalysisJobItem.STATUS_RUNNING],
+        ).exists()
+        if not unfinished:
+            AnalysisJob.objects.filter(id=job_id).exclude(status=AnalysisJob.STATUS_COMPLETED).update(
+                status=AnalysisJob.STATUS_COMPLETED,
+                finished_at=timezone.now(),
+            )
+            logger.info(f"분석 작업 완료: {job_id}")
+
+
+def process_job_items(items: List[AnalysisJobItem]) -> int:
+    """
+    가져온 항목들을 작업(언어/옵션)별로 묶어 동시에 분석하고 결과를 저장
+
+    Returns:
+        int: 처리한 항목 수
+    """
+    items = sorted(items, key=lambda item: str(item.job_id))
+    processed = 0
+
+    for job_id, group in groupby(items, key=lambda item: item.job_id):
+        group = list(group)
+        job = group[0].job
+        sentences = [item.sentence for item in group]
+        refresh = bool(job.options.get('refresh'))
+
+        # 워커 프로세스는 분석만 하므로 프로세스 상한까지 동시에 호출
+        max_concurrency = settings.LLM_MAX_INFLIGHT_PER_WORKER
+        if job.options.get('batch'):
+            events = iter_batched_analyses(sentences, job.language, refresh=refresh, max_concurrency=max_concurrency)
+        else:
+            user = job.user if job.user_id else None
+            hints = None
+            if job.options.get('use_known_words') and user is not None:
+                hints = KnownWordHints.for_user(user, job.language, sentences)
+            events = iter_analyses(
+                sentences,
+                job.language,
+                analyze=partial(cached_call_gpt_for_sentence, refresh=refresh, hints=hints, user=user),
+                max_concurrency=max_concurrency,
+            )
+
+        # 완료되는 대로 저장해서 폴링/스트리밍 클라이언트가 바로 볼 수 있게 함
+        for event in events:
+            item = group[event.index]
+            if event.ok:
+                item.status = AnalysisJobItem.STATUS_COMPLETED
+                item.result = event.result
+                item.error = ''
+            else:
+                item.status = AnalysisJobItem.STATUS_FAILED
+                item.error = event.error or ''
+            item.locked_at = None
+            item.save(update_fields=['status', 'result', 'error', 'locked_at', 'updated_at'])
+            processed += 1
+
+    _finish_completed_jobs({item.job_id for item in items})
+    return processed
+
+
+def _item_meta(item: AnalysisJobItem) -> dict:
+    """항목의 부가 정보가 있으면 {'meta': ...} (응답에 그대로 펼쳐 넣음)"""
+    return {'meta': item.meta} if item.meta else {}
+
+
+def build_job_payload(job: AnalysisJob, items=None) -> dict:
+    """작업 상태와 현재까지의 결과를 응답 형태로 정리 (selected/failed는 입력 순서)"""
+    if items is None:
+        items = job.items.order_by('index')
+
+    selected = []
+    failed = []
+    counts = {status: 0 for status, _ in AnalysisJobItem.STATUS_CHOICES}
+    for item in items:
+        counts[item.status] += 1
+        if item.status == AnalysisJobItem.STATUS_COMPLETED:
+            selected.append({'index': item.index, 'data': item.result, **_item_meta(item)})
+        elif item.status == AnalysisJobItem.STATUS_FAILED:
+            failed.append({'index': item.index, 'sentence': item.sentence, 'error': item.error, **_item_meta(item)})
+
+    payload = {
+        'job_id': str(job.id),
+        'status': job.status,
+        'language': job.language,
+        'total': job.total_count,
+        'completed': counts[AnalysisJobItem.STATUS_COMPLETED],
+        'failed_count': counts[AnalysisJobItem.STATUS_FAILED],
+        'pending': counts[AnalysisJobItem.STATUS_PENDING] + counts[AnalysisJobItem.STATUS_RUNNING],
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'selected': selected,
+        'failed': failed,
+    }
+    if 'ingest' in job.options:
+        # 긴 텍스트/자막 작업: 분할/제외된 문장 수
+        payload['ingest'] = job.options['ingest']
+    return payload
@@ -0,0 +1,369 @@
+import os
+import time
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from .analysis_cache import cached_call_gpt_for_sentence, get_cached_analysis, normalize_sentence, store_analysis
+from .call_gpt_for_batch import call_gpt_for_batch, plan_batches
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# 프로세스 공용 스레드 풀 (모든 요청이 공유 → 워커당 동시 LLM 호출 수 상한)
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    현재 프로세스의 분석용 스레드 풀을 반환
+    gunicorn이 fork한 뒤에는 부모의 풀을 쓸 수 없으므로 pid가 바뀌면 새로 만든다.
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            max_workers = max(1, settings.LLM_MAX_INFLIGHT_PER_WORKER)
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='llm-analysis',
+            )
+            _executor_pid = pid
+            logger.info(f"분석 스레드 풀 생성 (pid={pid}, max_workers={max_workers})")
+    return _executor
+
+
+@dataclass
+class AnalysisEvent:
+    """문장 하나의 분석 결과 (성공 시 result, 실패 시 error)"""
+    index: int
+    sentence: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.result is not None
+
+
+@dataclass
+class AnalysisOutcome:
+    """요청 전체의 분석 결과 (results는 입력 순서, 실패/미완료 문장은 None)"""
+    results: List[Optional[dict]] = field(default_factory=list)
+    failed: List[dict] = field(default_factory=list)
+    pending: List[dict] = field(default_factory=list)  # 시간 예산 안에 끝나지 않은 문장
+
+    @property
+    def selected(self) -> List[dict]:
+        """성공한 결과 (입력 순서), 각 결과에 입력 index를 붙임 (분석 초안의 index와 같음)"""
+        return [{**result, 'index': index} for index, result in enumerate(self.results) if result is not None]
+
+
+def _group_duplicates(sentences: List[str]) -> Dict[int, List[int]]:
+    """
+    정규화한 문장이 같은 입력끼리 묶음 (요청 안의 중복 문장은 한 번만 분석)
+
+    Returns:
+        dict: 대표 index(처음 나온 위치) -> 같은 문장의 모든 index (입력 순서)
+    """
+    groups = {}
+    first_index = {}
+    for index, sentence in enumerate(sentences):
+        first = first_index.setdefault(normalize_sentence(sentence), index)
+        groups.setdefault(first, []).append(index)
+    duplicates = len(sentences) - len(groups)
+    if duplicates:
+        logger.info(f"중복 문장 {duplicates}개는 한 번만 분석")
+    return groups
+
+
+def _fan_out(event: AnalysisEvent, sentences: List[str], groups: Dict[int, List[int]]) -> Iterator[AnalysisEvent]:
+    """대표 문장의 결과를 같은 문장의 모든 index에 전달"""
+    for index in groups[event.index]:
+        if index == event.index:
+            yield event
+        else:
+            yield AnalysisEvent(index=index, sentence=sentences[index], result=event.result, error=event.error)
+
+
+def _analyze_safely(analyze: Callable, index: int, sentence: str, language: str) -> AnalysisEvent:
+    """분석 함수를 호출하고 예외/빈 응답을 AnalysisEvent의 error로 변환"""
+    try:
+        result = analyze(sentence, language)
+    except Exception as e:
+        logger.exception(f"문장 {index + 1} 분석 중 예외 발생: {e}")
+        return AnalysisEvent(index=index, sentence=sentence, error=str(e))
+
+    if not result:
+        return AnalysisEvent(index=index, sentence=sentence, error='GPT 응답 실패')
+    return AnalysisEvent(index=index, sentence=sentence, result=result)
+
+
+def _analyze_batch_safely(analyze_batch: Callable, indexes: List[int], sentences: List[str], language: str) -> List[AnalysisEvent]:
+    """배치 분석 함수를 호출하고 결과를 문장별 AnalysisEvent로 변환 (배치 프롬프트 버전의 캐시 키로 저장)"""
+    try:
+        results = analyze_batch(sentences, language)
+    except Exception as e:
+        logger.exception(f"배치 분석 중 예외 발생: {e}")
+        return [AnalysisEvent(index=i, sentence=s, error=str(e)) for i, s in zip(indexes, sentences)]
+
+    events = []
+    for index, sentence, result in zip(indexes, sentences, results):
+        if result:
+            store_analysis(sentence, language, result, variant='batch')
+            events.append(AnalysisEvent(index=index, sentence=sentence, result=result))
+        else:
+            events.append(AnalysisEvent(index=index, sentence=sentence, error='GPT 응답 실패'))
+    return events
+
+
+def _iter_windowed(tasks: Iterator[tuple], limit: int, deadline: Optional[float] = None) -> Iterator:
+    """
+    (fn, *args) 작업들을 공용 스레드 풀에서 최대 limit개씩 동시에 실행하고
+    완료되는 순서대로 결과를 반환
+    deadline(time.monotonic() 기준)이 지나면 남은 작업을 기다리지 않고 끝낸다.
+    (이미 실행 중인 호출은 백그라운드에서 끝나고 결과는 캐시에 저장됨)
+    """
+    executor = get_executor()
+    pending = set()
+
+    def submit_next() -> bool:
+        try:
+            fn, *args = next(tasks)
+        except StopIteration:
+            return False
+        # 요청의 context(엔드포인트 이름 등)를 분석 스레드로 전달
+        pending.add(executor.submit(contextvars.copy_context().run, fn, *args))
+        return True
+
+    # 요청당 상한만큼만 먼저 제출하고, 하나가 끝날 때마다 다음 작업을 제출
+    for _ in range(limit):
+        if not submit_next():
+            break
+
+    try:
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.warning(f"분석 시간 예산 초과, 남은 작업 {len(pending)}개는 기다리지 않음")
+                return
+            for future in done:
+                pending.discard(future)
+                submit_next()
+                yield future.result()
+    finally:
+        # 소비자가 중간에 끊은 경우 아직 시작하지 않은 작업은 취소
+        for future in pending:
+            future.cancel()
+
+
+def iter_analyses(
+    sentences: Iterable[str],
+    language: str = 'english',
+    analyze: Optional[Callable] = None,
+    max_concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[AnalysisEvent]:
+    """
+    문장들을 동시에 분석하고 완료되는 순서대로 AnalysisEvent를 반환
+
+    Args:
+        sentences: 분석할 문장들
+        language (str): 언어 코드
+        analyze (callable): (sentence, language) -> dict | None, 기본값 cached_call_gpt_for_sentence
+        max_concurrency (int): 이 요청에서 동시에 실행할 최대 호출 수
+            (기본값 LLM_MAX_CONCURRENCY_PER_REQUEST, 프로세스 전체 상한은 스레드 풀 크기)
+        deadline (float): time.monotonic() 기준 마감 시각, 지나면 끝나지 않은 문장은 반환하지 않음
+
+    Yields:
+        AnalysisEvent: 완료 순서대로 (index로 입력 순서 확인 가능, 중복 문장은 같은 결과를 연달아 반환)
+    """
+    analyze = analyze or cached_call_gpt_for_sentence
+    limit = max(1, max_concurrency or settings.LLM_MAX_CONCURRENCY_PER_REQUEST)
+    sentences = list(sentences)
+    groups = _group_duplicates(sentences)
+
+    tasks = (
+        (_analyze_safely, analyze, index, sentences[index], language)
+        for index in groups
+    )
+    for event in _iter_windowed(tasks, limit, deadline):
+        yield from _fan_out(event, sentences, groups)
+
+
+async def aiter_analyses(
+    sentences: List[str],
+    language: str = 'english',
+    analyze: Optional[Callable] = None,
+    max_concurrency: Optional[int] = None,
+    idle_timeout: Optional[float] = None,
+) -> AsyncIterator[Optional[AnalysisEvent]]:
+    """
+    iter_analyses의 asyncio 버전 (ASGI 스트리밍 뷰용)
+    LLM 호출은 같은 공용 스레드 풀에서 실행되므로 이벤트 루프를 막지 않는다.
+
+    Args:
+        idle_timeout (float): 지정하면 이 시간(초) 동안 완료된 문장이 없을 때 None을 반환
+            (SSE keep-alive 전송용)
+
+    Yields:
+        AnalysisEvent | None: 완료 순서대로, 대기 시간 초과 시 None
+    """
+    analyze = analyze or cached_call_gpt_for_sentence
+    limit = max(1, max_concurrency or settings.LLM_MAX_CONCURRENCY_PER_REQUEST)
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    semaphore = asyncio.Semaphore(limit)
+    completed = asyncio.Queue()
+
+    async def run(index: int, sentence: str) -> None:
+        async with semaphore:
+            event = await loop.run_in_executor(
+                executor, contextvars.copy_context().run, _analyze_safely, analyze, index, sentence, language
+            )
+        completed.put_nowait(event)
+
+    groups = _group_duplicates(sentences)
+    tasks = [asyncio.ensure_future(run(index, sentences[index])) for index in groups]
+    try:
+        for _ in range(len(tasks)):
+            while True:
+                try:
+                    event = await asyncio.wait_for(completed.get(), timeout=idle_timeout)
+                    break
+                except asyncio.TimeoutError:
+                    yield None
+            for fanned in _fan_out(event, sentences, groups):
+                yield fanned
+    finally:
+        # 클라이언트 연결이 끊기면 아직 시작하지 않은 문장은 취소
+        for task in tasks:
+            task.cancel()
+
+
+def iter_batched_analyses(
+    sentences: List[str],
+    language: str = 'english',
+    refresh: bool = False,
+    analyze_batch: Optional[Callable] = None,
+    max_concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[AnalysisEvent]:
+    """
+    캐시에 없는 문장들을 길이 기반 배치로 묶어 동시에 분석하고 완료되는 순서대로 반환
+    캐시는 배치 프롬프트 버전으로 조회/저장하므로 배치 프롬프트를 고치면 이전 결과는 쓰지 않는다.
+
+    Args:
+        sentences (list): 분석할 문장들
+        language (str): 언어 코드
+        refresh (bool): True면 캐시 조회를 건너뜀 (결과는 캐시에 저장)
+        analyze_batch (callable): (sentences, language) -> list[dict | None], 기본값 call_gpt_for_batch
+        max_concurrency (int): 이 요청에서 동시에 실행할 최대 배치 호출 수
+        deadline (float): time.monotonic() 기준 마감 시각, 지나면 끝나지 않은 배치는 반환하지 않음
+    """
+    analyze_batch = analyze_batch or call_gpt_for_batch
+    limit = max(1, max_concurrency or settings.LLM_MAX_CONCURRENCY_PER_REQUEST)
+
+    groups = _group_duplicates(sentences)
+    misses = []
+    for index in groups:
+        cached = None if refresh else get_cached_analysis(sentences[index], language, variant='batch')
+        if cached is not None:
+            get_telemetry().record_cache_hit('batch', language)
+            yield from _fan_out(AnalysisEvent(index=index, sentence=sentences[index], result=cached), sentences, groups)
+        else:
+            misses.append(index)
+
+    batches = plan_batches([sentences[index] for index in misses])
+    tasks = (
+        (
+            _analyze_batch_safely,
+            analyze_batch,
+            [misses[position] for position in batch],
+            [sentences[misses[position]] for position in batch],
+            language,
+        )
+        for batch in batches
+    )
+    for events in _iter_windowed(tasks, limit, deadline):
+        for event in events:
+            yield from _fan_out(event, sentences, groups)
+
+
+def run_analyses(
+    sentences: List[str],
+    language: str = 'english',
+    analyze: Optional[Callable] = None,
+    max_concurrency: Optional[int] = None,
+    batch: bool = False,
+    refresh: bool = False,
+    time_budget: Optional[float] = None,
+) -> AnalysisOutcome:
+    """
+    문장 리스트를 동시에 분석하고 입력 순서대로 정리된 결과를 반환
+
+    Args:
+        analyze (callable): 단일 모드의 분석 함수 (iter_analyses), batch 모드에서는 지정할 수 없음
+        batch (bool): True면 여러 문장을 하나의 요청으로 묶어 분석 (iter_batched_analyses)
+        refresh (bool): batch 모드에서 캐시 조회를 건너뜀
+            (단일 모드에서는 analyze에 refresh를 바인딩해서 전달)
+        time_budget (float): 요청 전체 분석 시간 예산 (초), 넘기면 끝나지 않은 문장은 pending으로 반환
+
+    Returns:
+        AnalysisOutcome: results(입력 순서, 실패 시 None), failed([{index, sentence, status, error}]),
+            pending([{index, sentence, status}])
+
+    Raises:
+        ValueError: batch 모드에 analyze를 지정한 경우 (배치 분석은 문장별 분석 함수를 쓰지 않음)
+    """
+    if batch and analyze is not None:
+        raise ValueError('batch 모드에서는 analyze를 지정할 수 없습니다.')
+
+    outcome = AnalysisOutcome(results=[None] * len(sentences))
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    if batch:
+        events = iter_batched_analyses(
+            sentences, language, refresh=refresh, max_concurrency=max_concurrency, deadline=deadline
+        )
+    else:
+        events = iter_analyses(
+            sentences, language, analyze=analyze, max_concurrency=max_concurrency, deadline=deadline
+        )
+
+    for event in events:
+        if event.ok:
+            outcome.results[event.index] = event.result
+        else:
+            logger.warning(f"문장 {event.index + 1} 분석 실패: {event.error}")
+            outcome.failed.append({
+                'index': event.index,
+                'sentence': event.sentence,
+                'status': 'failed',
+                'error': event.error,
+            })
+
+    outcome.failed.sort(key=lambda item: item['index'])
+
+    failed_indexes = {item['index'] for item in outcome.failed}
+    outcome.pending = [
+        {'index': index, 'sentence': sentence, 'status': 'pending'}
+        for index, sentence in enumerate(sentences)
+        if outcome.results[index] is None and index not in failed_indexes
+    ]
+    if outcome.pending:
+        logger.warning(f"시간 예산 안에 끝나지 않은 문장 {len(outcome.pending)}개")
+    return outcome
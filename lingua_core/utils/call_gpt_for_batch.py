@@ -0,0 +1,174 @@
+import json
+import time
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from .call_gpt_for_sentence import (
+    SentenceAnalysis,
+    call_gpt_for_sentence,
+    json_schema_response_format,
+    structured_outputs_enabled,
+)
+from .llm_client import LLMUnavailableError, get_llm_client
+from .model_router import route_batch
+from .prompt_loader import load_batch_prompt_for_language
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItemAnalysis(SentenceAnalysis):
+    index: int
+
+
+class BatchAnalysis(BaseModel):
+    results: List[BatchItemAnalysis]
+
+
+BATCH_RESPONSE_FORMAT = json_schema_response_format('batch_sentence_analysis', BatchAnalysis)
+batch_analysis_adapter = TypeAdapter(BatchAnalysis)
+
+
+def plan_batches(sentences: List[str], max_chars: Optional[int] = None, max_items: Optional[int] = None) -> List[List[int]]:
+    """
+    입력 길이에 따라 문장들을 배치로 묶는다 (문장 인덱스 리스트의 리스트 반환)
+
+    응답 길이는 대략 입력 길이에 비례하므로 문자 수 합계가 max_chars를 넘지 않도록 묶고,
+    한 문장이 max_chars보다 길면 단독 배치로 보낸다.
+    """
+    max_chars = max_chars or settings.ANALYSIS_BATCH_MAX_CHARS
+    max_items = max_items or settings.ANALYSIS_BATCH_MAX_ITEMS
+
+    batches = []
+    current = []
+    current_chars = 0
+    for index, sentence in enumerate(sentences):
+        length = len(sentence)
+        if current and (current_chars + length > max_chars or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(index)
+        current_chars += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_structured_batch(content: str, size: int) -> Optional[List[Optional[dict]]]:
+    """strict 스키마 응답을 한 번에 검증 (실패하면 None → 항목별 파싱으로 대체)"""
+    try:
+        parsed = batch_analysis_adapter.validate_json(content)
+    except ValidationError as e:
+        logger.warning(f"배치 응답 스키마 검증 실패, 항목별로 다시 파싱: {e}")
+        return None
+
+    results = [None] * size
+    for item in parsed.results:
+        if not 0 <= item.index < size or results[item.index] is not None:
+            logger.warning(f"배치 응답의 잘못된 index: {item.index}")
+            continue
+        results[item.index] = item.model_dump(exclude={'index'})
+    return results
+
+
+def _parse_batch_content(content: str, size: int, structured: bool = False) -> List[Optional[dict]]:
+    """배치 응답을 파싱해서 index 순서의 결과 리스트로 변환 (검증 실패/누락 항목은 None)"""
+    if structured:
+        results = _parse_structured_batch(content, size)
+        if results is not None:
+            return results
+
+    results = [None] * size
+
+    try:
+        parsed_json = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.error(f"배치 JSON 파싱 실패: {e}")
+        return results
+
+    items = parsed_json.get('results') if isinstance(parsed_json, dict) else None
+    if not isinstance(items, list):
+        logger.error("배치 응답에 results 배열이 없음")
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.pop('index', position)
+        if not isinstance(index, int) or not 0 <= index < size or results[index] is not None:
+            logger.warning(f"배치 응답의 잘못된 index: {index}")
+            continue
+        try:
+            results[index] = SentenceAnalysis(**item).dict()
+        except ValidationError as e:
+            logger.warning(f"배치 항목 {index} 구조 검증 실패: {e}")
+    return results
+
+
+def call_gpt_for_batch(sentences: List[str], language: str = 'english') -> List[Optional[dict]]:
+    """
+    여러 문장을 하나의 요청으로 분석하여 입력 순서대로 반환하는 함수
+    배치 응답에서 누락되거나 검증에 실패한 문장은 call_gpt_for_sentence로 개별 재분석한다.
+
+    Args:
+        sentences (list): 분석할 문장 리스트
+        language (str): 언어 코드 ('english', 'chinese', 'spanish')
+
+    Returns:
+        list: 문장별 분석 결과 (실패 시 해당 위치는 None)
+    """
+    if not sentences:
+        return []
+    if len(sentences) == 1:
+        return [call_gpt_for_sentence(sentences[0], language)]
+
+    results = [None] * len(sentences)
+
+    try:
+        prompt = load_batch_prompt_for_language(language, sentences)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"배치 프롬프트 로드 실패: {e}")
+        prompt = None
+
+    if prompt:
+        structured = structured_outputs_enabled()
+        route = route_batch(sentences, language)
+        started = time.monotonic()
+        response = None
+        try:
+            logger.info(f"GPT 배치 API 호출 ({len(sentences)}문장)")
+            response = get_llm_client().complete(
+                prompt,
+                model=route.model,
+                max_tokens=route.max_tokens,
+                temperature=0.1,
+                response_format=BATCH_RESPONSE_FORMAT if structured else {"type": "json_object"}
+            )
+            results = _parse_batch_content(response.content, len(sentences), structured)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"GPT 배치 API 오류: {e}")
+        finally:
+            get_telemetry().record_call(
+                'batch',
+                response.model if response else route.model,
+                language,
+                time.monotonic() - started,
+                1,
+                prompt_tokens=response.prompt_tokens if response else 0,
+                completion_tokens=response.completion_tokens if response else 0,
+                ok=response is not None and any(result is not None for result in results),
+            )
+
+    # 배치에서 얻지 못한 문장만 단일 문장 분석으로 대체
+    for index, result in enumerate(results):
+        if result is None:
+            logger.info(f"배치 항목 {index} 단일 분석으로 재시도")
+            results[index] = call_gpt_for_sentence(sentences[index], language)
+
+    return results
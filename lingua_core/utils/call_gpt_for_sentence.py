@@ -1,13 +1,16 @@
-import openai
-import os
+import json
+import time
 import logging
+import threading
 import traceback
-from dotenv import load_dotenv
-from pydantic import BaseModel, ValidationError
+from django.conf import settings
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List, Optional
 from .prompt_loader import load_prompt_for_language
+from .llm_client import LLMDeadlineExceeded, LLMUnavailableError, get_llm_client
+from .model_router import ModelRoute, route_sentence
+from .telemetry import get_telemetry
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 # Pydantic 모델로 JSON 구조 강제
@@ -23,7 +26,109 @@ class SentenceAnalysis(BaseModel):
     meaning: str
     words: List[WordAnalysis]
 
-def call_gpt_for_sentence(sentence, language='english', max_retries=3):
+
+def strict_json_schema(model) -> dict:
+    """
+    pydantic 모델의 JSON 스키마를 OpenAI structured outputs(strict) 형식으로 변환
+    - 모든 객체는 additionalProperties: false, 모든 속성을 required로 (Optional은 null 허용으로 표현됨)
+    - strict 모드에서 쓰지 않는 title/default 제거
+    """
+    def convert(node):
+        if isinstance(node, list):
+            return [convert(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        converted = {key: convert(value) for key, value in node.items() if key not in ('title', 'default')}
+        if converted.get('type') == 'object' and 'properties' in converted:
+            converted['additionalProperties'] = False
+            converted['required'] = list(converted['properties'].keys())
+        return converted
+
+    return convert(model.model_json_schema())
+
+
+def json_schema_response_format(name: str, model) -> dict:
+    """response_format 파라미터 (json_schema, strict)"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": strict_json_schema(model)},
+    }
+
+
+# 모듈 로드 시 한 번만 만드는 스키마/검증기 (응답 원문을 json.loads 없이 바로 검증)
+SENTENCE_RESPONSE_FORMAT = json_schema_response_format('sentence_analysis', SentenceAnalysis)
+sentence_analysis_adapter = TypeAdapter(SentenceAnalysis)
+
+
+def structured_outputs_enabled() -> bool:
+    """LLM_RESPONSE_FORMAT이 json_schema이면 strict 스키마로 응답을 강제"""
+    return settings.LLM_RESPONSE_FORMAT == 'json_schema'
+
+
+# 재시도율 집계 (프로세스 단위)
+_retry_stats_lock = threading.Lock()
+_retry_stats = {
+    'calls': 0,
+    'attempts': 0,
+    'succeeded': 0,
+    'parse_errors': 0,
+    'validation_errors': 0,
+    'api_errors': 0,
+    'expanded': 0,  # 응답이 잘려서 max_tokens를 늘려 재시도
+    'escalated': 0,  # 검증 실패로 더 강한 모델로 재시도
+}
+
+
+def _incr_retry_stat(name: str) -> None:
+    with _retry_stats_lock:
+        _retry_stats[name] += 1
+
+
+def get_retry_stats() -> dict:
+    """문장 분석 호출/시도/실패 유형별 횟수와 재시도율 (시도 중 첫 시도가 아닌 비율)"""
+    with _retry_stats_lock:
+        stats = dict(_retry_stats)
+    stats['retry_rate'] = round((stats['attempts'] - stats['calls']) / stats['attempts'], 4) if stats['attempts'] else 0.0
+    stats['response_format'] = settings.LLM_RESPONSE_FORMAT
+    return stats
+
+def _reroute(route: ModelRoute, response) -> ModelRoute:
+    """
+    응답 검증 실패 후 다음 시도의 경로
+    max_tokens에서 잘린 응답이면 같은 모델로 상한만 늘리고, 그 외에는 더 강한 모델로 승격 (한 번만)
+    """
+    if response.finish_reason == 'length' and route.max_tokens < settings.LLM_MAX_TOKENS:
+        _incr_retry_stat('expanded')
+        next_route = route.expand()
+    elif route.can_escalate():
+        _incr_retry_stat('escalated')
+        next_route = route.escalate()
+    else:
+        return route
+    logger.info(f"모델 경로 변경: {route.model}/{route.max_tokens} -> {next_route.model}/{next_route.max_tokens}")
+    return next_route
+
+def merge_known_words(parsed_json, known_words):
+    """
+    응답에서 meaning이 생략된 이미 학습한 단어에 저장된 의미/품사를 채워 넣음
+
+    Args:
+        parsed_json (dict): 파싱된 GPT 응답
+        known_words (dict): {단어원형: {meaning, pos, others}}
+    """
+    words = parsed_json.get('words') if isinstance(parsed_json, dict) else None
+    if not isinstance(words, list):
+        return
+    for word in words:
+        if not isinstance(word, dict) or word.get('meaning'):
+            continue
+        known = known_words.get(str(word.get('text', '')).lower())
+        if known:
+            word['meaning'] = known['meaning']
+            word['pos'] = word.get('pos') or known.get('pos') or None
+            word['others'] = word.get('others') or known.get('others') or None
+
+def call_gpt_for_sentence(sentence, language='english', max_retries=3, model=None, known_words=None, timeout=None, hedge=None):
     """
     문장을 분석하여 JSON 형태로 반환하는 함수
     
@@ -31,72 +136,154 @@ def call_gpt_for_sentence(sentence, language='english', max_retries=3):
         sentence (str): 분석할 문장
         language (str): 언어 코드 ('english', 'chinese', 'spanish')
         max_retries (int): 최대 재시도 횟수
+        model (str): 사용할 모델 (기본값은 문장 크기/복잡도로 model_router가 선택, 지정하면 승격하지 않음)
+        known_words (dict): 사용자가 이미 학습한 단어 {단어원형: {meaning, pos, others}}
+            프롬프트에 힌트로 넣어 해당 단어의 의미 생성을 생략시키고, 응답에 저장된 의미를 채운다.
+        timeout (float): 재시도를 포함한 전체 마감 시간 (초, 기본값 settings.LLM_CALL_DEADLINE, 0이면 제한 없음)
+        hedge (bool): 느린 호출을 한 번 더 보내는 hedging 사용 여부 (기본값 settings.LLM_HEDGE_ENABLED)
         
     Returns:
         dict: 분석 결과 또는 None (실패 시)
+
+    Raises:
+        LLMUnavailableError: 회로 차단/속도 제한으로 호출할 수 없을 때 (재시도하지 않음)
+        LLMDeadlineExceeded: 마감 시간까지 분석하지 못했을 때
     """
-    # 환경변수 또는 settings에서 OPENAI_API_KEY를 불러오세요.
-    openai.api_key = os.getenv('OPENAI_API_KEY')
+    client = get_llm_client()
+    timeout = settings.LLM_CALL_DEADLINE if timeout is None else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    # 문장 크기/복잡도에 맞는 모델과 응답 토큰 상한 (검증 실패 시 _reroute로 변경)
+    route = route_sentence(sentence, language, model)
+    logger.info(f"모델 경로: {route.tier} {route.model} (max_tokens={route.max_tokens}, 크기 {route.units})")
     
     # 입력 문장의 따옴표 전처리
     sentence = sentence.replace('"', '\\"').replace("'", "\\'")
     logger.info(f"전처리된 문장: {sentence}")
     
-    for attempt in range(max_retries):
-        logger.info(f"시도 {attempt + 1}/{max_retries}")
-        
-        try:
-            # 프롬프트 로더를 사용하여 언어별 프롬프트 로드
-            prompt = load_prompt_for_language(language, sentence)
-            logger.info(f"{language} 문장 분석: {sentence}")
-        except (FileNotFoundError, ValueError) as e:
-            logger.error(f"프롬프트 로드 실패: {e}")
-            return None
+    hints = [{'text': text, 'meaning': sense['meaning']} for text, sense in (known_words or {}).items()]
+    
+    try:
+        # 프롬프트 레지스트리의 컴파일된 템플릿으로 한 번만 만들고 재시도에서 재사용
+        prompt = load_prompt_for_language(language, sentence, hints)
+        logger.info(f"{language} 문장 분석: {sentence}")
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"프롬프트 로드 실패: {e}")
+        return None
+    
+    structured = structured_outputs_enabled()
+    response_format = SENTENCE_RESPONSE_FORMAT if structured else {"type": "json_object"}
+    _incr_retry_stat('calls')
+    
+    # 호출 지표 (재시도 포함 전체 소요 시간, 시도 수, 토큰)
+    started = time.monotonic()
+    usage = {'ok': False, 'attempts': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'model': route.model}
+    
+    try:
+        for attempt in range(max_retries):
+            logger.info(f"시도 {attempt + 1}/{max_retries}")
+            _incr_retry_stat('attempts')
+            usage['attempts'] += 1
         
-        try:
-            logger.info(f"GPT API 호출")
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",  # 올바른 모델명으로 수정
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,  # 더 일관된 출력을 위해 낮춤
-                max_tokens=5000,  # 긴 문장과 많은 단어를 위해 증가
-                response_format={"type": "json_object"}
-            )
-            content = response.choices[0].message.content
-            logger.info(f"GPT 원시 응답: {content}")
-            
-            import re, json
-            # response_format으로 JSON을 강제했으므로 전체 content를 JSON으로 파싱
             try:
-                parsed_json = json.loads(content)
-                logger.info(f"JSON 파싱 성공: {parsed_json}")
+                logger.info(f"GPT API 호출 ({client.provider_name})")
+                response = client.complete_hedged(
+                    prompt,
+                    deadline=deadline,
+                    hedge=hedge,
+                    model=route.model,
+                    max_tokens=route.max_tokens,
+                    temperature=0.1,  # 더 일관된 출력을 위해 낮춤
+                    response_format=response_format
+                )
+                content = response.content
+                usage['model'] = response.model
+                usage['prompt_tokens'] += response.prompt_tokens
+                usage['completion_tokens'] += response.completion_tokens
+                logger.debug(f"GPT 원시 응답: {content}")
+            
+                if structured:
+                    # strict 스키마로 구조가 보장되므로 원문을 미리 만든 검증기로 한 번에 파싱/검증
+                    try:
+                        result = sentence_analysis_adapter.validate_json(content).model_dump()
+                    except ValidationError as e:
+                        invalid_json = any(error['type'] == 'json_invalid' for error in e.errors())
+                        _incr_retry_stat('parse_errors' if invalid_json else 'validation_errors')
+                        logger.error(f"시도 {attempt + 1} - 응답 검증 실패: {e}")
+                        if attempt == max_retries - 1:  # 마지막 시도
+                            logger.error(f"검증 실패한 응답: {content}")
+                        route = _reroute(route, response)
+                        continue  # 다음 시도로
                 
-                # Pydantic 모델로 유효성 검사
-                validated_data = SentenceAnalysis(**parsed_json)
-                logger.info(f"JSON 구조 검증 성공")
-                return validated_data.dict()
+                    # 이미 학습한 단어는 빈 meaning으로 오므로 저장된 의미로 채움
+                    if known_words:
+                        merge_known_words(result, known_words)
+                    _incr_retry_stat('succeeded')
+                    usage['ok'] = True
+                    return result
+            
+                # response_format으로 JSON을 강제했으므로 전체 content를 JSON으로 파싱
+                try:
+                    parsed_json = json.loads(content)
+                    logger.debug(f"JSON 파싱 성공: {parsed_json}")
                 
-            except ValidationError as e:
-                logger.error(f"시도 {attempt + 1} - JSON 구조 검증 실패: {e}")
-                if attempt == max_retries - 1:  # 마지막 시도
-                    logger.error(f"검증 실패한 데이터: {parsed_json}")
-                continue  # 다음 시도로
+                    if known_words:
+                        merge_known_words(parsed_json, known_words)
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"시도 {attempt + 1} - JSON 파싱 실패: {e}")
+                    # Pydantic 모델로 유효성 검사
+                    validated_data = SentenceAnalysis(**parsed_json)
+                    logger.info(f"JSON 구조 검증 성공")
+                    _incr_retry_stat('succeeded')
+                    usage['ok'] = True
+                    return validated_data.dict()
+                
+                except ValidationError as e:
+                    _incr_retry_stat('validation_errors')
+                    logger.error(f"시도 {attempt + 1} - JSON 구조 검증 실패: {e}")
+                    if attempt == max_retries - 1:  # 마지막 시도
+                        logger.error(f"검증 실패한 데이터: {parsed_json}")
+                    route = _reroute(route, response)
+                    continue  # 다음 시도로
+                
+                except json.JSONDecodeError as e:
+                    _incr_retry_stat('parse_errors')
+                    logger.error(f"시도 {attempt + 1} - JSON 파싱 실패: {e}")
+                    if attempt == max_retries - 1:  # 마지막 시도
+                        logger.error(f"문제가 된 JSON: {content}")
+                    route = _reroute(route, response)
+                    continue  # 다음 시도로
+                
+            except (LLMUnavailableError, LLMDeadlineExceeded) as e:
+                logger.error(f"GPT API 호출 불가: {e}")
+                raise
+
+            except Exception as e:
+                _incr_retry_stat('api_errors')
+                logger.error(f"시도 {attempt + 1} - GPT API 오류: {e}")
                 if attempt == max_retries - 1:  # 마지막 시도
-                    logger.error(f"문제가 된 JSON: {content}")
+                    traceback.print_exc()
+                else:
+                    # 모든 워커가 동시에 재시도하지 않도록 백오프 후 재시도
+                    delay = client.retry_delay(e, attempt)
+                    if deadline is not None and time.monotonic() + delay >= deadline:
+                        raise LLMDeadlineExceeded(f"재시도할 시간이 남지 않았습니다: {e}")
+                    logger.info(f"{delay:.2f}초 후 재시도")
+                    time.sleep(delay)
                 continue  # 다음 시도로
-                
-        except Exception as e:
-            logger.error(f"시도 {attempt + 1} - GPT API 오류: {e}")
-            if attempt == max_retries - 1:  # 마지막 시도
-                traceback.print_exc()
-            continue  # 다음 시도로
     
-    # 모든 시도 실패
-    logger.error(f"모든 시도 실패: {sentence}")
-    return None
+        # 모든 시도 실패
+        logger.error(f"모든 시도 실패: {sentence}")
+        return None
+    finally:
+        get_telemetry().record_call(
+            'sentence',
+            usage['model'],
+            language,
+            time.monotonic() - started,
+            usage['attempts'],
+            prompt_tokens=usage['prompt_tokens'],
+            completion_tokens=usage['completion_tokens'],
+            ok=usage['ok'],
+        )
     
 
 if __name__ == "__main__":
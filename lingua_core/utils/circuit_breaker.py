@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import fcntl
+import random
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 호출 전 확인 (Redis 서버 시간 기준)
+# 반환: '0' 호출 가능, 양수 회로가 열려 있는 남은 시간(초), '-1' 다른 워커가 시험 호출 중
+BREAKER_CHECK_SCRIPT = """
+local key = KEYS[1]
+local cooldown = tonumber(ARGV[1])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local data = redis.call('HMGET', key, 'state', 'opened_at', 'probe_at')
+local state = data[1] or 'closed'
+if state == 'closed' then
+    return '0'
+end
+
+local probe_at = tonumber(data[3])
+if state == 'open' then
+    local remaining = cooldown - (now - tonumber(data[2]))
+    if remaining > 0 then
+        return tostring(remaining)
+    end
+    redis.call('HSET', key, 'state', 'half_open')
+    probe_at = nil
+end
+
+-- 시험 호출을 맡은 워커가 죽었으면 cooldown 후 다른 워커가 다시 시험
+if probe_at and now - probe_at < cooldown then
+    return '-1'
+end
+redis.call('HSET', key, 'probe_at', now)
+return '0'
+"""
+
+# 호출 결과 기록 (성공/실패를 각각 시각 순 sorted set으로 유지하고 window 밖은 버림)
+# 반환: 상태가 바뀌었으면 새 상태 ('open' | 'closed'), 아니면 ''
+BREAKER_RECORD_SCRIPT = """
+local key, successes_key, failures_key = KEYS[1], KEYS[2], KEYS[3]
+local ok = tonumber(ARGV[1]) == 1
+local window = tonumber(ARGV[2])
+local min_calls = tonumber(ARGV[3])
+local error_rate = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local function open()
+    redis.call('HSET', key, 'state', 'open', 'opened_at', now)
+    redis.call('HDEL', key, 'probe_at')
+    redis.call('DEL', successes_key, failures_key)
+    redis.call('PEXPIRE', key, ttl)
+    return 'open'
+end
+
+local state = redis.call('HGET', key, 'state') or 'closed'
+if state == 'open' then
+    -- 회로가 열리기 전에 시작한 호출의 결과는 무시
+    return ''
+end
+
+local transition = ''
+if state == 'half_open' then
+    if not ok then
+        return open()
+    end
+    redis.call('HSET', key, 'state', 'closed')
+    redis.call('HDEL', key, 'probe_at')
+    redis.call('DEL', successes_key, failures_key)
+    transition = 'closed'
+end
+
+local seq = redis.call('HINCRBY', key, 'seq', 1)
+redis.call('ZADD', ok and successes_key or failures_key, now, seq)
+redis.call('ZREMRANGEBYSCORE', successes_key, '-inf', now - window)
+redis.call('ZREMRANGEBYSCORE', failures_key, '-inf', now - window)
+redis.call('PEXPIRE', key, ttl)
+redis.call('PEXPIRE', successes_key, ttl)
+redis.call('PEXPIRE', failures_key, ttl)
+
+if not ok then
+    local failures = redis.call('ZCARD', failures_key)
+    local total = failures + redis.call('ZCARD', successes_key)
+    if total >= min_calls and failures / total >= error_rate then
+        return open()
+    end
+end
+return transition
+"""
+
+# 성공/실패로 판단할 수 없는 호출이 끝났을 때 시험 호출 자리 반환
+BREAKER_RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') == 'half_open' then
+    redis.call('HDEL', KEYS[1], 'probe_at')
+end
+return 1
+"""
+
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 호출하지 않고 바로 실패"""
+
+
+class RedisBreakerState:
+    """모든 워커/호스트가 공유하는 Redis 회로 상태"""
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.keys = [f"breaker:{name}", f"breaker:{name}:successes", f"breaker:{name}:failures"]
+        self._check = client.register_script(BREAKER_CHECK_SCRIPT)
+        self._record = client.register_script(BREAKER_RECORD_SCRIPT)
+        self._release = client.register_script(BREAKER_RELEASE_SCRIPT)
+
+    def check(self, cooldown: float) -> float:
+        return float(self._check(keys=self.keys[:1], args=[cooldown]))
+
+    def record(self, ok: bool, window: float, min_calls: int, error_rate: float, cooldown: float) -> str:
+        ttl = int((window + cooldown) * 1000) + 1000
+        transition = self._record(keys=self.keys, args=[1 if ok else 0, window, min_calls, error_rate, ttl])
+        return transition.decode() if isinstance(transition, bytes) else transition
+
+    def release(self) -> None:
+        self._release(keys=self.keys[:1])
+
+    def state(self) -> str:
+        state = self.client.hget(self.keys[0], 'state')
+        return state.decode() if state else CLOSED
+
+
+class FileBreakerState:
+    """
+    Redis가 없을 때 같은 호스트의 워커 프로세스들이 공유하는 파일 기반 회로 상태
+    (RedisBreakerState의 스크립트와 같은 규칙, 상태 파일을 fcntl 잠금으로 보호)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+
+    def _update(self, fn):
+        with self._thread_lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    data = json.loads(raw) if raw else {}
+                except ValueError:
+                    data = {}
+                result = fn(data, time.time())
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(data))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def check(self, cooldown: float) -> float:
+        def check(data, now):
+            state = data.get('state', CLOSED)
+            if state == CLOSED:
+                return 0.0
+            probe_at = data.get('probe_at')
+            if state == OPEN:
+                remaining = cooldown - (now - data['opened_at'])
+                if remaining > 0:
+                    return remaining
+                data['state'] = HALF_OPEN
+                probe_at = None
+            if probe_at is not None and now - probe_at < cooldown:
+                return -1.0
+            data['probe_at'] = now
+            return 0.0
+
+        return self._update(check)
+
+    def record(self, ok: bool, window: float, min_calls: int, error_rate: float, cooldown: float) -> str:
+        def record(data, now):
+            state = data.get('state', CLOSED)
+            if state == OPEN:
+                return ''
+
+            def open_():
+                data.update(state=OPEN, opened_at=now, probe_at=None, outcomes=[])
+                return OPEN
+
+            transition = ''
+            if state == HALF_OPEN:
+                if not ok:
+                    return open_()
+                data.update(state=CLOSED, probe_at=None, outcomes=[])
+                transition = CLOSED
+
+            outcomes = [outcome for outcome in data.get('outcomes', []) if outcome[0] >= now - window]
+            outcomes.append([now, ok])
+            data['outcomes'] = outcomes
+            if not ok:
+                failures = sum(1 for _, succeeded in outcomes if not succeeded)
+                if len(outcomes) >= min_calls and failures / len(outcomes) >= error_rate:
+                    return open_()
+            return transition
+
+        return self._update(record)
+
+    def release(self) -> None:
+        def release(data, now):
+            if data.get('state') == HALF_OPEN:
+                data['probe_at'] = None
+
+        self._update(release)
+
+    def state(self) -> str:
+        return self._update(lambda data, now: data.get('state', CLOSED))
+
+
+class CircuitBreaker:
+    """
+    최근 호출의 오류율로 동작하는 회로 차단기 (모든 워커가 상태를 공유)
+    Redis에 상태를 두고, Redis가 없거나 장애 시 파일 기반 상태로 대체한다. (rate_limiter와 같은 방식)
+
+    - closed: 정상 호출, window 초 동안의 호출 중 오류율이 threshold 이상이면 open
+    - open: cooldown 초 동안 모든 호출을 CircuitOpenError로 즉시 실패
+    - half-open: cooldown 이후 시험 호출 하나만 허용 (모든 워커 중 하나), 성공하면 closed, 실패하면 다시 open
+    """
+    CLOSED = CLOSED
+    OPEN = OPEN
+    HALF_OPEN = HALF_OPEN
+
+    def __init__(self, name: str, error_rate: float, min_calls: int, window: float, cooldown: float):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+
+        self._redis_state = None
+        state_dir = settings.LLM_RATE_LIMIT_STATE_DIR or tempfile.gettempdir()
+        self._file_state = FileBreakerState(os.path.join(state_dir, f"wu-breaker-{name}"))
+
+    def _backend(self):
+        client = get_redis()
+        if client is None:
+            return self._file_state
+        if self._redis_state is None or self._redis_state.client is not client:
+            self._redis_state = RedisBreakerState(client, self.name)
+        return self._redis_state
+
+    def _call(self, method: str, *args):
+        backend = self._backend()
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as e:
+            if backend is self._file_state:
+                raise
+            logger.warning(f"Redis 회로 차단기 실패, 파일 상태로 대체: {e}")
+            return getattr(self._file_state, method)(*args)
+
+    @property
+    def state(self) -> str:
+        return self._call('state')
+
+    def before_call(self) -> None:
+        """호출 전에 확인 (열려 있으면 CircuitOpenError)"""
+        remaining = self._call('check', self.cooldown)
+        if remaining > 0:
+            raise CircuitOpenError(
+                f"LLM 공급자 오류율이 높아 호출을 일시 중단했습니다. {remaining:.0f}초 후 다시 시도해주세요."
+            )
+        if remaining < 0:
+            raise CircuitOpenError("LLM 공급자 상태를 확인하는 중입니다. 잠시 후 다시 시도해주세요.")
+
+    def _record(self, ok: bool) -> None:
+        transition = self._call('record', ok, self.window, self.min_calls, self.error_rate, self.cooldown)
+        if transition == OPEN:
+            logger.error(f"회로 차단기 {self.name}: 오류율 초과로 {self.cooldown}초 동안 차단 (open)")
+        elif transition == CLOSED:
+            logger.info(f"회로 차단기 {self.name}: 복구됨 (closed)")
+
+    def record_success(self) -> None:
+        self._record(True)
+
+    def record_failure(self) -> None:
+        self._record(False)
+
+    def release(self) -> None:
+        """성공/실패로 판단할 수 없는 호출이 끝났을 때 시험 호출 자리를 반환"""
+        self._call('release')
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """지수 백오프 + full jitter 대기 시간 (attempt는 0부터)"""
+    base = settings.LLM_BACKOFF_BASE if base is None else base
+    cap = settings.LLM_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_llm_circuit_breaker() -> CircuitBreaker:
+    """LLM 호출용 CircuitBreaker 싱글톤 반환"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    'llm',
+                    error_rate=settings.LLM_BREAKER_ERROR_RATE,
+                    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                    window=settings.LLM_BREAKER_WINDOW,
+                    cooldown=settings.LLM_BREAKER_COOLDOWN,
+                )
+    return _breaker
@@ -0,0 +1,169 @@
+import re
+import math
+import json
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from .call_gpt_for_sentence import call_gpt_for_sentence
+from .prompt_loader import prompt_loader
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+CJK_PATTERN = re.compile(r'[一-鿿]+')
+# 중국어 단어는 띄어쓰기가 없으므로 이 길이까지의 연속 글자 조합을 후보로 사용
+CJK_MAX_WORD_LENGTH = 4
+# 여러 단어로 된 학습 단어(구동사, 숙어)를 찾을 때 비교할 연속 단어 수 상한
+MAX_PHRASE_WORDS = 6
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 추정 (UTF-8 4바이트당 1토큰)"""
+    return math.ceil(len(text.encode('utf-8')) / 4)
+
+
+def phrase_length(text: str) -> int:
+    """학습 단어의 단어 수 (구동사/숙어는 2 이상)"""
+    return len(TOKEN_PATTERN.findall(text)) or 1
+
+
+def candidate_words(sentence: str, max_phrase_words: int = 1) -> set:
+    """
+    문장에서 저장된 단어(Word.text)와 비교할 후보 단어들 (소문자)
+    max_phrase_words가 2 이상이면 공백으로 이은 연속 단어(n-gram)도 후보에 넣는다. (give up, look forward to)
+    """
+    tokens = [token.lower() for token in TOKEN_PATTERN.findall(sentence)]
+    candidates = set(tokens)
+    for token in tokens:
+        for run in CJK_PATTERN.findall(token):
+            for size in range(1, min(CJK_MAX_WORD_LENGTH, len(run)) + 1):
+                candidates.update(run[i:i + size] for i in range(len(run) - size + 1))
+    for size in range(2, min(max_phrase_words, MAX_PHRASE_WORDS) + 1):
+        candidates.update(' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+    return candidates
+
+
+def longest_phrase(user) -> int:
+    """사용자의 학습 단어 중 가장 긴 구의 단어 수 (공백 수 + 1, 한 번의 집계 쿼리)"""
+    from django.db.models import F, Max, Value
+    from django.db.models.functions import Length, Replace
+    from lingua_management.models import Word
+
+    spaces = Word.objects.filter(user=user, text__contains=' ').aggregate(
+        spaces=Max(Length('text') - Length(Replace(F('text'), Value(' '), Value(''))))
+    )['spaces']
+    return (spaces or 0) + 1
+
+
+class KnownWordHints:
+    """
+    사용자가 이미 학습한 단어의 의미(SentenceWord.meaning/pos)를 분석 프롬프트의 힌트로 사용
+    모델은 이 단어들의 의미 생성을 생략하고, 응답에는 저장된 의미를 채워 넣는다.
+    요청 하나 동안 여러 스레드에서 공유하므로 통계는 잠금으로 보호한다.
+    """
+
+    def __init__(self, senses: Optional[Dict[str, dict]] = None):
+        self.senses = senses or {}
+        self.max_phrase_words = max((phrase_length(text) for text in self.senses), default=1)
+        self._lock = threading.Lock()
+        self.hinted_words = 0
+        self.merged_words = 0
+        self.estimated_tokens_saved = 0
+        self.estimated_hint_tokens = 0
+
+    @classmethod
+    def for_user(cls, user, language: str, sentences: Iterable[str]) -> 'KnownWordHints':
+        """
+        요청 문장들에 나오는 사용자의 학습 단어를 조회 (단어별 가장 최근 의미 사용)
+        가장 긴 구의 단어 수를 먼저 구해 그 길이까지의 연속 단어를 후보로 비교한다. (쿼리 2번)
+        """
+        from lingua_management.models import SentenceWord
+
+        if user is None or not getattr(user, 'is_authenticated', False):
+            return cls()
+
+        max_phrase_words = longest_phrase(user)
+        candidates = set()
+        for sentence in sentences:
+            candidates |= candidate_words(sentence, max_phrase_words)
+        if not candidates:
+            return cls()
+
+        links = (
+            SentenceWord.objects.filter(
+                word__user=user,
+                word__text__in=candidates,
+                sentence__wordbook__language=language,
+            )
+            .exclude(meaning='')
+            .order_by('word_id', '-id')
+            .values('word__text', 'word__others', 'meaning', 'pos')
+        )
+        senses = {}
+        for link in links:
+            text = link['word__text'].lower()
+            if text not in senses:
+                senses[text] = {
+                    'meaning': link['meaning'],
+                    'pos': link['pos'] or None,
+                    'others': link['word__others'] or None,
+                }
+        logger.info(f"학습 단어 힌트: 후보 {len(candidates)}개 중 {len(senses)}개 발견")
+        return cls(senses)
+
+    def select(self, sentence: str) -> Dict[str, dict]:
+        """문장에 나오는 학습 단어만 골라 반환"""
+        if not self.senses:
+            return {}
+        return {
+            text: self.senses[text]
+            for text in candidate_words(sentence, self.max_phrase_words)
+            if text in self.senses
+        }
+
+    def analyze(self, sentence: str, language: str = 'english') -> Optional[dict]:
+        """
+        학습 단어를 힌트로 넣어 문장을 분석 (cached_call_gpt_for_sentence(hints=...)가 학습 단어가 있는 문장에만 호출)
+        결과에 사용자의 의미가 들어가므로 공유 분석 캐시에는 저장하지 않는다.
+        """
+        known = self.select(sentence)
+        result = call_gpt_for_sentence(sentence, language, known_words=known or None)
+        if known and result:
+            self._record(result, known)
+        return result
+
+    def _record(self, result: dict, known: Dict[str, dict]) -> None:
+        """
+        저장된 의미로 채운 단어 수, 생략된 출력 토큰과 힌트로 늘어난 입력 토큰 추정
+        힌트 없이 분석한 기준 응답이 없으므로 실제 사용량(usage)이 아닌 UTF-8 바이트 기준 추정값이다.
+        """
+        merged = 0
+        saved = 0
+        for word in result.get('words', []):
+            sense = known.get(word.get('text', '').lower())
+            if sense and word.get('meaning') == sense['meaning']:
+                merged += 1
+                saved += estimate_tokens(json.dumps(
+                    {'meaning': sense['meaning'], 'pos': sense.get('pos')}, ensure_ascii=False
+                ))
+        hint_cost = estimate_tokens(prompt_loader.load_known_words_hint(
+            [{'text': text, 'meaning': sense['meaning']} for text, sense in known.items()]
+        ))
+
+        with self._lock:
+            self.hinted_words += len(known)
+            self.merged_words += merged
+            self.estimated_tokens_saved += saved
+            self.estimated_hint_tokens += hint_cost
+
+    def summary(self) -> dict:
+        """요청 단위 지표 (응답에 포함)"""
+        with self._lock:
+            return {
+                'known_words': len(self.senses),
+                'hinted_words': self.hinted_words,
+                'merged_words': self.merged_words,
+                'estimated_tokens_saved': self.estimated_tokens_saved,  # 생략된 출력 토큰 (추정)
+                'estimated_hint_tokens': self.estimated_hint_tokens,  # 힌트로 늘어난 입력 토큰 (추정)
+            }
@@ -0,0 +1,30 @@
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    """최근 N개 호출의 소요 시간(초)을 보관하고 백분위수를 계산 (프로세스 단위)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """
+        q 백분위수 (0~100, nearest-rank), 표본이 min_samples보다 적으면 None
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
@@ -0,0 +1,437 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from .circuit_breaker import CircuitOpenError, backoff_delay, get_llm_circuit_breaker
+from .latency import LatencyTracker
+from .rate_limiter import get_llm_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """회로 차단/속도 제한으로 LLM을 호출할 수 없음 (재시도하지 않고 바로 실패)"""
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """호출 마감 시간까지 응답을 받지 못함 (재시도하지 않고 바로 실패)"""
+
+
+@dataclass
+class LLMResponse:
+    """LLM 호출 결과 (공급자와 무관한 공통 형식)"""
+    content: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    finish_reason: Optional[str] = None  # length면 max_tokens에서 응답이 잘린 것
+
+
+class OpenAIProvider:
+    """
+    OpenAI Chat Completions 공급자
+    프로세스당 하나의 httpx 연결 풀(keep-alive)을 재사용하고, 재시도는 호출하는 쪽에서 처리한다.
+    """
+    name = 'openai'
+
+    def __init__(self):
+        import httpx
+        import openai
+
+        timeout = httpx.Timeout(
+            settings.LLM_READ_TIMEOUT,
+            connect=settings.LLM_CONNECT_TIMEOUT,
+        )
+        http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        self.client = openai.OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            timeout=timeout,
+            max_retries=0,
+        )
+
+    @staticmethod
+    def is_transient(exc: Exception) -> bool:
+        """과부하/네트워크 오류 여부 (회로 차단기 오류율에 반영)"""
+        import openai
+
+        return isinstance(exc, (
+            openai.RateLimitError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.InternalServerError,
+        ))
+
+    @staticmethod
+    def retry_after(exc: Exception) -> Optional[float]:
+        """429/503 응답의 Retry-After 헤더 (초)"""
+        response = getattr(exc, 'response', None)
+        value = response.headers.get('retry-after') if response is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[dict],
+        timeout: Optional[float] = None,
+    ) -> LLMResponse:
+        kwargs = {}
+        if response_format:
+            kwargs['response_format'] = response_format
+        if timeout is not None:
+            # 호출 마감 시간이 기본 read timeout보다 짧으면 그 시간만 기다림
+            kwargs['timeout'] = min(timeout, settings.LLM_READ_TIMEOUT)
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+        usage = getattr(response, 'usage', None)
+        return LLMResponse(
+            content=response.choices[0].message.content,
+            model=getattr(response, 'model', model),
+            prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+            completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+            finish_reason=response.choices[0].finish_reason,
+        )
+
+
+class StubProvider:
+    """
+    네트워크 없이 동작하는 결정적(deterministic) 공급자 (부하 테스트/CI용)
+    프롬프트에서 분석할 문장을 찾아 SentenceAnalysis 형식의 JSON을 만들어 반환한다.
+    LLM_STUB_LATENCY(초)만큼 지연해서 실제 호출 시간을 흉내낼 수 있다.
+    """
+    name = 'stub'
+
+    SINGLE_PATTERN = re.compile(r'^문장: "(.*)"\s*$', re.MULTILINE)
+    BATCH_PATTERN = re.compile(r'^문장 목록 \(JSON 배열\): (\[.*\])\s*$', re.MULTILINE)
+    KNOWN_WORDS_PATTERN = re.compile(r'^이미 학습한 단어 \(JSON 배열\): (\[.*\])\s*$', re.MULTILINE)
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+    CJK_PATTERN = re.compile(r'[一-鿿]')
+
+    def __init__(self):
+        self.latency = settings.LLM_STUB_LATENCY
+
+    @staticmethod
+    def is_transient(exc: Exception) -> bool:
+        """시간 초과/연결 오류만 과부하로 봄 (OpenAIProvider와 같은 기준, 그 외 예외는 회로 차단기에 반영하지 않음)"""
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+    @staticmethod
+    def retry_after(exc: Exception) -> Optional[float]:
+        return None
+
+    def _analyze(self, sentence: str, known: frozenset = frozenset()) -> dict:
+        tokens = []
+        seen = set()
+        for token in self.TOKEN_PATTERN.findall(sentence):
+            # 중국어는 띄어쓰기가 없으므로 글자 단위로 나눈다
+            parts = self.CJK_PATTERN.findall(token) if self.CJK_PATTERN.search(token) else [token]
+            for part in parts:
+                if part.lower() not in seen:
+                    seen.add(part.lower())
+                    tokens.append(part)
+        words = []
+        for token in tokens:
+            # 이미 학습한 단어는 힌트 프롬프트의 규칙대로 meaning을 비워서 반환
+            if token.lower() in known:
+                words.append({'original_text': token, 'text': token.lower(), 'meaning': '', 'pos': None, 'others': None})
+            else:
+                words.append({
+                    'original_text': token,
+                    'text': token.lower(),
+                    'meaning': f"[stub] {token.lower()}",
+                    'pos': 'stub',
+                    'others': None,
+                })
+        return {
+            'text': sentence,
+            'meaning': f"[stub] {sentence}",
+            'words': words,
+        }
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[dict],
+        timeout: Optional[float] = None,
+    ) -> LLMResponse:
+        if self.latency:
+            if timeout is not None and self.latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError(f"stub 응답 시간 초과 ({timeout:.1f}초)")
+            time.sleep(self.latency)
+
+        batch_match = self.BATCH_PATTERN.search(prompt)
+        if batch_match:
+            items = json.loads(batch_match.group(1))
+            payload = {
+                'results': [dict(self._analyze(item['text']), index=item['index']) for item in items]
+            }
+        else:
+            single_match = self.SINGLE_PATTERN.search(prompt)
+            sentence = single_match.group(1) if single_match else ''
+            # call_gpt_for_sentence가 이스케이프한 따옴표 복원
+            sentence = sentence.replace('\\"', '"').replace("\\'", "'")
+            known_match = self.KNOWN_WORDS_PATTERN.search(prompt)
+            known = frozenset(item['text'] for item in json.loads(known_match.group(1))) if known_match else frozenset()
+            payload = self._analyze(sentence, known)
+
+        content = json.dumps(payload, ensure_ascii=False)
+        finish_reason = 'stop'
+        if len(content) // 4 > max_tokens:
+            # 실제 모델처럼 max_tokens에서 응답을 자름
+            content = content[:max_tokens * 4]
+            finish_reason = 'length'
+        return LLMResponse(
+            content=content,
+            model=f"stub:{model}",
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            finish_reason=finish_reason,
+        )
+
+
+PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+class LLMClient:
+    """
+    설정된 공급자로 LLM을 호출하는 클라이언트 (모델/토큰 수는 호출마다 지정 가능)
+    모든 호출은 워커 간 공유 속도 제한과 회로 차단기를 거친다.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.rate_limiter = get_llm_rate_limiter()
+        self.breaker = get_llm_circuit_breaker()
+        # 문장 분석 호출의 최근 소요 시간 (hedging 기준)
+        self.latency = LatencyTracker(window=settings.LLM_LATENCY_WINDOW)
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=max(2, settings.LLM_MAX_INFLIGHT_PER_WORKER * 2),
+            thread_name_prefix='llm-hedge',
+        )
+        self._stats_lock = threading.Lock()
+        self._hedge_stats = {'hedged': 0, 'hedge_wins': 0, 'deadline_exceeded': 0}
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.name
+
+    def complete(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.1,
+        response_format: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+    ) -> LLMResponse:
+        """
+        LLM 호출
+
+        Args:
+            timeout (float): 이 호출의 응답 대기 시간 (초, 기본값 LLM_READ_TIMEOUT)
+            acquire_timeout (float): 속도 제한 토큰 대기 시간 (초, 기본값 LLM_RATE_LIMIT_MAX_WAIT)
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise LLMUnavailableError(str(e)) from e
+
+        if acquire_timeout is None:
+            acquire_timeout = settings.LLM_RATE_LIMIT_MAX_WAIT
+        if not self.rate_limiter.acquire(timeout=acquire_timeout):
+            # 시험 호출 자리를 차지했을 수 있으므로 실패로 기록하지 않고 반환
+            self.breaker.release()
+            raise LLMUnavailableError("LLM 호출 한도를 초과했습니다. 잠시 후 다시 시도해주세요.")
+
+        try:
+            response = self.provider.complete(
+                prompt,
+                model=model or settings.LLM_MODEL,
+                max_tokens=max_tokens or settings.LLM_MAX_TOKENS,
+                temperature=temperature,
+                response_format=response_format,
+                timeout=timeout,
+            )
+        except Exception as e:
+            if self.provider.is_transient(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+
+        self.breaker.record_success()
+        return response
+
+    def _timed_complete(self, prompt: str, **kwargs) -> LLMResponse:
+        """complete + 성공한 호출의 소요 시간 기록 (hedge에 진 호출도 끝나면 기록됨)"""
+        started = time.monotonic()
+        response = self.complete(prompt, **kwargs)
+        self.latency.record(time.monotonic() - started)
+        return response
+
+    def hedge_delay(self) -> Optional[float]:
+        """최근 소요 시간의 LLM_HEDGE_PERCENTILE 백분위수 (표본이 부족하면 None → hedging 하지 않음)"""
+        delay = self.latency.percentile(settings.LLM_HEDGE_PERCENTILE, min_samples=settings.LLM_HEDGE_MIN_SAMPLES)
+        if delay is None:
+            return None
+        return max(delay, settings.LLM_HEDGE_MIN_DELAY)
+
+    def _incr(self, name: str) -> None:
+        with self._stats_lock:
+            self._hedge_stats[name] += 1
+
+    def hedge_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._hedge_stats)
+        stats['hedge_delay'] = self.hedge_delay()
+        stats['latency_samples'] = len(self.latency)
+        return stats
+
+    def complete_hedged(
+        self,
+        prompt: str,
+        deadline: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        **kwargs,
+    ) -> LLMResponse:
+        """
+        마감 시간과 hedging을 적용한 LLM 호출
+
+        호출이 최근 소요 시간의 백분위수(hedge_delay)를 넘기도록 끝나지 않으면 같은 요청을 한 번 더 보내고
+        먼저 성공한 응답을 사용한다. 진 호출은 취소할 수 없으므로 백그라운드에서 끝나도록 둔다.
+        원래 호출은 속도 제한 토큰을 마감 시각까지만 기다리고, hedge 요청은 기다리지 않는다. (토큰이 없으면 원래 호출만 기다림)
+
+        Args:
+            deadline (float): time.monotonic() 기준 마감 시각 (None이면 제한 없음)
+            hedge (bool): hedging 사용 여부 (기본값 LLM_HEDGE_ENABLED)
+            **kwargs: complete()의 인자 (model, max_tokens, temperature, response_format)
+
+        Raises:
+            LLMDeadlineExceeded: 마감 시각까지 성공한 응답이 없을 때
+        """
+        started = time.monotonic()
+        if deadline is not None and deadline <= started:
+            self._incr('deadline_exceeded')
+            raise LLMDeadlineExceeded("LLM 호출 마감 시간이 지났습니다.")
+
+        use_hedge = settings.LLM_HEDGE_ENABLED if hedge is None else hedge
+        hedge_delay = self.hedge_delay() if use_hedge else None
+        if hedge_delay is None and deadline is None:
+            return self._timed_complete(prompt, **kwargs)
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        # 속도 제한 토큰도 마감 시각까지만 기다림 (LLM_RATE_LIMIT_MAX_WAIT가 더 길어도 요청 시간 예산을 넘지 않도록)
+        acquire_timeout = None if deadline is None else min(remaining(), settings.LLM_RATE_LIMIT_MAX_WAIT)
+        primary = self._hedge_executor.submit(
+            self._timed_complete, prompt, timeout=remaining(), acquire_timeout=acquire_timeout, **kwargs
+        )
+        pending = {primary}
+        hedge_at = started + hedge_delay if hedge_delay is not None else None
+        last_error = None
+
+        while pending:
+            timers = [t for t in (deadline, hedge_at) if t is not None]
+            timeout = max(0.0, min(timers) - time.monotonic()) if timers else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    if future is primary or last_error is None:
+                        last_error = e
+                    continue
+                if future is not primary:
+                    self._incr('hedge_wins')
+                    logger.info(f"hedge 호출이 먼저 응답 ({time.monotonic() - started:.2f}초)")
+                return response
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                self._incr('deadline_exceeded')
+                raise LLMDeadlineExceeded(f"LLM 응답 시간 초과 ({deadline - started:.1f}초)")
+
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if pending:
+                    self._incr('hedged')
+                    logger.info(f"LLM 응답 지연 ({hedge_delay:.2f}초 초과), hedge 호출 전송")
+                    pending.add(self._hedge_executor.submit(
+                        self._timed_complete, prompt, timeout=remaining(), acquire_timeout=0, **kwargs
+                    ))
+
+        raise last_error
+
+    def retry_delay(self, exc: Exception, attempt: int) -> float:
+        """
+        실패한 호출을 다시 시도하기 전 대기 시간 (초)
+        지수 백오프 + jitter를 기본으로 하고, 공급자가 Retry-After를 주면 그 이상 기다린다.
+        """
+        delay = backoff_delay(attempt)
+        retry_after = self.provider.retry_after(exc)
+        if retry_after:
+            delay = max(delay, min(retry_after, settings.LLM_BACKOFF_MAX))
+        return delay
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    현재 프로세스의 LLMClient를 반환 (LLM_PROVIDER 설정에 따라 공급자 선택)
+    fork 이후에는 부모의 연결 풀을 공유하지 않도록 새로 만든다.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            provider_name = settings.LLM_PROVIDER
+            if provider_name not in PROVIDERS:
+                raise ValueError(f"지원하지 않는 LLM 공급자입니다: {provider_name}. 지원 공급자: {list(PROVIDERS.keys())}")
+            _client = LLMClient(PROVIDERS[provider_name]())
+            _client_pid = pid
+            logger.info(f"LLM 클라이언트 생성 (provider={provider_name}, pid={pid})")
+    return _client
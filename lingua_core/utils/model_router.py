@@ -0,0 +1,124 @@
+import re
+import logging
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from django.conf import settings
+
+from .prompt_loader import get_model_route
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+CJK_PATTERN = re.compile(r'[一-鿿]')
+# 절 구분으로 보는 문장 부호 (중국어 전각 부호 포함)
+CLAUSE_PATTERN = re.compile(r'[,;:()—，；：、（）]')
+# 응답 JSON의 고정 부분 (문장 번역, 키, 괄호)
+BASE_OUTPUT_TOKENS = 120
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """문장 하나(또는 배치)를 보낼 모델과 응답 토큰 상한"""
+    model: str
+    max_tokens: int
+    tier: str  # standard | complex | escalated | fixed
+    units: int = 0
+    escalation_model: Optional[str] = None
+
+    def can_escalate(self) -> bool:
+        return bool(self.escalation_model) and self.escalation_model != self.model
+
+    def escalate(self) -> 'ModelRoute':
+        """검증 실패 후 더 강한 모델로 다시 보낼 경로 (응답이 더 길 수 있으므로 토큰 상한도 늘림)"""
+        return replace(
+            self,
+            model=self.escalation_model,
+            max_tokens=min(self.max_tokens * 2, settings.LLM_MAX_TOKENS),
+            tier='escalated',
+            escalation_model=None,
+        )
+
+    def expand(self) -> 'ModelRoute':
+        """응답이 토큰 상한에서 잘렸을 때 같은 모델로 상한만 늘린 경로"""
+        return replace(self, max_tokens=min(self.max_tokens * 2, settings.LLM_MAX_TOKENS))
+
+
+def route_config(language: str) -> dict:
+    """prompt_loader의 언어별 기준에 settings.LLM_MODEL_ROUTES 덮어쓰기 적용"""
+    config = get_model_route(language)
+    config.update(settings.LLM_MODEL_ROUTES.get(language, {}))
+    return config
+
+
+def estimate_complexity(sentence: str, unit: str = 'word') -> tuple:
+    """
+    LLM 호출 없이 문장 크기와 복잡도 추정
+
+    Returns:
+        (units, clauses): 단어(unit=word) 또는 글자(unit=char) 수, 절 수
+    """
+    if unit == 'char':
+        # 한자는 글자 단위, 섞여 있는 라틴 문자 단어는 한 단위로 셈
+        units = len(CJK_PATTERN.findall(sentence)) + len(WORD_PATTERN.findall(CJK_PATTERN.sub(' ', sentence)))
+    else:
+        units = len(WORD_PATTERN.findall(sentence))
+    clauses = len(CLAUSE_PATTERN.findall(sentence)) + 1
+    return units, clauses
+
+
+def _fixed_route(model: Optional[str] = None) -> ModelRoute:
+    return ModelRoute(model=model or settings.LLM_MODEL, max_tokens=settings.LLM_MAX_TOKENS, tier='fixed')
+
+
+def route_sentence(sentence: str, language: str, model: Optional[str] = None) -> ModelRoute:
+    """
+    문장 크기/복잡도로 모델과 max_tokens 선택
+
+    - max_tokens: 고정분 + 단위 수 × 단위당 토큰 (LLM_MIN_MAX_TOKENS ~ LLM_MAX_TOKENS)
+    - 단위 수나 절 수가 언어별 기준을 넘으면 complex 모델
+    - model을 지정하면 그 모델만 사용 (승격하지 않음)
+    """
+    if not settings.LLM_ROUTING_ENABLED:
+        return _fixed_route(model)
+    try:
+        config = route_config(language)
+    except ValueError as e:
+        logger.warning(f"모델 라우팅 기준 없음, 기본 모델 사용: {e}")
+        return _fixed_route(model)
+
+    units, clauses = estimate_complexity(sentence, config.get('unit', 'word'))
+    complex_sentence = units > config['complex_units'] or clauses > config['complex_clauses']
+    max_tokens = BASE_OUTPUT_TOKENS + units * config['tokens_per_unit']
+    max_tokens = max(settings.LLM_MIN_MAX_TOKENS, min(max_tokens, settings.LLM_MAX_TOKENS))
+
+    if model:
+        return ModelRoute(model=model, max_tokens=max_tokens, tier='fixed', units=units)
+    if complex_sentence:
+        chosen = config.get('complex_model') or settings.LLM_COMPLEX_MODEL
+    else:
+        chosen = config.get('model') or settings.LLM_MODEL
+    return ModelRoute(
+        model=chosen,
+        max_tokens=max_tokens,
+        tier='complex' if complex_sentence else 'standard',
+        units=units,
+        escalation_model=config.get('escalation_model') or settings.LLM_ESCALATION_MODEL or None,
+    )
+
+
+def route_batch(sentences: List[str], language: str) -> ModelRoute:
+    """
+    배치 요청의 경로: 문장별 경로의 토큰 합 (ANALYSIS_BATCH_MAX_TOKENS 상한), 복잡한 문장이 하나라도 있으면 complex 모델
+    배치에서 실패한 문장은 단일 분석(route_sentence + 승격)으로 다시 처리되므로 배치 자체는 승격하지 않는다.
+    """
+    routes = [route_sentence(sentence, language) for sentence in sentences]
+    complex_route = next((route for route in routes if route.tier == 'complex'), None)
+    model = (complex_route or routes[0]).model if routes else settings.LLM_MODEL
+    max_tokens = BASE_OUTPUT_TOKENS + sum(route.max_tokens for route in routes)
+    return ModelRoute(
+        model=model,
+        max_tokens=min(max_tokens, settings.ANALYSIS_BATCH_MAX_TOKENS),
+        tier='complex' if complex_route else routes[0].tier if routes else 'fixed',
+        units=sum(route.units for route in routes),
+    )
@@ -0,0 +1,314 @@
+import io
+import os
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, List, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 분석 언어별 tesseract 언어 데이터 (없는 언어는 DEFAULT_TESSERACT_LANGUAGE)
+TESSERACT_LANGUAGES = {
+    'english': 'eng',
+    'spanish': 'spa',
+    'chinese': 'chi_sim+chi_tra',
+}
+DEFAULT_TESSERACT_LANGUAGE = 'kor+eng+chi_sim+chi_tra'
+
+# 빈 행으로 볼 행 평균 밝기 차이 (배경 대비)
+BLANK_ROW_TOLERANCE = 2
+
+
+class OCRError(Exception):
+    """이미지를 읽을 수 없거나 OCR 엔진이 실패함"""
+
+
+class OCREngineError(OCRError):
+    """OCR 엔진(tesseract) 또는 OCR 프로세스 실행 실패 (이미지 문제가 아닌 서버 쪽 오류)"""
+
+
+class TesseractEngine:
+    """pytesseract(tesseract CLI) 엔진"""
+    name = 'tesseract'
+
+    def __init__(self, cmd: str = 'tesseract'):
+        import pytesseract
+
+        pytesseract.pytesseract.tesseract_cmd = cmd
+        self.pytesseract = pytesseract
+
+    def recognize(self, image, lang: str) -> List[dict]:
+        """단어 목록 [{text, conf, block, par, line, left, top, width, height}] (이미지 좌표)"""
+        data = self.pytesseract.image_to_data(image, lang=lang, output_type=self.pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            # level 5 = 단어, conf -1은 텍스트가 아닌 영역
+            if data['level'][i] != 5 or not text or float(data['conf'][i]) < 0:
+                continue
+            words.append({
+                'text': text,
+                'conf': float(data['conf'][i]),
+                'block': data['block_num'][i],
+                'par': data['par_num'][i],
+                'line': data['line_num'][i],
+                'left': data['left'][i],
+                'top': data['top'][i],
+                'width': data['width'][i],
+                'height': data['height'][i],
+            })
+        return words
+
+
+class StubOcrEngine:
+    """
+    tesseract 없이 동작하는 결정적(deterministic) 엔진 (CI/부하 테스트용)
+    띠(band)마다 띠 전체를 덮는 한 줄짜리 문장을 반환한다.
+    """
+    name = 'stub'
+
+    def __init__(self, cmd: str = None):
+        pass
+
+    def recognize(self, image, lang: str) -> List[dict]:
+        width, height = image.size
+        words = ['Stub', 'text', f'{width}x{height}.']
+        step = max(1, width // len(words))
+        return [
+            {'text': text, 'conf': 100.0, 'block': 1, 'par': 1, 'line': 1,
+             'left': i * step, 'top': 0, 'width': step, 'height': height}
+            for i, text in enumerate(words)
+        ]
+
+
+OCR_ENGINES = {
+    TesseractEngine.name: TesseractEngine,
+    StubOcrEngine.name: StubOcrEngine,
+}
+
+# 자식 프로세스별 엔진 인스턴스
+_engines = {}
+
+
+def _get_engine(name: str, cmd: str):
+    engine = _engines.get(name)
+    if engine is None:
+        if name not in OCR_ENGINES:
+            raise OCRError(f"지원하지 않는 OCR 엔진입니다: {name}. 지원 엔진: {list(OCR_ENGINES.keys())}")
+        engine = _engines[name] = OCR_ENGINES[name](cmd)
+    return engine
+
+
+def _find_cuts(image, band_height: int) -> List[Tuple[int, int]]:
+    """
+    이미지를 세로로 나눌 띠 [(top, bottom)]
+    줄이 잘리지 않도록 목표 높이 근처의 빈 행(줄 사이 여백)에서 자른다.
+    """
+    from PIL import Image
+
+    width, height = image.size
+    if height <= band_height * 1.5:
+        return [(0, height)]
+
+    # 가로를 1px로 줄여 행별 평균 밝기를 구함
+    profile = list(image.resize((1, height), Image.BOX).getdata())
+    if sum(profile) / height >= 128:
+        background = max(profile)  # 밝은 배경에 어두운 글자
+        blank = [value >= background - BLANK_ROW_TOLERANCE for value in profile]
+    else:
+        background = min(profile)  # 어두운 배경(다크 모드 캡처)
+        blank = [value <= background + BLANK_ROW_TOLERANCE for value in profile]
+
+    cuts = []
+    top = 0
+    while height - top > band_height * 1.5:
+        target = top + band_height
+        low, high = top + band_height // 2, min(height - 1, top + band_height * 3 // 2)
+        candidates = [row for row in range(low, high) if blank[row]]
+        cut = min(candidates, key=lambda row: abs(row - target)) if candidates else target
+        cuts.append((top, cut))
+        top = cut
+    cuts.append((top, height))
+    return cuts
+
+
+def prepare_image(data: bytes, max_dimension: int, band_height: int) -> dict:
+    """
+    (자식 프로세스) 이미지를 인식하기 좋은 형태로 만들고 띠로 나눔
+    - EXIF 회전 적용, 흑백 변환, 긴 변이 max_dimension을 넘으면 축소, 대비 보정
+    - JPEG은 draft 모드로 축소된 크기로 바로 디코딩
+
+    Returns:
+        {width, height (원본 크기), scale (원본 → 처리 이미지 배율), bands: [(top, 띠 이미지)]}
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        full_width = image.size[0]
+        image.draft('L', (max_dimension, max_dimension))
+        draft_scale = image.size[0] / full_width
+        image = ImageOps.exif_transpose(image).convert('L')
+    except (OSError, Image.DecompressionBombError) as e:
+        raise OCRError(f"이미지를 읽을 수 없습니다: {e}")
+
+    # 응답 좌표는 (EXIF 회전을 적용한) 원본 크기 기준
+    width, height = (round(size / draft_scale) for size in image.size)
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    image = ImageOps.autocontrast(image, cutoff=1)
+
+    scale = image.size[0] / width
+    bands = [(top, image.crop((0, top, image.size[0], bottom))) for top, bottom in _find_cuts(image, band_height)]
+    return {'width': width, 'height': height, 'scale': scale, 'bands': bands}
+
+
+def recognize_band(engine_name: str, cmd: str, lang: str, top: int, band, scale: float) -> List[dict]:
+    """
+    (자식 프로세스) 띠 하나를 인식해서 줄 단위로 반환 (좌표는 원본 이미지 기준)
+
+    Returns:
+        [{'paragraph': 'block-par', 'words': [{text, box: {left, top, width, height}}]}]
+    """
+    # 엔진 예외(pytesseract.TesseractError 등)는 부모 프로세스에서 OCRError로 처리할 수 있도록 감싸서 전달
+    try:
+        words = _get_engine(engine_name, cmd).recognize(band, lang)
+    except OCRError:
+        raise
+    except Exception as e:
+        raise OCREngineError(f"OCR 엔진 실행 실패 ({engine_name}): {type(e).__name__}: {e}") from None
+    lines = {}
+    for word in words:
+        key = (word['block'], word['par'], word['line'])
+        lines.setdefault(key, []).append({
+            'text': word['text'],
+            'box': {
+                'left': round(word['left'] / scale),
+                'top': round((word['top'] + top) / scale),
+                'width': round(word['width'] / scale),
+                'height': round(word['height'] / scale),
+            },
+        })
+    return [
+        {'paragraph': f"{top}-{block}-{par}", 'words': line_words}
+        for (block, par, _), line_words in sorted(lines.items())
+    ]
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    """OCR_PROCESSES, 0이면 CPU 코어를 웹 워커 수(WEB_CONCURRENCY)로 나눈 값"""
+    if settings.OCR_PROCESSES > 0:
+        return settings.OCR_PROCESSES
+    return max(1, (os.cpu_count() or 1) // max(1, settings.WEB_CONCURRENCY))
+
+
+def get_ocr_executor() -> ProcessPoolExecutor:
+    """
+    현재 프로세스의 OCR 프로세스 풀 반환
+    요청 스레드/이벤트 루프를 막지 않고 CPU 코어 수만큼 병렬로 인식한다.
+    스레드가 있는 웹 워커에서 fork하지 않도록 spawn으로 자식 프로세스를 만든다.
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            max_workers = _pool_size()
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = pid
+            logger.info(f"OCR 프로세스 풀 생성 (pid={pid}, max_workers={max_workers})")
+    return _executor
+
+
+def _reset_executor(executor) -> None:
+    """자식 프로세스가 죽어 깨진 풀은 버리고 다음 요청에서 새로 만듦"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_ocr(data: bytes, language: str = 'english') -> AsyncIterator[dict]:
+    """
+    이미지를 프로세스 풀에서 인식하고 띠(band)별 결과를 위에서부터 순서대로 반환
+    모든 띠를 한 번에 제출해서 병렬로 인식하고, 앞쪽 띠가 끝나는 대로 내보낸다.
+
+    Yields:
+        {'type': 'image', width, height, bands} 한 번, 이후 {'type': 'band', index, lines}
+
+    Raises:
+        OCRError: 이미지를 읽을 수 없음 (엔진/프로세스 실패는 OCREngineError)
+        asyncio.TimeoutError: OCR_TIMEOUT 초과
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_ocr_executor()
+    deadline = time.monotonic() + settings.OCR_TIMEOUT
+    lang = TESSERACT_LANGUAGES.get(language, DEFAULT_TESSERACT_LANGUAGE)
+
+    def remaining() -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    try:
+        prepared = await asyncio.wait_for(
+            loop.run_in_executor(
+                executor, prepare_image, data, settings.OCR_MAX_DIMENSION, settings.OCR_BAND_HEIGHT
+            ),
+            timeout=remaining(),
+        )
+        bands = prepared['bands']
+        yield {'type': 'image', 'width': prepared['width'], 'height': prepared['height'], 'bands': len(bands)}
+
+        futures = [
+            loop.run_in_executor(
+                executor, recognize_band,
+                settings.OCR_ENGINE, settings.TESSERACT_CMD, lang, top, band, prepared['scale'],
+            )
+            for top, band in bands
+        ]
+        try:
+            for index, future in enumerate(futures):
+                lines = await asyncio.wait_for(future, timeout=remaining())
+                yield {'type': 'band', 'index': index, 'lines': lines}
+        finally:
+            for future in futures:
+                future.cancel()
+    except BrokenProcessPool as e:
+        _reset_executor(executor)
+        raise OCREngineError(f"OCR 프로세스가 비정상 종료되었습니다: {e}")
+
+
+def run_ocr(data: bytes, language: str = 'english') -> dict:
+    """
+    동기 코드용: 이미지를 프로세스 풀에서 인식하고 모든 줄을 반환 (관리 명령/셸 등, 요청 처리에는 aiter_ocr 사용)
+
+    Returns:
+        {width, height, lines}
+    """
+    async def collect():
+        result = {'lines': []}
+        async for event in aiter_ocr(data, language):
+            if event['type'] == 'image':
+                result.update(width=event['width'], height=event['height'])
+            else:
+                result['lines'].extend(event['lines'])
+        return result
+
+    return asyncio.run(collect())
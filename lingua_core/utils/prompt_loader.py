@@ -1,122 +1,320 @@
-import os
+import json
+import time
+import string
+import hashlib
 import logging
+import threading
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-class PromptLoader:
-    """언어별 프롬프트 파일을 로드하고 템플릿 처리하는 클래스"""
-    
-    def __init__(self):
+# 언어별 프롬프트 변형 (single: 문장 하나, batch: 여러 문장을 한 번에)과 파일명 매핑
+LANGUAGE_PROMPT_FILES = {
+    'english': {
+        'single': 'english_prompt.txt',
+        'batch': 'english_batch_prompt.txt',
+    },
+    'chinese': {
+        'single': 'chinese_prompt.txt',
+        'batch': 'chinese_batch_prompt.txt',
+    },
+    'spanish': {
+        'single': 'spanish_prompt.txt',
+        'batch': 'spanish_batch_prompt.txt',
+    },
+}
+
+# 언어별 모델 라우팅 기준 (model_router에서 사용, settings.LLM_MODEL_ROUTES로 언어별 값 덮어쓰기 가능)
+# - unit: 문장 크기 단위 (word: 단어, char: 글자 - 띄어쓰기가 없는 언어)
+# - tokens_per_unit: 단위당 응답 토큰 추정치 (번역 + 단어별 분석 JSON)
+# - complex_units / complex_clauses: 이 값을 넘으면 복잡한 문장으로 보고 LLM_COMPLEX_MODEL 사용
+# - model / complex_model / escalation_model: (선택) 이 언어만 다른 모델을 쓸 때 지정
+LANGUAGE_MODEL_ROUTES = {
+    'english': {'unit': 'word', 'tokens_per_unit': 40, 'complex_units': 35, 'complex_clauses': 4},
+    'chinese': {'unit': 'char', 'tokens_per_unit': 35, 'complex_units': 50, 'complex_clauses': 4},
+    'spanish': {'unit': 'word', 'tokens_per_unit': 45, 'complex_units': 35, 'complex_clauses': 4},
+}
+
+# 언어 공통 프롬프트
+SHARED_PROMPT_FILES = {
+    'known_words_hint': 'known_words_hint.txt',  # 이미 학습한 단어 힌트 (프롬프트 앞에 붙임)
+}
+
+# 변형별로 템플릿에 반드시 있어야 하는 자리표시자
+REQUIRED_FIELDS = {
+    'single': {'sentence'},
+    'batch': {'sentences'},
+    'known_words_hint': {'known_words'},
+}
+
+SHARED = '*'
+
+
+class PromptTemplate:
+    """
+    미리 컴파일된 프롬프트 템플릿
+    str.format을 매번 파싱하지 않도록 (리터럴, 자리표시자) 조각으로 나눠 두고 join으로 조합한다.
+    """
+
+    def __init__(self, name: str, path: Path, source: str, mtime: float):
+        self.name = name
+        self.path = path
+        self.source = source
+        self.mtime = mtime
+        self.version = hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+
+        self._parts = []
+        self.fields = set()
+        for literal, field, format_spec, conversion in string.Formatter().parse(source):
+            if field is not None and (format_spec or conversion or not field.isidentifier()):
+                raise ValueError(f"지원하지 않는 자리표시자입니다 ({name}): {{{field}}}")
+            self._parts.append((literal, field))
+            if field is not None:
+                self.fields.add(field)
+
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise ValueError(f"프롬프트 값이 누락되었습니다 ({self.name}): {sorted(missing)}")
+        chunks = []
+        for literal, field in self._parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(str(values[field]))
+        return ''.join(chunks)
+
+
+class PromptRegistry:
+    """
+    언어별/변형별 프롬프트 템플릿 레지스트리
+    모든 템플릿을 한 번 읽어 컴파일해 두고, reload_interval 초마다 mtime을 확인해서 수정된 파일만 다시 읽는다.
+    """
+
+    def __init__(self, prompts_dir: Path = None, reload_interval: float = 5.0):
         # 현재 파일의 부모 디렉토리에서 prompts 폴더 경로 찾기
-        current_dir = Path(__file__).parent.parent
-        self.prompts_dir = current_dir / "prompts"
-        
-        # 지원하는 언어와 파일명 매핑
-        self.language_files = {
-            'english': 'english_prompt.txt',
-            'chinese': 'chinese_prompt.txt', 
-            'spanish': 'spanish_prompt.txt'
+        self.prompts_dir = prompts_dir or Path(__file__).parent.parent / "prompts"
+        # mtime 확인 간격 (초, 0이면 매번 확인, None이면 다시 읽지 않음 - 서버에서는 settings.PROMPT_RELOAD_INTERVAL)
+        self.reload_interval = reload_interval
+
+        self.files = {
+            (language, variant): filename
+            for language, variants in LANGUAGE_PROMPT_FILES.items()
+            for variant, filename in variants.items()
         }
-    
-    def load_prompt(self, language: str, sentence: str) -> str:
+        self.files.update({(SHARED, variant): filename for variant, filename in SHARED_PROMPT_FILES.items()})
+
+        self._templates = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, key) -> PromptTemplate:
+        language, variant = key
+        path = self.prompts_dir / self.files[key]
+        try:
+            mtime = path.stat().st_mtime
+            source = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {path}")
+
+        template = PromptTemplate(f"{language}/{variant}", path, source, mtime)
+        missing = REQUIRED_FIELDS.get(variant, set()) - template.fields
+        if missing:
+            raise ValueError(f"프롬프트에 필요한 자리표시자가 없습니다 ({template.name}): {sorted(missing)}")
+        return template
+
+    def load_all(self) -> None:
+        """
+        모든 프롬프트를 읽어 컴파일 (서버 시작 시 호출)
+
+        Raises:
+            FileNotFoundError: 프롬프트 파일이 없는 경우
+            ValueError: 템플릿에 필요한 자리표시자가 없는 경우
+        """
+        with self._lock:
+            now = time.monotonic()
+            for key in self.files:
+                self._templates[key] = self._compile(key)
+                self._checked_at[key] = now
+        logger.info(f"프롬프트 {len(self._templates)}개 로드 완료 ({self.prompts_dir})")
+
+    def _is_stale(self, key, template: PromptTemplate) -> bool:
+        if self.reload_interval is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at.get(key, 0) < self.reload_interval:
+            return False
+        self._checked_at[key] = now
+        try:
+            return template.path.stat().st_mtime != template.mtime
+        except FileNotFoundError:
+            # 수정 중 잠깐 파일이 없을 수 있으므로 기존 템플릿을 계속 사용
+            logger.warning(f"프롬프트 파일이 사라졌습니다. 이전 버전을 사용합니다: {template.path}")
+            return False
+
+    def get(self, language: str, variant: str = 'single') -> PromptTemplate:
         """
-        지정된 언어의 프롬프트를 로드하고 문장을 삽입하여 반환
-        
+        컴파일된 템플릿 반환 (파일이 수정되었으면 다시 컴파일)
+
+        Raises:
+            ValueError: 지원하지 않는 언어/변형인 경우
+        """
+        key = (language, variant)
+        if key not in self.files:
+            if language != SHARED and language not in LANGUAGE_PROMPT_FILES:
+                raise ValueError(f"지원하지 않는 언어입니다: {language}. 지원 언어: {self.get_supported_languages()}")
+            raise ValueError(f"지원하지 않는 프롬프트 변형입니다: {language}/{variant}")
+
+        template = self._templates.get(key)
+        if template is not None and not self._is_stale(key, template):
+            return template
+
+        with self._lock:
+            current = self._templates.get(key)
+            if current is template:
+                try:
+                    current = self._compile(key)
+                except (FileNotFoundError, ValueError) as e:
+                    # 잘못 수정된 파일은 반영하지 않고 이전 버전 유지 (처음 로드라면 그대로 실패)
+                    if template is None:
+                        raise
+                    logger.error(f"프롬프트 다시 읽기 실패, 이전 버전을 사용합니다: {e}")
+                    return template
+                if template is not None:
+                    logger.info(f"프롬프트 변경 감지: {current.name} ({template.version} -> {current.version})")
+                self._templates[key] = current
+                self._checked_at[key] = time.monotonic()
+            return current
+
+    def render(self, language: str, variant: str = 'single', **values) -> str:
+        """템플릿에 값을 넣어 완성된 프롬프트 반환"""
+        return self.get(language, variant).render(**values)
+
+    def load_prompt(self, language: str, sentence: str, known_words: list = None) -> str:
+        """
+        지정된 언어의 프롬프트에 문장을 삽입하여 반환
+
         Args:
             language (str): 언어 코드 ('english', 'chinese', 'spanish')
             sentence (str): 분석할 문장
-            
+            known_words (list): 사용자가 이미 학습한 단어 [{text, meaning}] (있으면 힌트를 앞에 붙임)
+
         Returns:
             str: 완성된 프롬프트 문자열
-            
+
         Raises:
             FileNotFoundError: 프롬프트 파일이 없는 경우
             ValueError: 지원하지 않는 언어인 경우
         """
-        if language not in self.language_files:
-            raise ValueError(f"지원하지 않는 언어입니다: {language}. 지원 언어: {list(self.language_files.keys())}")
-        
-        prompt_file = self.prompts_dir / self.language_files[language]
-        
-        if not prompt_file.exists():
-            raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {prompt_file}")
-        
-        try:
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                prompt_template = f.read()
-            
-            # 문장 삽입 (템플릿의 {sentence} 부분을 실제 문장으로 교체)
-            completed_prompt = prompt_template.format(sentence=sentence)
-            
-            logger.info(f"{language} 프롬프트 로드 완료")
-            return completed_prompt
-            
-        except Exception as e:
-            logger.error(f"프롬프트 파일 읽기 실패 ({language}): {e}")
-            raise
-    
+        prompt = self.render(language, 'single', sentence=sentence)
+        if known_words:
+            prompt = self.load_known_words_hint(known_words) + prompt
+        return prompt
+
+    def load_batch_prompt(self, language: str, sentences: list) -> str:
+        """
+        지정된 언어의 배치 프롬프트에 문장 목록을 삽입하여 반환
+
+        Args:
+            language (str): 언어 코드 ('english', 'chinese', 'spanish')
+            sentences (list): 분석할 문장 리스트 (응답의 index는 이 리스트의 순서)
+        """
+        # 문장 목록은 JSON 배열로 삽입 (따옴표 이스케이프는 json이 처리)
+        items = [{'index': i, 'text': sentence} for i, sentence in enumerate(sentences)]
+        return self.render(language, 'batch', sentences=json.dumps(items, ensure_ascii=False))
+
+    def load_known_words_hint(self, known_words: list) -> str:
+        """이미 학습한 단어 목록 [{text, meaning}]을 힌트 프롬프트에 삽입하여 반환"""
+        return self.render(SHARED, 'known_words_hint', known_words=json.dumps(known_words, ensure_ascii=False))
+
+    def get_prompt_version(self, language: str, variant: str = 'single') -> str:
+        """템플릿 내용의 해시를 버전으로 반환 (분석 캐시 키에 사용)"""
+        return self.get(language, variant).version
+
+    def get_versions(self) -> dict:
+        """모든 템플릿의 버전 {'english/single': 'ab12...'}"""
+        return {f"{language}/{variant}": self.get(language, variant).version for language, variant in self.files}
+
     def get_supported_languages(self) -> list:
         """지원하는 언어 목록 반환"""
-        return list(self.language_files.keys())
-    
+        return list(LANGUAGE_PROMPT_FILES.keys())
+
+    def get_model_route(self, language: str) -> dict:
+        """
+        언어별 모델 라우팅 기준 반환 (LANGUAGE_MODEL_ROUTES)
+
+        Raises:
+            ValueError: 지원하지 않는 언어이거나 라우팅 기준이 없는 경우
+        """
+        if language not in LANGUAGE_PROMPT_FILES:
+            raise ValueError(f"지원하지 않는 언어입니다: {language}. 지원 언어: {self.get_supported_languages()}")
+        if language not in LANGUAGE_MODEL_ROUTES:
+            raise ValueError(f"모델 라우팅 기준이 없는 언어입니다: {language}")
+        return dict(LANGUAGE_MODEL_ROUTES[language])
+
     def validate_prompts_directory(self) -> bool:
-        """프롬프트 디렉토리와 파일들이 존재하는지 확인"""
-        if not self.prompts_dir.exists():
-            logger.error(f"프롬프트 디렉토리가 존재하지 않습니다: {self.prompts_dir}")
-            return False
-        
-        missing_files = []
-        for language, filename in self.language_files.items():
-            file_path = self.prompts_dir / filename
-            if not file_path.exists():
-                missing_files.append(f"{language}: {filename}")
-        
-        if missing_files:
-            logger.error(f"누락된 프롬프트 파일들: {missing_files}")
+        """프롬프트 디렉토리와 파일들이 존재하고 올바른 템플릿인지 확인"""
+        try:
+            self.load_all()
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"프롬프트 검증 실패: {e}")
             return False
-        
-        logger.info("모든 프롬프트 파일이 정상적으로 존재합니다.")
         return True
 
 
 # 싱글톤 인스턴스 생성 (모듈 레벨에서 재사용)
-prompt_loader = PromptLoader()
+prompt_registry = PromptRegistry()
+prompt_loader = prompt_registry
 
 
-def load_prompt_for_language(language: str, sentence: str) -> str:
+def load_prompt_for_language(language: str, sentence: str, known_words: list = None) -> str:
     """
     편의 함수: 지정된 언어의 프롬프트를 로드
-    
+
     Args:
         language (str): 언어 코드
         sentence (str): 분석할 문장
-        
+        known_words (list): 사용자가 이미 학습한 단어 [{text, meaning}]
+
     Returns:
         str: 완성된 프롬프트
     """
-    return prompt_loader.load_prompt(language, sentence)
+    return prompt_registry.load_prompt(language, sentence, known_words)
+
+
+def load_batch_prompt_for_language(language: str, sentences: list) -> str:
+    """편의 함수: 지정된 언어의 배치 프롬프트를 로드"""
+    return prompt_registry.load_batch_prompt(language, sentences)
+
+
+def get_prompt_version(language: str, variant: str = 'single') -> str:
+    """편의 함수: 지정된 언어/변형의 프롬프트 버전(내용 해시) 반환"""
+    return prompt_registry.get_prompt_version(language, variant)
 
 
 def get_supported_languages() -> list:
     """편의 함수: 지원하는 언어 목록 반환"""
-    return prompt_loader.get_supported_languages()
+    return prompt_registry.get_supported_languages()
+
+
+def get_model_route(language: str) -> dict:
+    """편의 함수: 언어별 모델 라우팅 기준 반환"""
+    return prompt_registry.get_model_route(language)
 
 
 if __name__ == "__main__":
     # 테스트 코드
-    loader = PromptLoader()
-    
+    registry = PromptRegistry()
+
     # 프롬프트 디렉토리 검증
-    if loader.validate_prompts_directory():
+    if registry.validate_prompts_directory():
         print("✅ 프롬프트 파일 검증 완료")
-        
+
         # 각 언어별 테스트
         test_sentence = "Hello world"
-        for lang in loader.get_supported_languages():
+        for lang in registry.get_supported_languages():
             try:
-                prompt = loader.load_prompt(lang, test_sentence)
-                print(f"✅ {lang} 프롬프트 로드 성공 (길이: {len(prompt)})")
+                prompt = registry.load_prompt(lang, test_sentence)
+                print(f"✅ {lang} 프롬프트 로드 성공 (길이: {len(prompt)}, 버전: {registry.get_prompt_version(lang)})")
             except Exception as e:
                 print(f"❌ {lang} 프롬프트 로드 실패: {e}")
     else:
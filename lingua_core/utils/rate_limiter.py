@@ -0,0 +1,160 @@
+import os
+import time
+import fcntl
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 토큰 버킷 (Redis 서버 시간 기준, 토큰이 부족하면 소비하지 않고 대기 시간을 반환)
+TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local data = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """모든 워커/호스트가 공유하는 Redis 토큰 버킷"""
+
+    def __init__(self, client, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def try_acquire(self) -> float:
+        """토큰을 하나 가져오고 0을 반환, 부족하면 기다려야 할 시간(초)을 반환"""
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity]))
+
+
+class FileTokenBucket:
+    """
+    Redis가 없을 때 같은 호스트의 워커 프로세스들이 공유하는 파일 기반 토큰 버킷
+    (상태 파일을 fcntl 잠금으로 보호)
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self._thread_lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        with self._thread_lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read().split()
+                now = time.time()
+                tokens = float(raw[0]) if len(raw) == 2 else self.capacity
+                ts = float(raw[1]) if len(raw) == 2 else now
+                tokens = min(self.capacity, tokens + max(0.0, now - ts) * self.rate)
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens} {now}")
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+
+class RateLimiter:
+    """
+    LLM 호출 속도 제한기
+    Redis 토큰 버킷을 우선 사용하고, Redis가 없거나 장애 시 파일 기반 버킷으로 대체한다.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._redis_bucket = None
+        state_dir = settings.LLM_RATE_LIMIT_STATE_DIR or tempfile.gettempdir()
+        self._file_bucket = FileTokenBucket(os.path.join(state_dir, f"wu-ratelimit-{name}"), rate, capacity)
+
+    def _bucket(self):
+        client = get_redis()
+        if client is None:
+            return self._file_bucket
+        if self._redis_bucket is None:
+            self._redis_bucket = RedisTokenBucket(client, f"ratelimit:{self.name}", self.rate, self.capacity)
+        return self._redis_bucket
+
+    def _try_acquire(self) -> float:
+        bucket = self._bucket()
+        try:
+            return bucket.try_acquire()
+        except Exception as e:
+            if bucket is self._file_bucket:
+                raise
+            logger.warning(f"Redis 속도 제한 실패, 파일 버킷으로 대체: {e}")
+            return self._file_bucket.try_acquire()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        토큰을 얻을 때까지 대기
+
+        Returns:
+            bool: timeout(초) 안에 토큰을 얻으면 True
+        """
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> RateLimiter:
+    """LLM 호출용 RateLimiter 싱글톤 반환"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    'llm',
+                    rate=settings.LLM_RATE_LIMIT_PER_SECOND,
+                    capacity=settings.LLM_RATE_LIMIT_BURST,
+                )
+    return _limiter
@@ -0,0 +1,47 @@
+import os
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_unavailable_logged = False
+
+
+def get_redis():
+    """
+    프로세스별 Redis 클라이언트를 반환 (REDIS_URL 미설정 또는 redis 패키지가 없으면 None)
+    연결 풀은 redis-py가 관리하며, fork 이후에는 새 클라이언트를 만든다.
+    """
+    global _client, _client_pid, _unavailable_logged
+
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if not redis_url:
+        return None
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            try:
+                import redis
+            except ImportError:
+                if not _unavailable_logged:
+                    logger.warning("redis 패키지가 설치되어 있지 않아 Redis 기능을 사용하지 않습니다.")
+                    _unavailable_logged = True
+                return None
+
+            _client = redis.Redis.from_url(
+                redis_url,
+                socket_connect_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 0.5),
+                socket_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 0.5),
+                health_check_interval=30,
+            )
+            _client_pid = pid
+    return _client
@@ -0,0 +1,124 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 잠금을 가진 경우에만 삭제 (다른 워커가 만료 후 다시 얻은 잠금을 지우지 않도록)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    같은 키의 동시 호출을 하나로 합치는 프로세스 내 singleflight
+    먼저 들어온 호출(leader)만 fn을 실행하고, 나머지는 그 결과(또는 예외)를 함께 받는다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn: Callable, timeout: Optional[float] = None):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            logger.info(f"진행 중인 동일 분석 결과를 기다림: {key}")
+            return future.result(timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+def run_exclusive(
+    key: str,
+    compute: Callable,
+    poll: Callable,
+    lock_ttl: float,
+    wait_timeout: float,
+    poll_interval: float,
+):
+    """
+    Redis 잠금으로 워커 간에 같은 키의 계산을 하나만 실행
+
+    잠금을 얻은 워커가 compute()를 실행해서 결과를 캐시에 저장하고,
+    나머지 워커는 poll()(캐시 조회)로 결과가 생길 때까지 기다린다.
+    잠금을 가진 워커가 결과 없이 끝나면 다시 잠금을 시도하고, wait_timeout이 지나면 직접 계산한다.
+    Redis가 없거나 장애 시 바로 compute()를 실행한다.
+
+    Args:
+        compute (callable): () -> 결과, 결과를 poll()로 볼 수 있는 곳에 저장해야 함
+        poll (callable): () -> 결과 | None
+    """
+    client = get_redis()
+    if client is None:
+        return compute()
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait_timeout
+
+    while time.monotonic() < deadline:
+        try:
+            acquired = client.set(lock_key, token, nx=True, px=int(lock_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"singleflight Redis 잠금 실패, 직접 분석: {e}")
+            return compute()
+
+        if acquired:
+            try:
+                # 잠금을 얻기 직전에 다른 워커가 끝냈을 수 있음
+                result = poll()
+                return result if result is not None else compute()
+            finally:
+                try:
+                    client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.warning(f"singleflight Redis 잠금 해제 실패: {e}")
+
+        # 다른 워커가 분석 중 → 결과가 캐시에 저장될 때까지 대기
+        logger.info(f"다른 워커의 동일 분석 결과를 기다림: {key}")
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            result = poll()
+            if result is not None:
+                return result
+            try:
+                if not client.exists(lock_key):
+                    break
+            except Exception:
+                break
+
+    logger.warning(f"singleflight 대기 시간 초과, 직접 분석: {key}")
+    return compute()
+
+
+_singleflight = SingleFlight()
+
+
+def get_singleflight() -> SingleFlight:
+    """프로세스 단위 SingleFlight 반환"""
+    return _singleflight
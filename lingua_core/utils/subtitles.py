@@ -0,0 +1,129 @@
+import re
+import html
+import codecs
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+# 00:01:02,500 --> 00:01:04,000 (SRT), 01:02.500 --> 01:04.000 position:10% (VTT, 시간 생략 가능)
+TIMING_PATTERN = re.compile(
+    r'^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})'
+)
+# 서식 태그 (<i>, <c.color>, <00:01:02.000> 등)와 ASS 스타일 태그 ({\an8})
+TAG_PATTERN = re.compile(r'<[^>]*>|\{\\[^}]*\}')
+# 소리/효과 설명 ([Music], (applause), ♪)
+SOUND_PATTERN = re.compile(r'\[[^\]]*\]|\([^)]*\)|（[^）]*）|♪+')
+# 대화 구분 기호 (- 안녕, – 안녕)
+DIALOGUE_PATTERN = re.compile(r'^[-–—]\s*')
+# VTT에서 내용을 무시하는 블록
+SKIPPED_BLOCKS = ('NOTE', 'STYLE', 'REGION')
+# 같은 줄이 이 개수의 최근 줄 안에 있으면 반복으로 보고 제외 (자동 생성 자막의 롤링 표시)
+RECENT_LINES = 4
+
+
+@dataclass
+class Cue:
+    """자막 큐 하나 (표시 시각은 ms)"""
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+def parse_timestamp(value: str) -> int:
+    """'01:02:03,5' / '02:03.500' → ms"""
+    clock, _, fraction = value.replace(',', '.').partition('.')
+    seconds = 0
+    for part in clock.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds * 1000 + int(fraction.ljust(3, '0')[:3] or 0)
+
+
+def iter_lines(chunks: Iterable[bytes], encoding: str = 'utf-8-sig') -> Iterator[str]:
+    """
+    바이트 조각을 줄 단위 문자열로 (업로드 파일 전체를 한 번에 문자열로 만들지 않음)
+    BOM과 CRLF를 처리하고, 잘못된 바이트는 대체 문자로 바꾼다.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending.rstrip('\r')
+
+
+def clean_line(line: str) -> str:
+    """자막 한 줄에서 태그, 소리 설명, 대화 구분 기호 제거"""
+    line = html.unescape(TAG_PATTERN.sub('', line))
+    line = SOUND_PATTERN.sub('', line)
+    return ' '.join(DIALOGUE_PATTERN.sub('', line.strip()).split())
+
+
+class CueParser:
+    """
+    SRT/VTT 자막을 한 줄씩 읽어 Cue를 만드는 파서
+    블록 번호/큐 식별자/헤더는 시각 줄 앞에 오므로 무시하고, 시각 줄 다음부터 빈 줄까지를 자막 내용으로 본다.
+    바로 앞 큐들에서 나온 줄이 다시 나오면 (롤링 자막) 제외하고 repeated_lines로 센다.
+    """
+
+    def __init__(self, joiner: str = ' '):
+        self.joiner = joiner
+        self.cues = 0
+        self.repeated_lines = 0
+        self._recent = deque(maxlen=RECENT_LINES)
+
+    def _build(self, timing: Tuple[int, int], lines: list) -> Optional[Cue]:
+        kept = []
+        for line in lines:
+            line = clean_line(line)
+            if not line:
+                continue
+            if line.casefold() in self._recent:
+                self.repeated_lines += 1
+                continue
+            self._recent.append(line.casefold())
+            kept.append(line)
+        if not kept:
+            return None
+        self.cues += 1
+        return Cue(start_ms=timing[0], end_ms=timing[1], text=self.joiner.join(kept))
+
+    def parse(self, lines: Iterable[str]) -> Iterator[Cue]:
+        timing = None
+        text_lines = []
+        skipping = False
+
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                if timing is not None:
+                    cue = self._build(timing, text_lines)
+                    if cue is not None:
+                        yield cue
+                timing, text_lines, skipping = None, [], False
+                continue
+            if skipping:
+                continue
+
+            match = TIMING_PATTERN.match(stripped)
+            if match:
+                # 빈 줄 없이 다음 큐가 시작되는 잘못된 파일도 처리
+                if timing is not None:
+                    cue = self._build(timing, text_lines)
+                    if cue is not None:
+                        yield cue
+                timing = (parse_timestamp(match.group(1)), parse_timestamp(match.group(2)))
+                text_lines = []
+            elif timing is not None:
+                text_lines.append(stripped)
+            elif stripped.startswith(SKIPPED_BLOCKS):
+                skipping = True
+
+        if timing is not None:
+            cue = self._build(timing, text_lines)
+            if cue is not None:
+                yield cue
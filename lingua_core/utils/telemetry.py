@@ -0,0 +1,304 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'metrics:llm'
+SERIES_LABELS = ('endpoint', 'kind', 'model', 'language')
+
+# 현재 요청의 엔드포인트 이름 (분석 스레드로는 analysis_runner가 context를 복사해서 전달)
+_endpoint = ContextVar('llm_endpoint', default='unknown')
+
+
+def set_llm_endpoint(name: str) -> None:
+    """현재 context의 엔드포인트 이름 지정 (블록으로 감쌀 수 없는 async 스트리밍 응답용)"""
+    _endpoint.set(name)
+
+
+@contextmanager
+def llm_endpoint(name: str):
+    """이 블록 안에서 발생한 LLM 호출을 name 엔드포인트로 집계"""
+    token = _endpoint.set(name)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    settings.LLM_PRICING(100만 토큰당 USD, [입력, 출력])으로 비용 계산
+    응답의 모델명은 날짜가 붙으므로 ('gpt-4o-mini-2024-07-18') 가장 긴 접두사로 찾는다.
+    """
+    model = model.split(':')[-1]  # stub:gpt-4o-mini
+    matches = [name for name in settings.LLM_PRICING if model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, output_price = settings.LLM_PRICING[max(matches, key=len)]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class LLMTelemetry:
+    """
+    LLM 호출 지표를 (endpoint, kind, model, language) 시리즈별로 집계
+    - 프로세스 내 누적값(totals)과 아직 Redis에 보내지 않은 증가분(pending)을 따로 보관
+    - flush_interval초마다 증가분을 Redis 해시에 더해서 모든 워커의 합계를 만든다
+      (기록할 때와 별도로 백그라운드 스레드가 주기적으로, 프로세스 종료 시 한 번 더 보내므로 쉬는 워커의 증가분도 반영됨)
+    지표 이름: calls, failures, attempts, cache_hits, prompt_tokens, completion_tokens, cost_usd,
+              latency_count, latency_sum, latency_bucket:<le>
+    """
+
+    def __init__(self, buckets, flush_interval: float):
+        self.buckets = sorted(buckets)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._pending = defaultdict(lambda: defaultdict(float))
+        self._flushed_at = time.monotonic()
+        self._flusher = None
+
+    def _start_flusher(self) -> None:
+        """Redis가 있으면 flush_interval마다 증가분을 보내는 데몬 스레드와 종료 시 flush를 한 번만 등록"""
+        if self._flusher is not None or self.flush_interval <= 0 or get_redis() is None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='llm-metrics-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                if self._pending:
+                    self.flush()
+            except Exception as e:
+                logger.warning(f"LLM 지표 주기 전송 실패: {e}")
+
+    def _add(self, series: str, metric: str, value: float) -> None:
+        self._totals[series][metric] += value
+        self._pending[series][metric] += value
+
+    def record_call(
+        self,
+        kind: str,
+        model: str,
+        language: str,
+        latency: float,
+        attempts: int,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        ok: bool = True,
+    ) -> None:
+        """LLM 분석 호출 하나 (재시도 포함) 기록"""
+        series = '|'.join([current_endpoint(), kind, model or 'unknown', language])
+        le = self.buckets[bisect_left(self.buckets, latency)] if latency <= self.buckets[-1] else '+Inf'
+        cost = estimate_cost(model or '', prompt_tokens, completion_tokens)
+
+        with self._lock:
+            self._add(series, 'calls', 1)
+            self._add(series, 'attempts', attempts)
+            if not ok:
+                self._add(series, 'failures', 1)
+            self._add(series, 'prompt_tokens', prompt_tokens)
+            self._add(series, 'completion_tokens', completion_tokens)
+            self._add(series, 'cost_usd', cost)
+            self._add(series, 'latency_count', 1)
+            self._add(series, 'latency_sum', latency)
+            self._add(series, f'latency_bucket:{le}', 1)
+
+        logger.info(
+            f"llm_call endpoint={current_endpoint()} kind={kind} model={model} language={language} ok={ok} "
+            f"latency={latency:.3f} attempts={attempts} prompt_tokens={prompt_tokens} "
+            f"completion_tokens={completion_tokens} cost_usd={cost:.6f}"
+        )
+        self.maybe_flush()
+
+    def record_cache_hit(self, kind: str, language: str) -> None:
+        """캐시/진행 중 호출 결과로 LLM 호출 없이 끝난 분석 기록 (모델은 'cache')"""
+        series = '|'.join([current_endpoint(), kind, 'cache', language])
+        with self._lock:
+            self._add(series, 'cache_hits', 1)
+        self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        self._start_flusher()
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """쌓인 증가분을 Redis에 더함 (실패하면 다음 flush에 다시 시도)"""
+        client = get_redis()
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            if client is None or not self._pending:
+                return
+            pending = self._pending
+            self._pending = defaultdict(lambda: defaultdict(float))
+
+        try:
+            pipe = client.pipeline(transaction=False)
+            for series, metrics in pending.items():
+                for metric, value in metrics.items():
+                    pipe.hincrbyfloat(METRICS_KEY, f"{series}#{metric}", value)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"LLM 지표 Redis 전송 실패: {e}")
+            with self._lock:
+                for series, metrics in pending.items():
+                    for metric, value in metrics.items():
+                        self._pending[series][metric] += value
+
+    def local_snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {series: dict(metrics) for series, metrics in self._totals.items()}
+
+    def snapshot(self) -> Tuple[Dict[str, Dict[str, float]], str]:
+        """
+        모든 워커의 합계 (Redis) 또는 Redis가 없으면 현재 프로세스 값
+
+        Returns:
+            (시리즈별 지표, 'cluster' | 'process')
+        """
+        client = get_redis()
+        if client is not None:
+            self.flush()
+            try:
+                raw = client.hgetall(METRICS_KEY)
+            except Exception as e:
+                logger.warning(f"LLM 지표 Redis 조회 실패, 프로세스 값만 반환: {e}")
+            else:
+                series_metrics = defaultdict(dict)
+                for field, value in raw.items():
+                    field = field.decode() if isinstance(field, bytes) else field
+                    series, _, metric = field.partition('#')
+                    series_metrics[series][metric] = float(value)
+                return dict(series_metrics), 'cluster'
+        return self.local_snapshot(), 'process'
+
+
+def _labels(series: str) -> dict:
+    return dict(zip(SERIES_LABELS, series.split('|')))
+
+
+def summarize(series_metrics: Dict[str, Dict[str, float]], buckets) -> list:
+    """시리즈별 지표를 JSON 응답용으로 정리 (평균/백분위수 추정 포함)"""
+    summary = []
+    for series, metrics in sorted(series_metrics.items()):
+        count = metrics.get('latency_count', 0)
+        calls = metrics.get('calls', 0)
+        histogram = [(le, metrics.get(f'latency_bucket:{le}', 0)) for le in buckets]
+        histogram.append(('+Inf', metrics.get('latency_bucket:+Inf', 0)))
+
+        def quantile(q: float) -> Optional[float]:
+            # 히스토그램 버킷 상한으로 추정
+            if not count:
+                return None
+            target = q * count
+            cumulative = 0
+            for le, value in histogram:
+                cumulative += value
+                if cumulative >= target:
+                    return le if le != '+Inf' else None
+            return None
+
+        summary.append({
+            **_labels(series),
+            'calls': int(calls),
+            'failures': int(metrics.get('failures', 0)),
+            'cache_hits': int(metrics.get('cache_hits', 0)),
+            'attempts': int(metrics.get('attempts', 0)),
+            'avg_attempts': round(metrics.get('attempts', 0) / calls, 3) if calls else None,
+            'prompt_tokens': int(metrics.get('prompt_tokens', 0)),
+            'completion_tokens': int(metrics.get('completion_tokens', 0)),
+            'cost_usd': round(metrics.get('cost_usd', 0), 6),
+            'latency': {
+                'count': int(count),
+                'avg': round(metrics.get('latency_sum', 0) / count, 3) if count else None,
+                'p50': quantile(0.5),
+                'p95': quantile(0.95),
+                'p99': quantile(0.99),
+                'buckets': {str(le): int(value) for le, value in histogram},
+            },
+        })
+    return summary
+
+
+def to_prometheus(series_metrics: Dict[str, Dict[str, float]], buckets) -> str:
+    """Prometheus 텍스트 형식으로 변환"""
+    counters = [
+        ('calls', 'llm_calls_total', 'LLM 분석 호출 수 (재시도 포함 1회)'),
+        ('failures', 'llm_call_failures_total', '실패한 LLM 분석 호출 수'),
+        ('attempts', 'llm_call_attempts_total', 'LLM 요청 시도 수'),
+        ('cache_hits', 'llm_cache_hits_total', 'LLM 호출 없이 캐시로 끝난 분석 수'),
+        ('prompt_tokens', 'llm_prompt_tokens_total', '입력 토큰 수'),
+        ('completion_tokens', 'llm_completion_tokens_total', '출력 토큰 수'),
+        ('cost_usd', 'llm_cost_usd_total', '추정 비용 (USD)'),
+    ]
+
+    def label_str(series: str, extra: dict = None) -> str:
+        labels = dict(_labels(series), **(extra or {}))
+        return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+    lines = []
+    for metric, name, help_text in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for series, metrics in sorted(series_metrics.items()):
+            if metric in metrics:
+                lines.append(f"{name}{{{label_str(series)}}} {metrics[metric]:g}")
+
+    name = 'llm_call_latency_seconds'
+    lines.append(f"# HELP {name} LLM 분석 호출 소요 시간 (재시도 포함)")
+    lines.append(f"# TYPE {name} histogram")
+    for series, metrics in sorted(series_metrics.items()):
+        if not metrics.get('latency_count'):
+            continue
+        cumulative = 0
+        for le in list(buckets) + ['+Inf']:
+            cumulative += metrics.get(f'latency_bucket:{le}', 0)
+            lines.append(f"{name}_bucket{{{label_str(series, {'le': le})}}} {cumulative:g}")
+        lines.append(f"{name}_sum{{{label_str(series)}}} {metrics.get('latency_sum', 0):g}")
+        lines.append(f"{name}_count{{{label_str(series)}}} {metrics.get('latency_count', 0):g}")
+    return '\n'.join(lines) + '\n'
+
+
+_telemetry = None
+_telemetry_pid = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> LLMTelemetry:
+    """현재 프로세스의 LLMTelemetry 반환 (fork 이후에는 부모의 미전송 증가분을 중복 전송하지 않도록 새로 만듦)"""
+    global _telemetry, _telemetry_pid
+
+    pid = os.getpid()
+    if _telemetry is not None and _telemetry_pid == pid:
+        return _telemetry
+
+    with _telemetry_lock:
+        if _telemetry is None or _telemetry_pid != pid:
+            _telemetry = LLMTelemetry(
+                buckets=settings.LLM_LATENCY_BUCKETS,
+                flush_interval=settings.LLM_METRICS_FLUSH_INTERVAL,
+            )
+            _telemetry_pid = pid
+    return _telemetry
@@ -0,0 +1,299 @@
+import os
+import re
+import time
+import struct
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# 비교에서 무시할 문장 부호/기호 (대소문자는 casefold로 무시)
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]', re.UNICODE)
+# 비교 단위: 한자는 글자 하나, 그 밖의 문자는 단어
+TOKEN_PATTERN = re.compile(r'[一-鿿]|(?:(?![一-鿿])\w)+', re.UNICODE)
+CJK_PATTERN = re.compile(r'[一-鿿]')
+SHINGLE_SIZE = 3
+# MinHash 서명: 문자 3-gram마다 blake2b 64바이트를 16비트 값 32개로 나눠 해시 함수 32개로 사용
+SIGNATURE_SIZE = 32
+# LSH: 서명을 2개씩 16개의 띠로 나눠 한 띠라도 같으면 후보 (자카드 유사도 0.6이면 99.9% 확률로 후보가 됨)
+LSH_BANDS = 16
+LSH_ROWS = SIGNATURE_SIZE // LSH_BANDS
+# 후보가 많을 때 실제 유사도를 계산할 최대 개수 (겹치는 띠가 많은 순)
+MAX_CANDIDATES = 32
+
+
+def normalize_for_memory(sentence: str) -> str:
+    """비교용 정규화 (NFKC, 대소문자/문장 부호 무시, 연속 공백 축약)"""
+    text = unicodedata.normalize('NFKC', sentence).casefold()
+    return ' '.join(PUNCTUATION_PATTERN.sub(' ', text).split())
+
+
+def shingles(normalized: str) -> set:
+    """문자 n-gram 집합 (문장이 n보다 짧으면 문장 전체)"""
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(grams: set) -> Tuple[int, ...]:
+    """n-gram 집합의 MinHash 서명 (프로세스와 관계없이 같은 값이 나오도록 blake2b 사용)"""
+    rows = [
+        struct.unpack('<32H', hashlib.blake2b(gram.encode('utf-8'), digest_size=64).digest())
+        for gram in grams
+    ]
+    return tuple(min(column) for column in zip(*rows))
+
+
+def band_keys(signature: Tuple[int, ...]) -> List[tuple]:
+    return [(band,) + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS] for band in range(LSH_BANDS)]
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def same_words(source: str, target: str) -> bool:
+    """정규화된 두 문장의 단어(한자는 글자)와 순서가 같은지 (대소문자/문장 부호/공백만 다른 문장)"""
+    return TOKEN_PATTERN.findall(source) == TOKEN_PATTERN.findall(target)
+
+
+def surface_form(word: str, sentence: str) -> str:
+    """문장에 실제로 쓰인 단어 형태 (대소문자 무시하고 찾음, 없으면 저장된 단어 그대로)"""
+    # 한자는 띄어쓰기가 없으므로 단어 경계 없이 찾음
+    boundary = '' if CJK_PATTERN.search(word) else r'(?<!\w)'
+    match = re.search(
+        boundary + re.escape(word) + (r'(?!\w)' if boundary else ''), sentence, re.IGNORECASE | re.UNICODE
+    )
+    return match.group(0) if match else word
+
+
+class TranslationMemoryIndex:
+    """
+    한 사용자, 한 언어의 저장된 문장(Sentence.text)에 대한 MinHash LSH 인덱스 (프로세스 내)
+    저장된 문장/단어 의미는 사용자가 직접 고친 내용이므로 다른 사용자의 문장은 인덱스에 넣지 않는다.
+    - 처음 조회할 때 최근 문장부터 TRANSLATION_MEMORY_MAX_ENTRIES개를 읽어 만들고,
+      이후에는 TRANSLATION_MEMORY_REFRESH_INTERVAL마다 새로 저장된 문장(id 증가분)만 추가한다.
+    - 정규화한 문장이 같으면 가장 최근 문장 하나만 유지한다.
+    - 삭제된 문장은 조회 시 DB에 없으면 인덱스에서 뺀다.
+    """
+
+    def __init__(self, user_id: int, language: str, max_entries: int):
+        self.user_id = user_id
+        self.language = language
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # sentence_id → 정규화된 문장 (오래된 것부터)
+        self._by_text = {}  # 정규화된 문장 → sentence_id
+        self._buckets = {}  # 띠 키 → {sentence_id}
+        self._last_id = 0
+        self._refreshed_at = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, sentence_id: int, normalized: str) -> None:
+        previous = self._by_text.get(normalized)
+        if previous is not None:
+            self._remove(previous)
+        self._entries[sentence_id] = normalized
+        self._by_text[normalized] = sentence_id
+        for key in band_keys(minhash_signature(shingles(normalized))):
+            self._buckets.setdefault(key, set()).add(sentence_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, sentence_id: int) -> None:
+        normalized = self._entries.pop(sentence_id, None)
+        if normalized is None:
+            return
+        if self._by_text.get(normalized) == sentence_id:
+            del self._by_text[normalized]
+        for key in band_keys(minhash_signature(shingles(normalized))):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(sentence_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def discard(self, sentence_id: int) -> None:
+        with self._lock:
+            self._remove(sentence_id)
+
+    def _refresh_due(self) -> bool:
+        if self._refreshed_at is None:
+            return True
+        return time.monotonic() - self._refreshed_at >= settings.TRANSLATION_MEMORY_REFRESH_INTERVAL
+
+    def refresh(self, force: bool = False) -> None:
+        """새로 저장된 문장을 인덱스에 추가 (마지막 갱신 후 REFRESH_INTERVAL이 지났을 때만)"""
+        from lingua_management.models import Sentence
+
+        if not force and not self._refresh_due():
+            return
+
+        with self._lock:
+            if not force and not self._refresh_due():
+                return
+            started = time.monotonic()
+            queryset = (
+                Sentence.objects.filter(user_id=self.user_id, wordbook__language=self.language, id__gt=self._last_id)
+                .exclude(meaning='')
+                .order_by('-id')
+                .values_list('id', 'text')[:self.max_entries]
+            )
+            rows = list(queryset)
+            for sentence_id, text in reversed(rows):
+                normalized = normalize_for_memory(text)
+                if normalized:
+                    self._add(sentence_id, normalized)
+            if rows:
+                self._last_id = rows[0][0]
+            self._refreshed_at = time.monotonic()
+
+        if rows:
+            logger.info(
+                f"번역 메모리 갱신 (user={self.user_id}, {self.language}): {len(rows)}개 추가, 전체 {len(self._entries)}개, "
+                f"{(time.monotonic() - started) * 1000:.0f}ms"
+            )
+
+    def search(self, sentence: str) -> List[Tuple[float, int, str]]:
+        """유사도가 TRANSLATION_MEMORY_THRESHOLD 이상인 문장 [(유사도, sentence_id, 정규화된 문장)] (유사도 순)"""
+        normalized = normalize_for_memory(sentence)
+        if not normalized:
+            return []
+        grams = shingles(normalized)
+        hits = Counter()
+        with self._lock:
+            exact = self._by_text.get(normalized)
+            if exact is not None:
+                return [(1.0, exact, normalized)]
+            for key in band_keys(minhash_signature(grams)):
+                hits.update(self._buckets.get(key, ()))
+            candidates = [(sentence_id, self._entries[sentence_id]) for sentence_id, _ in hits.most_common(MAX_CANDIDATES)]
+
+        matches = []
+        for sentence_id, candidate in candidates:
+            similarity = jaccard(grams, shingles(candidate))
+            if similarity >= settings.TRANSLATION_MEMORY_THRESHOLD:
+                matches.append((similarity, sentence_id, candidate))
+        matches.sort(key=lambda match: (-match[0], -match[1]))
+        return matches
+
+
+_indexes = OrderedDict()  # (user_id, language) → 인덱스 (최근에 쓴 것이 뒤)
+_indexes_pid = None
+_indexes_lock = threading.Lock()
+
+
+def get_translation_memory(user_id: int, language: str) -> TranslationMemoryIndex:
+    """
+    현재 프로세스의 사용자/언어별 번역 메모리 인덱스 반환 (fork 이후에는 새로 만듦)
+    인덱스가 TRANSLATION_MEMORY_MAX_INDEXES개를 넘으면 가장 오래 쓰지 않은 것부터 버린다.
+    """
+    global _indexes, _indexes_pid
+
+    pid = os.getpid()
+    key = (user_id, language)
+    with _indexes_lock:
+        if _indexes_pid != pid:
+            _indexes = OrderedDict()
+            _indexes_pid = pid
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TranslationMemoryIndex(user_id, language, settings.TRANSLATION_MEMORY_MAX_ENTRIES)
+            while len(_indexes) > settings.TRANSLATION_MEMORY_MAX_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+    return index
+
+
+def _close_stale_connection() -> None:
+    """분석 스레드의 끊겼거나 CONN_MAX_AGE가 지난 DB 연결 정리 (트랜잭션 안에서는 연결을 닫지 않음)"""
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def _load_analysis(sentence_id: int, user_id: int) -> Optional[dict]:
+    """사용자가 저장한 문장의 분석 결과 (문장 + 연결된 단어 의미), 문장이 삭제됐으면 None"""
+    from lingua_management.models import Sentence
+
+    stored = Sentence.objects.filter(id=sentence_id, user_id=user_id).prefetch_related('word_links__word').first()
+    if stored is None:
+        return None
+    return {
+        'text': stored.text,
+        'meaning': stored.meaning,
+        'words': [
+            {
+                'text': link.word.text,
+                'meaning': link.meaning,
+                'pos': link.pos or None,
+                'others': link.word.others or None,
+            }
+            for link in stored.word_links.all()
+        ],
+    }
+
+
+def apply_stored_analysis(stored: dict, sentence: str) -> dict:
+    """
+    저장된 분석을 요청 문장에 맞춤 (대소문자/문장 부호만 다른 문장이므로 번역과 단어 의미는 그대로 사용)
+    단어의 original_text는 요청 문장에 쓰인 형태로 채운다. (Word.text는 소문자로 저장됨)
+    """
+    return {
+        'text': sentence,
+        'meaning': stored['meaning'],
+        'words': [{'original_text': surface_form(word['text'], sentence), **word} for word in stored['words']],
+        'memory': {'source_text': stored['text']},
+    }
+
+
+def find_in_translation_memory(sentence: str, language: str, user=None) -> Optional[dict]:
+    """
+    사용자의 번역 메모리에서 대소문자/문장 부호만 다른 문장을 찾아 저장된 분석을 반환, 없으면 None (LLM으로 분석)
+    단어가 하나라도 다르면 (not 추가, 요일 변경 등) 번역이 달라지므로 재사용하지 않는다.
+    로그인하지 않은 사용자는 저장한 문장이 없으므로 항상 None
+    분석 스레드(llm-analysis)에서 호출되므로 DB 오류는 LLM 분석으로 대체하고, 끊긴 연결은 정리한 뒤 조회한다.
+    """
+    if not settings.TRANSLATION_MEMORY_ENABLED:
+        return None
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+
+    index = get_translation_memory(user.id, language)
+    try:
+        _close_stale_connection()
+        index.refresh()
+    except Exception as e:
+        logger.warning(f"번역 메모리 갱신 실패 ({language}): {e}")
+        return None
+
+    target = normalize_for_memory(sentence)
+    for similarity, sentence_id, source in index.search(sentence):
+        if not same_words(source, target):
+            continue
+        try:
+            stored = _load_analysis(sentence_id, user.id)
+        except Exception as e:
+            logger.warning(f"번역 메모리 조회 실패 ({language}), LLM으로 분석: {e}")
+            return None
+        if stored is None:
+            index.discard(sentence_id)
+            continue
+        result = apply_stored_analysis(stored, sentence)
+        result['memory']['similarity'] = round(similarity, 4)
+        get_telemetry().record_cache_hit('translation_memory', language)
+        logger.info(f"번역 메모리 적중 ({language}, 유사도 {similarity:.2f}): {sentence[:40]}")
+        return result
+    return None
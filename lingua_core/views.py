@@ -1,83 +1,47 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.parsers import MultiPartParser, FormParser
+import os
+import asyncio
 import logging
 import json
-from django.http import StreamingHttpResponse
+from functools import partial
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from asgiref.sync import sync_to_async
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
-from lingua_core.serializers.extraction_serializers import GPTSentenceAnalyzeSerializer
-from lingua_core.utils.call_gpt_for_sentence import call_gpt_for_sentence
-# from lingua_core.services import extract_words_with_boxes, extract_sentences_from_image, split_sentences
+from lingua_core.serializers.extraction_serializers import (
+    GPTSentenceAnalyzeSerializer,
+    SubtitleIngestSerializer,
+    TextIngestSerializer,
+)
+from lingua_core.services import lines_to_sentences, lines_to_words, prepare_sentences, prepare_subtitle_sentences
+from lingua_core.utils.analysis_runner import aiter_analyses, run_analyses
+from lingua_core.utils.analysis_cache import cached_call_gpt_for_sentence, get_cache_stats
+from lingua_core.utils.call_gpt_for_sentence import get_retry_stats
+from lingua_core.utils.llm_client import get_llm_client
+from lingua_core.utils.telemetry import get_telemetry, llm_endpoint, set_llm_endpoint, summarize, to_prometheus
+from lingua_core.utils.analysis_jobs import create_analysis_job, build_job_payload
+from lingua_core.utils.analysis_drafts import save_draft
+from lingua_core.utils.known_words import KnownWordHints
+from lingua_core.utils.ocr import OCREngineError, OCRError, aiter_ocr
+from lingua_core.models import AnalysisJob, AnalysisJobItem
+from config.authentication import FlexibleJWTAuthentication
 
 logger = logging.getLogger('lingua_core')
 
 
 
-# class OcrView(APIView):
-#     """
-#     이미지(OCR), 텍스트, 유튜브 링크 등 다양한 출처에서 텍스트를 추출하고 단어 단위로 반환합니다. 
-#     """
-#     permission_classes = [AllowAny] # 테스트를 위해 임시 변경
-#     parser_classes = [MultiPartParser, FormParser]
-
-#     @swagger_auto_schema(
-#         manual_parameters=[
-#             openapi.Parameter(
-#                 'image',
-#                 openapi.IN_FORM,
-#                 description="분석할 이미지 파일",
-#                 type=openapi.TYPE_FILE,
-#                 required=True
-#             )
-#         ],
-#         operation_summary="OCR을 통해 이미지에서 단어/문장 추출",
-#         consumes=['multipart/form-data']
-#     )
-#     def post(self, request):
-#         if 'image' not in request.FILES:
-#             return Response({'error': '이미지 파일이 필요합니다.'}, status=400)
-        
-#         image = request.FILES['image']
-#         # image_processing 서비스 레이어를 통해 처리 (미구현)
-#         words = extract_words_with_boxes(image)
-#         response_data = {"words": words}
-#         return Response(response_data)
-
-# class OcrSentenceView(APIView):
-#     """
-#     이미지(OCR), 텍스트, 유튜브 링크 등 다양한 출처에서 텍스트를 추출하고 문장 단위로 반환합니다. 
-#     """
-#     permission_classes = [AllowAny] # 테스트를 위해 임시 변경
-#     parser_classes = [MultiPartParser, FormParser]
-
-#     @swagger_auto_schema(
-#         manual_parameters=[
-#             openapi.Parameter(
-#                 'image',
-#                 openapi.IN_FORM,
-#                 description="분석할 이미지 파일",
-#                 type=openapi.TYPE_FILE,
-#                 required=True
-#             )
-#         ],
-#         operation_summary="OCR을 통해 이미지에서 단어/문장 추출",
-#         consumes=['multipart/form-data']
-#     )
-#     def post(self, request):
-#         if 'image' not in request.FILES:
-#             return Response({'error': '이미지 파일이 필요합니다.'}, status=400)
-        
-#         image = request.FILES['image']
-#         # image_processing 서비스 레이어를 통해 처리 (미구현)
-#         sentences = extract_sentences_from_image(image)
-#         response_data = {"sentences": sentences}
-#         return Response(response_data)
-
 # class SentenceSplitView(APIView):
 #     """
 #     입력된 문장을 분할하여 반환합니다.
@@ -107,6 +71,8 @@ class SentenceAnalyzeView(APIView):
     """
     입력된 문장 리스트를 GPT를 이용해 분석하고,
     각 문장의 번역과 주요 단어 정보를 반환합니다.
+    로그인 사용자는 결과가 초안(draft: {id, expires_in})으로 저장되어, 단어장 저장 시 draft_id로 참조할 수 있습니다.
+    selected의 각 결과에는 입력 문장 index가 있으며, 초안 선택(sentences[].index)에 그대로 사용합니다.
     """
     permission_classes = [AllowAny]
 
@@ -135,76 +101,541 @@ class SentenceAnalyzeView(APIView):
         logger.info(f"받은 문장 개수: {len(sentences)}")
         logger.info(f"받은 문장들: {sentences}")
         
-        result = []
-        for i, sent in enumerate(sentences):
-            logger.info(f"처리 중인 문장 {i+1}: {sent}")
-            gpt_response = call_gpt_for_sentence(sent, language)
-            logger.info(f"GPT 응답 {i+1}: {gpt_response}")
-            if gpt_response:
-                result.append(gpt_response)
-            else:
-                logger.warning(f"문장 {i+1}에 대한 GPT 응답이 없음")
+        max_concurrency = serializer.validated_data.get('max_concurrency')
+        refresh = serializer.validated_data.get('refresh', False)
+        use_known_words = serializer.validated_data.get('use_known_words', False)
         
-        logger.info(f"최종 결과 개수: {len(result)}")
-        return Response({"selected": result})
-
-
-# @method_decorator(csrf_exempt, name='dispatch')
-# class GPTSentenceAnalyzeStreamView(APIView):
-    # """
-    # 문장 리스트를 AI로 분석하고 처리 완료되는 대로 실시간 스트리밍으로 반환
-    # """
-    # permission_classes = [AllowAny]
-
-    # @swagger_auto_schema(
-    #     request_body=GPTSentenceAnalyzeSerializer,
-    #     operation_summary="문장 리스트를 AI로 분석 (실시간 스트리밍)"
-    # )
-    # def post(self, request):
-    #     serializer = GPTSentenceAnalyzeSerializer(data=request.data)
-    #     serializer.is_valid(raise_exception=True)
+        # 작업 모드: 작업만 등록하고 바로 반환 (분석은 run_analysis_worker가 처리)
+        if serializer.validated_data.get('mode') == 'job':
+            job = create_analysis_job(
+                sentences,
+                language,
+                user=request.user if request.user.is_authenticated else None,
+                options={
+                    'refresh': refresh,
+                    'batch': serializer.validated_data.get('batch', False),
+                    'use_known_words': use_known_words,
+                },
+            )
+            return Response(
+                {'job_id': str(job.id), 'status': job.status, 'total': job.total_count},
+                status=status.HTTP_202_ACCEPTED,
+            )
         
-    #     sentences = serializer.validated_data.get('sentences', [])
-    #     logger.info(f"스트리밍 - 받은 문장 개수: {len(sentences)}")
+        # 학습 단어 모드: 사용자가 이미 저장한 단어 의미를 힌트로 넣고 응답에 채워 넣음
+        hints = KnownWordHints.for_user(request.user, language, sentences) if use_known_words else None
         
-    #     def event_stream():
-    #         """SSE 이벤트 스트림 생성기"""
-    #         try:
-    #             # 시작 이벤트
-    #             yield f"data: {json.dumps({'type': 'start', 'total': len(sentences)})}\n\n"
-                
-    #             for i, sent in enumerate(sentences):
-    #                 logger.info(f"스트리밍 - 처리 중인 문장 {i+1}: {sent}")
-                    
-    #                 # 처리 시작 이벤트
-    #                 yield f"data: {json.dumps({'type': 'processing', 'index': i, 'sentence': sent})}\n\n"
-                    
-    #                 gpt_response = call_gpt_for_sentence(sent)
-                    
-    #                 if gpt_response:
-    #                     # 성공 이벤트
-    #                     yield f"data: {json.dumps({'type': 'result', 'index': i, 'data': gpt_response})}\n\n"
-    #                     logger.info(f"스트리밍 - 문장 {i+1} 완료")
-    #                 else:
-    #                     # 실패 이벤트
-    #                     yield f"data: {json.dumps({'type': 'error', 'index': i, 'message': 'GPT 응답 실패'})}\n\n"
-    #                     logger.warning(f"스트리밍 - 문장 {i+1} 실패")
-                
-    #             # 완료 이벤트
-    #             yield f"data: {json.dumps({'type': 'complete'})}\n\n"
-    #             logger.info("스트리밍 완료")
-                
-    #         except Exception as e:
-    #             logger.error(f"스트리밍 오류: {e}")
-    #             yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        batch = serializer.validated_data.get('batch', False)
+        with llm_endpoint('analyze_sentences'):
+            outcome = run_analyses(
+                sentences,
+                language,
+                analyze=None if batch else partial(cached_call_gpt_for_sentence, refresh=refresh, hints=hints, user=request.user),
+                max_concurrency=max_concurrency,
+                batch=batch,
+                refresh=refresh,
+                time_budget=serializer.validated_data.get('time_budget') or settings.ANALYSIS_REQUEST_TIME_BUDGET,
+            )
         
-    #     response = StreamingHttpResponse(
-    #         event_stream(),
-    #         content_type='text/event-stream'
-    #     )
-    #     response['Cache-Control'] = 'no-cache'
-    #     response['Connection'] = 'keep-alive'
-    #     response['Access-Control-Allow-Origin'] = '*'
-    #     response['Access-Control-Allow-Headers'] = 'Content-Type'
-        
-    #     return response 
+        logger.info(
+            f"최종 결과 개수: {len(outcome.selected)}, 실패 개수: {len(outcome.failed)}, 미완료 개수: {len(outcome.pending)}"
+        )
+        payload = {"selected": outcome.selected, "failed": outcome.failed, "pending": outcome.pending}
+        if hints:
+            payload['known_words'] = hints.summary()
+        # 단어장 저장 시 결과 전체를 다시 보내지 않도록 서버에 초안으로 보관 (로그인 사용자만)
+        draft = save_draft(
+            request.user,
+            language,
+            {index: result for index, result in enumerate(outcome.results) if result is not None},
+        )
+        if draft:
+            payload['draft'] = draft
+        return Response(payload)
+
+
+class TextIngestView(APIView):
+    """
+    긴 텍스트(기사 등)를 문장으로 나누고, 중복/무의미한 문장을 제외한 뒤 분석 작업으로 등록합니다.
+    요청은 문장 분할까지만 하고 바로 반환하며, 분석은 워커가 배치로 처리합니다.
+    진행 상황은 analyze/jobs/<job_id>/ (폴링) 또는 analyze/jobs/<job_id>/stream/ (SSE)로 확인합니다.
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        request_body=TextIngestSerializer,
+        operation_summary="긴 텍스트를 문장으로 나눠 분석 작업 등록"
+    )
+    def post(self, request):
+        serializer = TextIngestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=400)
+
+        language = serializer.validated_data['language']
+        ingest = prepare_sentences(serializer.validated_data['text'], language)
+        logger.info(f"텍스트 분석 요청 - {ingest.stats}")
+        if not ingest.sentences:
+            return Response({'error': '분석할 문장이 없습니다.', 'ingest': ingest.stats}, status=400)
+
+        job = create_analysis_job(
+            ingest.sentences,
+            language,
+            user=request.user if request.user.is_authenticated else None,
+            options={
+                'refresh': serializer.validated_data['refresh'],
+                'batch': serializer.validated_data['batch'],
+                'source': 'text',
+                'ingest': ingest.stats,
+            },
+        )
+        return Response(
+            {'job_id': str(job.id), 'status': job.status, 'total': job.total_count, 'ingest': ingest.stats},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class SubtitleIngestView(APIView):
+    """
+    SRT/VTT 자막 파일을 문장으로 합치고, 반복/중복 문장을 제외한 뒤 분석 작업으로 등록합니다.
+    파일은 한 줄씩 읽어 처리하며, 작업 결과의 각 문장에는 자막 시각(meta.start_ms, meta.end_ms)이 포함됩니다.
+    단어장 저장 시 input_type은 youtube, 문장의 start_ms/end_ms를 함께 보내면 시각이 저장됩니다.
+    """
+    permission_classes = [AllowAny]
+    parser_classes = [MultiPartParser, FormParser]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'file',
+                openapi.IN_FORM,
+                description="자막 파일 (.srt, .vtt)",
+                type=openapi.TYPE_FILE,
+                required=True
+            ),
+            openapi.Parameter(
+                'language',
+                openapi.IN_FORM,
+                description="자막 언어 (기본값 english)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+        ],
+        operation_summary="자막 파일을 문장으로 나눠 분석 작업 등록",
+        consumes=['multipart/form-data']
+    )
+    def post(self, request):
+        serializer = SubtitleIngestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=400)
+
+        language = serializer.validated_data['language']
+        subtitle_file = serializer.validated_data['file']
+        ingest = prepare_subtitle_sentences(subtitle_file.chunks(), language)
+        logger.info(f"자막 분석 요청 - {subtitle_file.name}: {ingest.stats}")
+        if not ingest.sentences:
+            return Response({'error': '분석할 문장이 없습니다.', 'ingest': ingest.stats}, status=400)
+
+        job = create_analysis_job(
+            ingest.sentences,
+            language,
+            user=request.user if request.user.is_authenticated else None,
+            options={
+                'refresh': serializer.validated_data['refresh'],
+                'batch': serializer.validated_data['batch'],
+                'source': 'subtitles',
+                'ingest': ingest.stats,
+            },
+            metas=ingest.metas,
+        )
+        return Response(
+            {
+                'job_id': str(job.id),
+                'status': job.status,
+                'total': job.total_count,
+                'input_type': 'youtube',
+                'ingest': ingest.stats,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+def _sse(payload: dict) -> str:
+    """SSE data 라인 생성"""
+    return f"data: {json.dumps(payload, ensure_ascii=False, cls=DjangoJSONEncoder)}\n\n"
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class SentenceAnalyzeStreamView(View):
+    """
+    문장 리스트를 AI로 분석하고 처리 완료되는 대로 실시간 스트리밍(SSE)으로 반환
+    ASGI(config/asgi.py)에서 비동기로 동작하며, LLM 호출은 공용 스레드 풀에서 동시에 실행된다.
+
+    이벤트 (data: JSON, type 필드로 구분):
+    - start: {total}
+    - result: {index, data} - 완료 순서대로, index는 입력 순서
+    - error: {index, sentence, message}
+    - progress: {completed, failed, total}
+    - complete: {succeeded, failed, total, known_words?, draft?} - draft는 로그인 사용자의 분석 초안 {id, expires_in}
+    """
+    # SSE 연결 유지용 주석 라인 전송 간격 (nginx proxy_read_timeout 60s보다 짧게)
+    heartbeat_interval = 15
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({'error': '올바른 JSON 형식이 아닙니다.'}, status=400)
+
+        serializer = GPTSentenceAnalyzeSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse({'error': serializer.errors}, status=400)
+
+        sentences = serializer.validated_data.get('sentences', [])
+        language = serializer.validated_data.get('language', 'english')
+        refresh = serializer.validated_data.get('refresh', False)
+        max_concurrency = serializer.validated_data.get('max_concurrency')
+        logger.info(f"스트리밍 - 받은 문장 개수: {len(sentences)}")
+
+        user = await sync_to_async(_authenticate_plain_request)(request)
+        hints = None
+        if serializer.validated_data.get('use_known_words'):
+            hints = await sync_to_async(KnownWordHints.for_user)(user, language, sentences)
+
+        async def event_stream():
+            # 응답 생성기는 뷰와 다른 context에서 돌기 때문에 여기서 지정
+            set_llm_endpoint('analyze_sentences_stream')
+            total = len(sentences)
+            succeeded = failed = 0
+            results = {}
+            yield _sse({'type': 'start', 'total': total})
+
+            try:
+                events = aiter_analyses(
+                    sentences,
+                    language,
+                    analyze=partial(cached_call_gpt_for_sentence, refresh=refresh, hints=hints, user=user),
+                    max_concurrency=max_concurrency,
+                    idle_timeout=self.heartbeat_interval,
+                )
+                async for event in events:
+                    if event is None:
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    if event.ok:
+                        succeeded += 1
+                        results[event.index] = event.result
+                        yield _sse({'type': 'result', 'index': event.index, 'data': event.result})
+                    else:
+                        failed += 1
+                        logger.warning(f"스트리밍 - 문장 {event.index + 1} 실패: {event.error}")
+                        yield _sse({
+                            'type': 'error',
+                            'index': event.index,
+                            'sentence': event.sentence,
+                            'message': event.error,
+                        })
+                    yield _sse({
+                        'type': 'progress',
+                        'completed': succeeded + failed,
+                        'failed': failed,
+                        'total': total,
+                    })
+
+                complete = {'type': 'complete', 'succeeded': succeeded, 'failed': failed, 'total': total}
+                if hints:
+                    complete['known_words'] = hints.summary()
+                draft = await sync_to_async(save_draft)(user, language, results)
+                if draft:
+                    complete['draft'] = draft
+                yield _sse(complete)
+                logger.info("스트리밍 완료")
+
+            except Exception as e:
+                logger.error(f"스트리밍 오류: {e}")
+                yield _sse({'type': 'error', 'message': str(e)})
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx가 응답을 버퍼링하지 않고 이벤트를 바로 전달하도록 설정
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class OcrBaseView(View):
+    """
+    업로드 이미지(multipart: image, language)를 OCR 프로세스 풀에서 인식하는 비동기 뷰의 공통 부분
+    인식은 별도 프로세스에서 돌기 때문에 워커의 이벤트 루프와 다른 요청을 막지 않는다.
+    """
+
+    def read_upload(self, request):
+        """(이미지 바이트, 언어, 오류 응답)"""
+        image = request.FILES.get('image')
+        if image is None:
+            return None, None, JsonResponse({'error': '이미지 파일이 필요합니다.'}, status=400)
+        if image.size > settings.OCR_MAX_UPLOAD_BYTES:
+            return None, None, JsonResponse(
+                {'error': f'이미지 파일은 {settings.OCR_MAX_UPLOAD_BYTES // (1024 * 1024)}MB 이하만 가능합니다.'},
+                status=413,
+            )
+        return image.read(), request.POST.get('language', 'english'), None
+
+    async def collect_lines(self, data: bytes, language: str):
+        """모든 띠의 인식 결과를 모아 줄 목록으로 (오류 응답이 있으면 두 번째 값)"""
+        lines = []
+        try:
+            async for event in aiter_ocr(data, language):
+                if event['type'] == 'band':
+                    lines.extend(event['lines'])
+        except OCREngineError as e:
+            logger.error(f"OCR 엔진 실패: {e}")
+            return None, JsonResponse({'error': '이미지 인식 엔진을 사용할 수 없습니다. 잠시 후 다시 시도해주세요.'}, status=503)
+        except OCRError as e:
+            logger.warning(f"OCR 실패: {e}")
+            return None, JsonResponse({'error': str(e)}, status=400)
+        except asyncio.TimeoutError:
+            logger.warning("OCR 시간 초과")
+            return None, JsonResponse({'error': '이미지 인식 시간이 초과되었습니다.'}, status=504)
+        return lines, None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class OcrView(OcrBaseView):
+    """
+    이미지에서 단어와 각 단어의 박스 위치(원본 이미지 좌표)를 추출합니다.
+    응답: {words: [{text, box: {left, top, width, height}}]}
+    """
+
+    async def post(self, request):
+        data, language, error = self.read_upload(request)
+        if error:
+            return error
+        lines, error = await self.collect_lines(data, language)
+        if error:
+            return error
+        return JsonResponse({'words': lines_to_words(lines)})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class OcrSentenceView(OcrBaseView):
+    """
+    이미지에서 문장과 각 문장의 박스 위치(원본 이미지 좌표)를 추출합니다.
+    응답: {sentences: [{text, box: {left, top, width, height}}]}
+    """
+
+    async def post(self, request):
+        data, language, error = self.read_upload(request)
+        if error:
+            return error
+        lines, error = await self.collect_lines(data, language)
+        if error:
+            return error
+        return JsonResponse({'sentences': lines_to_sentences(lines, language)})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class OcrSentenceStreamView(OcrBaseView):
+    """
+    이미지에서 추출한 문장을 위쪽 띠(band)부터 인식되는 대로 SSE로 전달
+    긴 스크린샷도 첫 문장이 전체 인식을 기다리지 않고 나온다.
+
+    이벤트 (data: JSON, type 필드로 구분):
+    - start: {width, height, bands}
+    - sentences: {index, sentences: [{text, box}]} - 띠 순서대로
+    - error: {message}
+    - complete: {total}
+    """
+
+    async def post(self, request):
+        data, language, error = self.read_upload(request)
+        if error:
+            return error
+
+        async def event_stream():
+            total = 0
+            try:
+                async for event in aiter_ocr(data, language):
+                    if event['type'] == 'image':
+                        yield _sse({'type': 'start', 'width': event['width'], 'height': event['height'], 'bands': event['bands']})
+                        continue
+                    sentences = lines_to_sentences(event['lines'], language)
+                    total += len(sentences)
+                    yield _sse({'type': 'sentences', 'index': event['index'], 'sentences': sentences})
+                yield _sse({'type': 'complete', 'total': total})
+            except OCREngineError as e:
+                logger.error(f"OCR 스트리밍 엔진 실패: {e}")
+                yield _sse({'type': 'error', 'message': '이미지 인식 엔진을 사용할 수 없습니다. 잠시 후 다시 시도해주세요.'})
+            except OCRError as e:
+                logger.warning(f"OCR 스트리밍 실패: {e}")
+                yield _sse({'type': 'error', 'message': str(e)})
+            except asyncio.TimeoutError:
+                logger.warning("OCR 스트리밍 시간 초과")
+                yield _sse({'type': 'error', 'message': '이미지 인식 시간이 초과되었습니다.'})
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+def _get_job_for_user(user, job_id) -> AnalysisJob:
+    """작업 조회 (다른 사용자의 작업이면 404)"""
+    try:
+        job = AnalysisJob.objects.get(id=job_id)
+    except AnalysisJob.DoesNotExist:
+        raise Http404('분석 작업을 찾을 수 없습니다.')
+    if job.user_id is not None and job.user_id != getattr(user, 'id', None):
+        raise Http404('분석 작업을 찾을 수 없습니다.')
+    return job
+
+
+def _authenticate_plain_request(request):
+    """
+    DRF를 거치지 않는 (async) 뷰에서 JWT 헤더로 사용자 인증
+    토큰이 없거나 유효하지 않으면 세션 사용자(없으면 AnonymousUser)를 반환
+    """
+    try:
+        authenticated = FlexibleJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        authenticated = None
+    if authenticated:
+        return authenticated[0]
+    return request.user
+
+
+class AnalysisJobDetailView(APIView):
+    """
+    비동기 분석 작업의 상태와 현재까지의 결과를 조회합니다. (폴링용)
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'job_id',
+                openapi.IN_PATH,
+                description="분석 작업 ID",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        operation_summary="비동기 문장 분석 작업 상태 조회"
+    )
+    def get(self, request, job_id):
+        job = _get_job_for_user(request.user, job_id)
+        return Response(build_job_payload(job))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AnalysisJobStreamView(View):
+    """
+    비동기 분석 작업의 문장별 결과를 완료되는 대로 SSE로 전달
+    이벤트 형식은 SentenceAnalyzeStreamView와 같다. (start/result/error/progress/complete)
+    """
+    poll_interval = 1.0
+    heartbeat_interval = 15
+
+    async def get(self, request, job_id):
+        def load_job():
+            return _get_job_for_user(_authenticate_plain_request(request), job_id)
+
+        job = await sync_to_async(load_job)()
+
+        def fetch_finished(sent_ids):
+            items = list(
+                AnalysisJobItem.objects.filter(
+                    job_id=job.id,
+                    status__in=[AnalysisJobItem.STATUS_COMPLETED, AnalysisJobItem.STATUS_FAILED],
+                ).exclude(id__in=sent_ids).order_by('updated_at', 'id')
+            )
+            job.refresh_from_db(fields=['status'])
+            return items, job.status
+
+        async def event_stream():
+            sent_ids = set()
+            succeeded = failed = 0
+            idle = 0.0
+            yield _sse({'type': 'start', 'job_id': str(job.id), 'total': job.total_count})
+
+            while True:
+                items, job_status = await sync_to_async(fetch_finished)(sent_ids)
+                for item in items:
+                    sent_ids.add(item.id)
+                    # 자막 작업이면 문장의 시각 정보
+                    meta = {'meta': item.meta} if item.meta else {}
+                    if item.status == AnalysisJobItem.STATUS_COMPLETED:
+                        succeeded += 1
+                        yield _sse({'type': 'result', 'index': item.index, 'data': item.result, **meta})
+                    else:
+                        failed += 1
+                        yield _sse({
+                            'type': 'error',
+                            'index': item.index,
+                            'sentence': item.sentence,
+                            'message': item.error,
+                            **meta,
+                        })
+                if items:
+                    idle = 0.0
+                    yield _sse({'type': 'progress', 'completed': succeeded + failed, 'failed': failed, 'total': job.total_count})
+
+                if job_status == AnalysisJob.STATUS_COMPLETED and not items:
+                    break
+
+                await asyncio.sleep(self.poll_interval)
+                idle += self.poll_interval
+                if idle >= self.heartbeat_interval:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+
+            yield _sse({'type': 'complete', 'succeeded': succeeded, 'failed': failed, 'total': job.total_count})
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class LLMMetricsView(APIView):
+    """
+    LLM 호출 지표 (엔드포인트/모델/언어별 호출 수, 실패, 캐시 적중, 토큰, 추정 비용, 소요 시간 히스토그램)
+    Redis가 있으면 모든 워커의 합계(scope=cluster), 없으면 현재 프로세스 값(scope=process)을 반환한다.
+    ?output=prometheus 이면 Prometheus 텍스트 형식으로 반환
+    """
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'output',
+                openapi.IN_QUERY,
+                description="응답 형식 (json | prometheus)",
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ],
+        operation_summary="LLM 호출 지표 조회"
+    )
+    def get(self, request):
+        telemetry = get_telemetry()
+        series_metrics, scope = telemetry.snapshot()
+
+        if request.query_params.get('output') == 'prometheus':
+            return HttpResponse(
+                to_prometheus(series_metrics, telemetry.buckets),
+                content_type='text/plain; version=0.0.4; charset=utf-8',
+            )
+
+        client = get_llm_client()
+        return Response({
+            'scope': scope,
+            'series': summarize(series_metrics, telemetry.buckets),
+            # 아래 값은 이 요청을 처리한 프로세스 기준
+            'process': {
+                'pid': os.getpid(),
+                'cache': get_cache_stats(),
+                'retries': get_retry_stats(),
+                'hedging': client.hedge_stats(),
+                'circuit_breaker': client.breaker.state,
+            },
+        })
@@ -0,0 +1,251 @@
+import os
+import csv
+import html
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import zipfile
+import tempfile
+from typing import IO, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+from .models import Sentence
+
+# 문장 하나에 연결된 단어마다 한 행 (단어가 없는 문장은 단어 열이 None인 한 행)
+EXPORT_COLUMNS = (
+    'wordbook_id', 'wordbook__name', 'wordbook__language',
+    'id', 'text', 'meaning', 'start_ms', 'end_ms',
+    'word_links__word__text', 'word_links__word__others',
+    'word_links__meaning', 'word_links__pos', 'word_links__memo',
+)
+CSV_HEADER = (
+    'wordbook', 'language', 'sentence', 'sentence_meaning', 'start_ms', 'end_ms',
+    'word', 'others', 'word_meaning', 'pos', 'memo',
+)
+
+
+def export_rows(user, wordbook_id: Optional[int] = None) -> Iterator[tuple]:
+    """
+    사용자의 (또는 단어장 하나의) 문장/단어 행을 서버 측 커서로 조금씩 읽음
+    단어장 → 문장 → 단어 순서로 정렬되어 있어 한 문장의 행은 연속으로 나온다.
+    """
+    queryset = Sentence.objects.filter(wordbook__user=user)
+    if wordbook_id is not None:
+        queryset = queryset.filter(wordbook_id=wordbook_id)
+    return (
+        queryset.order_by('wordbook_id', 'id', 'word_links__id')
+        .values_list(*EXPORT_COLUMNS)
+        .iterator(chunk_size=settings.WORDBOOK_EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_sentences(rows: Iterator[tuple]) -> Iterator[Tuple[dict, dict]]:
+    """
+    행을 문장 단위로 묶어 (단어장, 문장) 반환 (메모리에는 문장 하나만 유지)
+    문장은 단어장 가져오기(NDJSON)와 같은 SentenceSelectionSerializer 형식
+    """
+    wordbook = sentence = None
+    sentence_id = None
+    for (wordbook_id, name, language, row_sentence_id, text, meaning, start_ms, end_ms,
+         word, others, word_meaning, pos, memo) in rows:
+        if row_sentence_id != sentence_id:
+            if sentence is not None:
+                yield wordbook, sentence
+            sentence_id = row_sentence_id
+            wordbook = {'id': wordbook_id, 'name': name, 'language': language}
+            sentence = {'text': text, 'meaning': meaning, 'start_ms': start_ms, 'end_ms': end_ms, 'words': []}
+        if word is not None:
+            sentence['words'].append({'text': word, 'meaning': word_meaning, 'others': others, 'pos': pos, 'memo': memo})
+    if sentence is not None:
+        yield wordbook, sentence
+
+
+def csv_chunks(rows: Iterator[tuple]) -> Iterator[str]:
+    """CSV (문장-단어 한 쌍마다 한 줄, 엑셀에서 한글이 깨지지 않도록 BOM 포함)"""
+    class Echo:
+        def write(self, value):
+            return value
+
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for (_, name, language, _, text, meaning, start_ms, end_ms,
+         word, others, word_meaning, pos, memo) in rows:
+        yield writer.writerow((name, language, text, meaning, start_ms, end_ms, word, others, word_meaning, pos, memo))
+
+
+def json_chunks(rows: Iterator[tuple]) -> Iterator[str]:
+    """JSON 배열 [{id, name, language, sentences: [...]}] (문장 하나씩 이어서 씀)"""
+    current = None
+    yield '['
+    for wordbook, sentence in iter_sentences(rows):
+        if current is None or wordbook['id'] != current:
+            head = json.dumps(wordbook, ensure_ascii=False)[:-1]
+            yield f"{']}, ' if current is not None else ''}{head}, \"sentences\": ["
+            current = wordbook['id']
+        else:
+            yield ', '
+        yield json.dumps(sentence, ensure_ascii=False)
+    yield ']}]' if current is not None else ']'
+
+
+def ndjson_chunks(rows: Iterator[tuple]) -> Iterator[str]:
+    """NDJSON (한 줄에 문장 하나, wordbooks/import/로 다시 가져올 수 있는 형식)"""
+    for wordbook, sentence in iter_sentences(rows):
+        yield json.dumps({**sentence, 'wordbook': wordbook['name']}, ensure_ascii=False) + '\n'
+
+
+class AnkiPackageWriter:
+    """
+    Anki 덱 패키지(.apkg) 작성기
+    임시 디렉터리의 SQLite 컬렉션(collection.anki2, 스키마 11)에 노트를 조금씩 INSERT 하고,
+    마지막에 zip으로 묶는다. 단어장은 덱 하나, 문장의 단어 하나가 노트(카드) 하나가 된다.
+    """
+    MODEL_ID = 1607392319000
+    DECK_ID_BASE = 1700000000000
+    FIELDS = ('Word', 'Reading', 'Meaning', 'POS', 'Sentence', 'SentenceMeaning', 'Memo')
+    FRONT = '<div class="word">{{Word}}</div><div class="sentence">{{Sentence}}</div>'
+    BACK = (
+        '{{FrontSide}}<hr id="answer">'
+        '<div>{{Reading}}</div><div class="meaning">{{Meaning}}</div><div>{{POS}}</div>'
+        '<div class="sentence">{{SentenceMeaning}}</div><div>{{Memo}}</div>'
+    )
+    CSS = '.card { font-family: arial; font-size: 20px; text-align: center; } .word { font-size: 32px; } .sentence { color: #555; }'
+    SCHEMA = """
+        CREATE TABLE col (id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+            ver integer not null, dty integer not null, usn integer not null, ls integer not null, conf text not null,
+            models text not null, decks text not null, dconf text not null, tags text not null);
+        CREATE TABLE notes (id integer primary key, guid text not null, mid integer not null, mod integer not null,
+            usn integer not null, tags text not null, flds text not null, sfld integer not null, csum integer not null,
+            flags integer not null, data text not null);
+        CREATE TABLE cards (id integer primary key, nid integer not null, did integer not null, ord integer not null,
+            mod integer not null, usn integer not null, type integer not null, queue integer not null, due integer not null,
+            ivl integer not null, factor integer not null, reps integer not null, lapses integer not null,
+            left integer not null, odue integer not null, odid integer not null, flags integer not null, data text not null);
+        CREATE TABLE revlog (id integer primary key, cid integer not null, usn integer not null, ivl integer not null,
+            lastIvl integer not null, factor integer not null, time integer not null, type integer not null);
+        CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+        CREATE INDEX ix_notes_usn on notes (usn);
+        CREATE INDEX ix_cards_usn on cards (usn);
+        CREATE INDEX ix_revlog_usn on revlog (usn);
+        CREATE INDEX ix_cards_nid on cards (nid);
+        CREATE INDEX ix_cards_sched on cards (did, queue, due);
+        CREATE INDEX ix_revlog_cid on revlog (cid);
+        CREATE INDEX ix_notes_csum on notes (csum);
+    """
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'collection.anki2')
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(self.SCHEMA)
+        self.now = int(time.time())
+        self._next_id = self.now * 1000
+        self.decks = {}
+        self.notes = 0
+        self._pending = []
+
+    def _id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _deck_id(self, wordbook: dict) -> int:
+        deck_id = self.DECK_ID_BASE + wordbook['id']
+        if deck_id not in self.decks:
+            self.decks[deck_id] = wordbook['name']
+        return deck_id
+
+    def add_sentence(self, wordbook: dict, sentence: dict) -> None:
+        deck_id = self._deck_id(wordbook)
+        for word in sentence['words']:
+            # 필드는 HTML로 표시되므로 이스케이프
+            fields = tuple(html.escape(value or '') for value in (
+                word['text'], word['others'], word['meaning'], word['pos'],
+                sentence['text'], sentence['meaning'], word['memo'],
+            ))
+            checksum = int(hashlib.sha1(word['text'].encode('utf-8')).hexdigest()[:8], 16)
+            guid = base64.b64encode(
+                hashlib.sha1(f"{wordbook['id']}:{sentence['text']}:{word['text']}".encode('utf-8')).digest()[:8]
+            ).decode('ascii')
+            note_id, card_id = self._id(), self._id()
+            self.notes += 1
+            self._pending.append((note_id, guid, fields, checksum, card_id, deck_id, self.notes))
+        if len(self._pending) >= settings.WORDBOOK_EXPORT_CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._db.executemany(
+            'INSERT INTO notes VALUES (?, ?, ?, ?, -1, \'\', ?, ?, ?, 0, \'\')',
+            [(note_id, guid, self.MODEL_ID, self.now, '\x1f'.join(fields), fields[0], checksum)
+             for note_id, guid, fields, checksum, _, _, _ in self._pending],
+        )
+        self._db.executemany(
+            'INSERT INTO cards VALUES (?, ?, ?, 0, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, \'\')',
+            [(card_id, note_id, deck_id, self.now, due)
+             for note_id, _, _, _, card_id, deck_id, due in self._pending],
+        )
+        self._db.commit()
+        self._pending = []
+
+    def _collection_row(self) -> tuple:
+        model = {
+            'id': self.MODEL_ID, 'name': 'Lingua Word', 'type': 0, 'mod': self.now, 'usn': -1, 'sortf': 0,
+            'did': next(iter(self.decks), 1),
+            'tmpls': [{'name': 'Card 1', 'ord': 0, 'qfmt': self.FRONT, 'afmt': self.BACK, 'did': None, 'bqfmt': '', 'bafmt': ''}],
+            'flds': [
+                {'name': name, 'ord': index, 'sticky': False, 'rtl': False, 'font': 'Arial', 'size': 20, 'media': []}
+                for index, name in enumerate(self.FIELDS)
+            ],
+            'css': self.CSS, 'latexPre': '', 'latexPost': '', 'tags': [], 'vers': [], 'req': [[0, 'any', [0]]],
+        }
+        deck_defaults = {
+            'mod': self.now, 'usn': -1, 'lrnToday': [0, 0], 'revToday': [0, 0], 'newToday': [0, 0],
+            'timeToday': [0, 0], 'collapsed': False, 'desc': '', 'dyn': 0, 'conf': 1, 'extendNew': 10, 'extendRev': 50,
+        }
+        decks = {'1': {**deck_defaults, 'id': 1, 'name': 'Default'}}
+        decks.update({str(deck_id): {**deck_defaults, 'id': deck_id, 'name': name} for deck_id, name in self.decks.items()})
+        dconf = {'1': {
+            'id': 1, 'name': 'Default', 'mod': 0, 'usn': 0, 'maxTaken': 60, 'timer': 0, 'autoplay': True,
+            'replayq': True, 'dyn': False,
+            'new': {'delays': [1, 10], 'ints': [1, 4, 7], 'initialFactor': 2500, 'order': 1, 'perDay': 20, 'bury': True},
+            'rev': {'perDay': 200, 'ease4': 1.3, 'fuzz': 0.05, 'maxIvl': 36500, 'bury': True, 'minSpace': 1},
+            'lapse': {'delays': [10], 'mult': 0, 'minInt': 1, 'leechFails': 8, 'leechAction': 0},
+        }}
+        conf = {'nextPos': self.notes + 1, 'curDeck': 1, 'curModel': self.MODEL_ID, 'sortType': 'noteFld', 'sortBackwards': False}
+        return (
+            1, self.now, self.now * 1000, self.now * 1000, 11, 0, 0, 0,
+            json.dumps(conf), json.dumps({str(self.MODEL_ID): model}), json.dumps(decks), json.dumps(dconf), '{}',
+        )
+
+    def write_to(self, fileobj: IO[bytes]) -> None:
+        """컬렉션을 마무리하고 .apkg(zip)로 fileobj에 씀"""
+        if self._pending:
+            self._flush()
+        self._db.execute('INSERT INTO col VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', self._collection_row())
+        self._db.commit()
+        self._db.close()
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as package:
+            package.write(self.path, 'collection.anki2')
+            package.writestr('media', '{}')
+
+    def close(self) -> None:
+        self._dir.cleanup()
+
+
+def build_anki_package(rows: Iterator[tuple]) -> Tuple[IO[bytes], int]:
+    """
+    행을 읽어 .apkg를 디스크(임시 파일)에 만들고 (처음 위치로 되감은 파일, 노트 수) 반환
+    반환한 파일은 닫으면 지워진다.
+    """
+    writer = AnkiPackageWriter()
+    try:
+        for wordbook, sentence in iter_sentences(rows):
+            writer.add_sentence(wordbook, sentence)
+        package = tempfile.TemporaryFile()
+        writer.write_to(package)
+    finally:
+        writer.close()
+    package.seek(0)
+    return package, writer.notes
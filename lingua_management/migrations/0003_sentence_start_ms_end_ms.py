@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0002_remove_category_unique_category_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentence',
+            name='start_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='end_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
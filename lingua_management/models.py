@@ -31,6 +31,8 @@ class Sentence(models.Model):
     wordbook = models.ForeignKey(Wordbook, related_name='sentences', on_delete=models.CASCADE)
     text = models.TextField()
     meaning = models.TextField(blank=True)
+    start_ms = models.PositiveIntegerField(null=True, blank=True)  # 자막에서 가져온 문장의 표시 시작 시각 (ms)
+    end_ms = models.PositiveIntegerField(null=True, blank=True)  # 자막에서 가져온 문장의 표시 끝 시각 (ms)
     created_at = models.DateTimeField(auto_now_add=True)
     last_reviewed_at = models.DateTimeField(default=timezone.now)
     review_count = models.IntegerField(default=0)
@@ -72,3 +74,24 @@ class SentenceWord(models.Model):
 
     def __str__(self):
         return f"'{self.word.text}' from '{self.sentence.text[:20]}...'"
+
+class IdempotencyRecord(models.Model):
+    """
+    Idempotency-Key 헤더로 보낸 요청의 처리 결과 (같은 키로 다시 보내면 저장된 응답을 그대로 반환)
+    요청을 처리하는 트랜잭션 안에서 먼저 INSERT하므로, 같은 키의 동시 요청은 유니크 인덱스에서 첫 요청이 끝나기를 기다린다.
+    """
+    user = models.ForeignKey(User, related_name='idempotency_records', on_delete=models.CASCADE)
+    scope = models.CharField(max_length=50)  # 엔드포인트 구분 (wordbook-create 등)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # 같은 키로 다른 요청을 보냈는지 확인용 (sha256)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key')
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.response_status})"
@@ -21,6 +21,6 @@ class SentenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sentence
         fields = [
-            'id', 'text', 'meaning', 'words', 'last_reviewed_at', 
+            'id', 'text', 'meaning', 'words', 'start_ms', 'end_ms', 'last_reviewed_at', 
             'review_count', 'is_last_review_successful'
         ]
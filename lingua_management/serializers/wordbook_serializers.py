@@ -1,12 +1,24 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from drf_yasg.utils import swagger_serializer_method
 
-from lingua_management.models import Wordbook, Category, Word, SentenceWord
+from lingua_management.models import Wordbook, Category, Word, Sentence, SentenceWord
 from lingua_management.serializers.category_serializers import CategoryRelatedField
 from lingua_management.serializers.sentence_serializers import SentenceSerializer
+from lingua_core.utils.analysis_drafts import DraftNotFound, load_draft
+
+def _word_links_prefetch() -> Prefetch:
+    """문장의 단어 연결 (SentenceSerializer.words)을 단어와 함께 한 번에 읽는 Prefetch"""
+    return Prefetch('word_links', queryset=SentenceWord.objects.select_related('word').order_by('id'))
+
 
 class WordWithSentencesSerializer(serializers.ModelSerializer):
     """
     단어와 그 단어가 포함된 모든 문장들을 보여주는 Serializer
+    문장 목록은 WordbookSerializer가 미리 조립해서 context['sentences_by_word'] (word_id → 문장 목록)로 넘겨준다.
     """
     sentences = serializers.SerializerMethodField()
     
@@ -15,42 +27,11 @@ class WordWithSentencesSerializer(serializers.ModelSerializer):
         fields = ['id', 'text', 'others', 'sentences']
     
     def get_sentences(self, obj):
-        # 현재 단어장 context 가져오기
-        current_wordbook = self.context.get('wordbook')
-        if not current_wordbook:
-            return []
-        
-        # 해당 단어가 사용된 모든 문장들 가져오기 (모든 단어장에서)
-        sentence_words = SentenceWord.objects.filter(
-            word=obj,
-            sentence__user=current_wordbook.user  # 같은 사용자의 문장들만
-        ).select_related('sentence', 'sentence__wordbook')
-        
-        sentences_data = []
-        for sw in sentence_words:
-            sentence_data = SentenceSerializer(sw.sentence).data
-            # 해당 문장에서 이 단어의 의미 추가
-            sentence_data['word_meaning_in_context'] = sw.meaning
-            sentence_data['word_pos_in_context'] = sw.pos
-            sentence_data['word_memo_in_context'] = sw.memo
-            # 현재 단어장에 속하는지 여부 표시
-            sentence_data['is_current_wordbook'] = sw.sentence.wordbook.id == current_wordbook.id
-            # 문장이 속한 단어장 정보 추가
-            sentence_data['wordbook_info'] = {
-                'id': sw.sentence.wordbook.id,
-                'name': sw.sentence.wordbook.name,
-                'category_name': sw.sentence.wordbook.category.name if sw.sentence.wordbook.category else None
-            }
-            sentences_data.append(sentence_data)
-        
-        # 현재 단어장 문장들을 먼저 정렬하고, 그 다음에 다른 단어장 문장들 정렬
-        sentences_data.sort(key=lambda x: (not x['is_current_wordbook'], x['wordbook_info']['name']))
-        
-        return sentences_data
+        return self.context.get('sentences_by_word', {}).get(obj.id, [])
 
 class WordbookSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True) # 클라이언트 카테고리 이름 조회용 
-    sentences = SentenceSerializer(many=True, read_only=True)
+    sentences = serializers.SerializerMethodField()
     words_with_sentences = serializers.SerializerMethodField()
     
     category = serializers.PrimaryKeyRelatedField(
@@ -64,24 +45,121 @@ class WordbookSerializer(serializers.ModelSerializer):
             'input_type', 'created_at', 'sentences', 'words_with_sentences'
         ]
         read_only_fields = ['created_at', 'sentences', 'words_with_sentences']
-    
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """상세 조회용 queryset (카테고리, 문장, 문장의 단어 연결을 미리 읽음)"""
+        return queryset.select_related('category').prefetch_related(
+            Prefetch('sentences', queryset=Sentence.objects.order_by('id').prefetch_related(_word_links_prefetch()))
+        )
+
+    def to_representation(self, instance):
+        # sentences와 words_with_sentences가 같은 문장 데이터를 쓰도록 한 번만 조립
+        self._graph = self._build_graph(instance)
+        return super().to_representation(instance)
+
+    def _build_graph(self, obj) -> dict:
+        """
+        단어장 문장, 단어, 단어별 문장(다른 단어장 포함)을 단어 수와 관계없이 일정한 쿼리 수로 읽어 메모리에서 조립
+        - 이 단어장의 문장 + 단어 연결 (setup_eager_loading으로 읽었으면 쿼리 없음)
+        - 단어 목록 한 번 (정렬은 DB collation 기준 order_by('text'))
+        - 이 단어장 단어들이 쓰인 다른 단어장의 연결 (문장, 단어장, 카테고리 포함) 한 번
+        - 다른 단어장 문장들의 단어 연결 한 번
+        문장마다 SentenceSerializer는 한 번만 실행하고 결과를 재사용한다.
+        """
+        sentences = list(obj.sentences.all())
+        prefetch_related_objects(sentences, _word_links_prefetch())
+
+        links = [(link, sentence) for sentence in sentences for link in sentence.word_links.all()]
+        word_ids = {link.word_id for link, _ in links}
+        words = list(Word.objects.filter(id__in=word_ids).order_by('text'))
+
+        other_links = list(
+            SentenceWord.objects.filter(
+                word_id__in=list(word_ids),
+                sentence__user_id=obj.user_id  # 같은 사용자의 문장들만 (사용자 조회 없이)
+            ).exclude(
+                sentence__wordbook=obj
+            ).select_related('sentence__wordbook__category').order_by('id')
+        )
+        others = list({link.sentence_id: link.sentence for link in other_links}.values())
+        prefetch_related_objects(others, _word_links_prefetch())
+
+        payloads = {
+            sentence.id: data
+            for sentence, data in zip(sentences + others, SentenceSerializer(sentences + others, many=True).data)
+        }
+
+        wordbook_infos = {}
+
+        def wordbook_info(wordbook):
+            info = wordbook_infos.get(wordbook.id)
+            if info is None:
+                info = wordbook_infos[wordbook.id] = {
+                    'id': wordbook.id,
+                    'name': wordbook.name,
+                    'category_name': wordbook.category.name if wordbook.category else None
+                }
+            return info
+
+        sentences_by_word = defaultdict(list)
+        for link, sentence in links + [(link, link.sentence) for link in other_links]:
+            is_current = sentence.wordbook_id == obj.id
+            sentences_by_word[link.word_id].append((link.id, {
+                **payloads[sentence.id],
+                # 해당 문장에서 이 단어의 의미
+                'word_meaning_in_context': link.meaning,
+                'word_pos_in_context': link.pos,
+                'word_memo_in_context': link.memo,
+                # 현재 단어장에 속하는지 여부와 문장이 속한 단어장 정보
+                'is_current_wordbook': is_current,
+                'wordbook_info': wordbook_info(obj if is_current else sentence.wordbook),
+            }))
+
+        # 현재 단어장 문장들을 먼저 정렬하고, 그 다음에 다른 단어장 문장들 정렬
+        for word_id, entries in sentences_by_word.items():
+            entries.sort(key=lambda entry: (not entry[1]['is_current_wordbook'], entry[1]['wordbook_info']['name'], entry[0]))
+            sentences_by_word[word_id] = [data for _, data in entries]
+
+        return {
+            'sentences': [payloads[sentence.id] for sentence in sentences],
+            'words': words,
+            'sentences_by_word': sentences_by_word,
+        }
+
+    @swagger_serializer_method(serializer_or_field=SentenceSerializer(many=True))
+    def get_sentences(self, obj):
+        return self._graph['sentences']
+
     def get_words_with_sentences(self, obj):
         """
         해당 단어장에 포함된 모든 단어들과 각 단어가 연결된 문장들을 반환
         """
-        # 단어장의 모든 문장에서 사용된 단어들을 중복 제거하여 수집
-        words = Word.objects.filter(
-            sentence_links__sentence__wordbook=obj
-        ).distinct().order_by('text')
-        
-        # WordWithSentencesSerializer에 wordbook context 전달
         serializer = WordWithSentencesSerializer(
-            words, 
-            many=True, 
-            context={'wordbook': obj}
+            self._graph['words'],
+            many=True,
+            context={'wordbook': obj, 'sentences_by_word': self._graph['sentences_by_word']}
         )
         return serializer.data
 
+class WordbookSummarySerializer(serializers.ModelSerializer):
+    """
+    단어장 목록용 요약 (문장/단어 목록 없이 개수만)
+    sentence_count, word_count, due_count는 with_summary_counts()로 annotate된 queryset에서 가져옴
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    sentence_count = serializers.IntegerField(read_only=True)
+    word_count = serializers.IntegerField(read_only=True)
+    due_count = serializers.IntegerField(read_only=True)  # 복습할 단어 수
+
+    class Meta:
+        model = Wordbook
+        fields = [
+            'id', 'name', 'category', 'category_name', 'language', 'input_type', 'created_at',
+            'sentence_count', 'word_count', 'due_count',
+        ]
+        read_only_fields = fields
+
 class WordbookUpdateSerializer(serializers.ModelSerializer):
     """
     단어장(노트)의 이름과 카테고리만 수정을 위한 Serializer
@@ -106,6 +184,8 @@ class WordSelectionSerializer(serializers.Serializer):
 class SentenceSelectionSerializer(serializers.Serializer):
     text = serializers.CharField()
     meaning = serializers.CharField(required=False, allow_blank=True)
+    start_ms = serializers.IntegerField(required=False, allow_null=True, min_value=0)  # 자막 문장의 시각 (ms)
+    end_ms = serializers.IntegerField(required=False, allow_null=True, min_value=0)
     words = WordSelectionSerializer(many=True)
 
 # 단어장 
@@ -116,6 +196,93 @@ class CommitSelectionSerializer(serializers.Serializer):
     input_type = serializers.CharField()
     sentences = SentenceSelectionSerializer(many=True) 
 
+# NDJSON 파일로 단어장 가져오기 (파일 한 줄 = SentenceSelectionSerializer 형식의 문장 하나)
+class WordbookImportSerializer(serializers.Serializer):
+    IMPORT_EXTENSIONS = ('.ndjson', '.jsonl')
+
+    file = serializers.FileField()
+    category = serializers.CharField()
+    name = serializers.CharField()
+    language = serializers.CharField()
+    input_type = serializers.CharField(required=False, default='text')
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(self.IMPORT_EXTENSIONS):
+            raise serializers.ValidationError("NDJSON(.ndjson, .jsonl) 파일만 업로드할 수 있습니다.")
+        if value.size > settings.WORDBOOK_IMPORT_MAX_BYTES:
+            raise serializers.ValidationError(f"파일은 {settings.WORDBOOK_IMPORT_MAX_BYTES // (1024 * 1024)}MB 이하만 업로드할 수 있습니다.")
+        return value
+
+## 분석 초안(draft_id)으로 단어장 생성 시: 분석 결과 대신 초안에서 고른 문장/단어의 위치와 수정한 값만 보냄
+
+# 단어 (초안 문장의 words 중 index번째, 나머지 필드는 수정할 때만)
+class DraftWordSelectionSerializer(serializers.Serializer):
+    index = serializers.IntegerField(min_value=0)
+    meaning = serializers.CharField(required=False, allow_blank=True)
+    others = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    pos = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    memo = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+# 문장 (분석 요청의 index번째 문장, 분석 응답 selected/failed/pending의 index와 같은 기준)
+class DraftSentenceSelectionSerializer(serializers.Serializer):
+    index = serializers.IntegerField(min_value=0)
+    meaning = serializers.CharField(required=False, allow_blank=True)
+    start_ms = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    end_ms = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    words = DraftWordSelectionSerializer(many=True)
+
+# 단어장
+class DraftCommitSelectionSerializer(serializers.Serializer):
+    """
+    검증 후 validated_data는 CommitSelectionSerializer와 같은 형태 (language, sentences는 초안에서 채움)
+    context에 request가 있어야 함 (다른 사용자의 초안은 사용할 수 없음)
+    """
+    draft_id = serializers.UUIDField()
+    category = serializers.CharField()
+    name = serializers.CharField()
+    input_type = serializers.CharField()
+    sentences = DraftSentenceSelectionSerializer(many=True)
+
+    def validate(self, data):
+        try:
+            draft = load_draft(data['draft_id'], self.context['request'].user)
+        except DraftNotFound as e:
+            raise serializers.ValidationError({'draft_id': str(e)})
+
+        sentences = []
+        for selection in data['sentences']:
+            result = draft['results'].get(str(selection['index']))
+            if result is None:
+                raise serializers.ValidationError({'sentences': f"초안에 {selection['index']}번 문장의 분석 결과가 없습니다."})
+            analyzed_words = result.get('words', [])
+
+            words = []
+            for word_selection in selection['words']:
+                if word_selection['index'] >= len(analyzed_words):
+                    raise serializers.ValidationError(
+                        {'sentences': f"{selection['index']}번 문장에 {word_selection['index']}번 단어가 없습니다."}
+                    )
+                analyzed = analyzed_words[word_selection['index']]
+                words.append({
+                    'text': analyzed['text'],
+                    'meaning': word_selection.get('meaning', analyzed.get('meaning') or ''),
+                    'others': word_selection.get('others', analyzed.get('others')),
+                    'pos': word_selection.get('pos', analyzed.get('pos')) or '',
+                    'memo': word_selection.get('memo') or '',
+                })
+
+            sentences.append({
+                'text': result['text'],
+                'meaning': selection.get('meaning', result.get('meaning') or ''),
+                'start_ms': selection.get('start_ms'),
+                'end_ms': selection.get('end_ms'),
+                'words': words,
+            })
+
+        data['language'] = draft['language']
+        data['sentences'] = sentences
+        return data
+
 # 카테고리 형식 검증 & 직렬화
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
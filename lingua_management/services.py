@@ -0,0 +1,257 @@
+import json
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, QuerySet
+from django.utils import timezone
+
+from .models import Category, Wordbook, Sentence, Word, SentenceWord, IdempotencyRecord
+from .serializers.wordbook_serializers import SentenceSelectionSerializer
+
+logger = logging.getLogger(__name__)
+
+# 한 INSERT 문에 넣을 최대 행 수 (PostgreSQL 파라미터 수 상한 65535보다 충분히 작게)
+BULK_BATCH_SIZE = 1000
+
+
+def with_summary_counts(wordbooks: QuerySet) -> QuerySet:
+    """
+    단어장 queryset에 문장 수, 단어 수, 복습할 단어 수를 annotate (단어장 수와 관계없이 쿼리 한 번)
+    복습할 단어: 아직 복습하지 않았거나, 마지막 복습에 실패했거나, 마지막 복습 후 REVIEW_DUE_DAYS일이 지난 단어
+    """
+    due_before = timezone.now() - timedelta(days=settings.REVIEW_DUE_DAYS)
+    word = 'sentences__word_links__word'
+    return wordbooks.select_related('category').annotate(
+        sentence_count=Count('sentences', distinct=True),
+        word_count=Count(word, distinct=True),
+        due_count=Count(
+            word,
+            distinct=True,
+            filter=(
+                Q(**{f'{word}__review_count': 0})
+                | Q(**{f'{word}__is_last_review_successful': False})
+                | Q(**{f'{word}__last_reviewed_at__lte': due_before})
+            ),
+        ),
+    )
+
+
+def _collect_words(sentences: List[dict]) -> Dict[str, str]:
+    """저장할 단어 (소문자 text → others), 같은 단어가 여러 번 나오면 마지막으로 나온 비어 있지 않은 others 사용"""
+    words = {}
+    for sent in sentences:
+        for word in sent['words']:
+            text = word['text'].lower()
+            others = word.get('others') or ''
+            if others or text not in words:
+                words[text] = others
+    return words
+
+
+def _upsert_words(user, words: Dict[str, str], now) -> Dict[str, int]:
+    """
+    사용자의 단어를 upsert하고 text → id 반환 (단어 수와 관계없이 쿼리 3번)
+    - others가 있는 단어: unique_word_text 충돌 시 others만 갱신 (새로운 발음 정보가 있을 수 있음)
+    - others가 없는 단어: 이미 있으면 그대로 둠
+    """
+    with_others = [Word(user=user, text=text, others=others, created_at=now) for text, others in words.items() if others]
+    without_others = [Word(user=user, text=text, others='', created_at=now) for text, others in words.items() if not others]
+
+    if with_others:
+        Word.objects.bulk_create(
+            with_others,
+            update_conflicts=True,
+            unique_fields=['user', 'text'],
+            update_fields=['others'],
+            batch_size=BULK_BATCH_SIZE,
+        )
+    if without_others:
+        Word.objects.bulk_create(without_others, ignore_conflicts=True, batch_size=BULK_BATCH_SIZE)
+
+    # 충돌로 건너뛴 행은 id가 채워지지 않으므로 한 번에 다시 조회
+    return dict(Word.objects.filter(user=user, text__in=list(words)).values_list('text', 'id'))
+
+
+def insert_sentences(user, wordbook: Wordbook, selected: List[dict], now) -> dict:
+    """
+    (transaction.atomic 안에서 호출) 선택한 문장/단어를 단어장에 추가
+    문장/단어 수와 관계없이 쿼리 수가 일정하도록 문장, 단어, 연결을 각각 한 번에 INSERT 한다.
+
+    Returns:
+        dict: {sentences, words, links} 저장한 개수
+    """
+    # PostgreSQL은 bulk_create 후 pk를 채워 줌
+    sentences = Sentence.objects.bulk_create(
+        [
+            Sentence(
+                user=user,
+                wordbook=wordbook,
+                text=sent['text'],
+                meaning=sent.get('meaning', ''),
+                start_ms=sent.get('start_ms'),
+                end_ms=sent.get('end_ms'),
+                created_at=now
+            )
+            for sent in selected
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    word_ids = _upsert_words(user, _collect_words(selected), now)
+
+    links = []
+    linked = set()
+    for sentence, sent in zip(sentences, selected):
+        for word in sent['words']:
+            word_id = word_ids[word['text'].lower()]
+            # 한 문장에 같은 단어를 두 번 고르면 처음 것만 저장 (unique_sentence_word)
+            if (sentence.id, word_id) in linked:
+                continue
+            linked.add((sentence.id, word_id))
+            links.append(SentenceWord(
+                word_id=word_id,
+                sentence=sentence,
+                meaning=word.get('meaning', ''),
+                pos=word.get('pos') or '',
+                memo=word.get('memo') or '',
+            ))
+    SentenceWord.objects.bulk_create(links, batch_size=BULK_BATCH_SIZE)
+    return {'sentences': len(sentences), 'words': len(word_ids), 'links': len(links)}
+
+
+def create_wordbook(user, data: dict, now) -> Wordbook:
+    """단어장 생성 (카테고리는 이름/언어로 찾거나 새로 만듦)"""
+    category, _ = Category.objects.get_or_create(
+        user=user, name=data['category'], language=data['language']
+    )
+    return Wordbook.objects.create(
+        user=user,
+        name=data['name'],
+        category=category,
+        language=data['language'],
+        input_type=data['input_type'],
+        created_at=now
+    )
+
+
+def save_wordbook(user, data: dict) -> Wordbook:
+    """
+    선택한 문장/단어로 단어장을 만들어 한 트랜잭션에 저장 (CommitSelectionSerializer의 validated_data)
+    중간에 실패하면 단어장, 문장, 단어 모두 저장되지 않는다.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        wordbook = create_wordbook(user, data, now)
+        counts = insert_sentences(user, wordbook, data['sentences'], now)
+
+    logger.info(f"단어장 저장: {wordbook.id} ({counts})")
+    return wordbook
+
+
+def import_wordbook_lines(user, wordbook: Wordbook, lines: Iterable[str]) -> Iterator[dict]:
+    """
+    NDJSON 줄(한 줄에 SentenceSelectionSerializer 형식의 문장 하나)을 읽으며 검증하고
+    WORDBOOK_IMPORT_CHUNK_SIZE개씩 모아 조각마다 한 트랜잭션으로 저장 (메모리에는 한 조각만 유지)
+
+    Yields:
+        - error: {line, error} - 잘못된 줄 (WORDBOOK_IMPORT_MAX_ERRORS개까지만 알림, 나머지는 개수만 셈)
+        - progress: {lines, imported, failed} - 조각을 저장할 때마다, 마지막에 한 번 더 (최종 개수)
+    """
+    chunk = []
+    progress = {'lines': 0, 'imported': 0, 'failed': 0}
+
+    def flush():
+        with transaction.atomic():
+            insert_sentences(user, wordbook, chunk, timezone.now())
+        progress['imported'] += len(chunk)
+        chunk.clear()
+        return {'type': 'progress', **progress}
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        progress['lines'] += 1
+        try:
+            serializer = SentenceSelectionSerializer(data=json.loads(line))
+            valid = serializer.is_valid()
+            error = serializer.errors
+        except ValueError as e:
+            valid, error = False, f"JSON 형식이 아닙니다: {e}"
+        if not valid:
+            progress['failed'] += 1
+            if progress['failed'] <= settings.WORDBOOK_IMPORT_MAX_ERRORS:
+                yield {'type': 'error', 'line': number, 'error': error}
+            continue
+
+        chunk.append(serializer.validated_data)
+        if len(chunk) >= settings.WORDBOOK_IMPORT_CHUNK_SIZE:
+            yield flush()
+
+    # 마지막 조각 (없으면 최종 개수만)
+    yield flush() if chunk else {'type': 'progress', **progress}
+
+
+class IdempotencyKeyConflict(Exception):
+    """같은 Idempotency-Key로 내용이 다른 요청을 보냄"""
+
+
+def request_fingerprint(data) -> str:
+    """요청 본문의 sha256 (키 순서와 관계없이 같은 내용이면 같은 값)"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _check_fingerprint(record: IdempotencyRecord, fingerprint: str) -> IdempotencyRecord:
+    if record.request_hash != fingerprint:
+        raise IdempotencyKeyConflict('같은 Idempotency-Key로 다른 요청을 보낼 수 없습니다.')
+    return record
+
+
+def _idempotency_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def find_idempotent_response(user, scope: str, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+    """
+    이미 처리된 요청의 기록 (재시도는 이 조회 한 번으로 끝남), 없거나 IDEMPOTENCY_KEY_TTL이 지났으면 None
+
+    Raises:
+        IdempotencyKeyConflict: 같은 키로 내용이 다른 요청
+    """
+    record = IdempotencyRecord.objects.filter(
+        user=user, scope=scope, key=key, created_at__gte=_idempotency_cutoff()
+    ).first()
+    return _check_fingerprint(record, fingerprint) if record else None
+
+
+def claim_idempotency_key(user, scope: str, key: str, fingerprint: str) -> Tuple[IdempotencyRecord, bool]:
+    """
+    (transaction.atomic 안에서 호출) 키를 선점하고 (기록, 선점 여부) 반환
+    같은 키를 처리 중인 트랜잭션이 있으면 INSERT가 유니크 인덱스에서 그 트랜잭션이 끝날 때까지 기다린다.
+    - 먼저 처리한 요청이 커밋됐으면 그 기록을 (record, False)로 반환 (응답 재전송)
+    - 롤백됐으면 이 요청이 키를 선점 (record, True)
+
+    Raises:
+        IdempotencyKeyConflict: 같은 키로 내용이 다른 요청
+    """
+    # 만료된 기록은 지우고 새로 처리
+    IdempotencyRecord.objects.filter(user=user, scope=scope, key=key, created_at__lt=_idempotency_cutoff()).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(user=user, scope=scope, key=key, request_hash=fingerprint)
+        return record, True
+    except IntegrityError:
+        record = IdempotencyRecord.objects.get(user=user, scope=scope, key=key)
+        return _check_fingerprint(record, fingerprint), False
+
+
+def complete_idempotency_key(record: IdempotencyRecord, status_code: int, body: dict) -> None:
+    """선점한 키에 응답 저장 (요청 처리와 같은 트랜잭션에서 커밋됨)"""
+    record.response_status = status_code
+    record.response_body = body
+    record.save(update_fields=['response_status', 'response_body'])
@@ -1,3 +1,266 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from lingua_management.models import Category, IdempotencyRecord, Sentence, Word, Wordbook
+from lingua_management.services import save_wordbook
+
+
+def selection(name='book', sentences=None, category='daily'):
+    """CommitSelectionSerializer 형식의 단어장 저장 요청"""
+    return {
+        'category': category,
+        'name': name,
+        'language': 'english',
+        'input_type': 'text',
+        'sentences': sentences if sentences is not None else [
+            {
+                'text': 'I like apples.',
+                'meaning': '나는 사과를 좋아한다.',
+                'words': [
+                    {'text': 'like', 'meaning': '좋아하다', 'pos': 'verb'},
+                    {'text': 'Apples', 'meaning': '사과', 'pos': 'noun', 'memo': '복수형'},
+                ],
+            },
+            {
+                'text': 'Apples are red.',
+                'meaning': '사과는 빨갛다.',
+                'start_ms': 1000,
+                'end_ms': 2500,
+                'words': [{'text': 'red', 'meaning': '빨간', 'others': ''}],
+            },
+        ],
+    }
+
+
+def streamed(response) -> bytes:
+    """StreamingHttpResponse(비동기 iterator)의 내용을 모두 읽음"""
+    async def collect():
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    return async_to_sync(collect)()
+
+
+class WordbookTestCase(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='learner', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def import_lines(self, lines, name='imported'):
+        """NDJSON 줄을 파일로 올려 가져오고 스트리밍 응답의 이벤트 목록 반환"""
+        upload = SimpleUploadedFile('book.ndjson', ''.join(lines).encode('utf-8'))
+        response = self.client.post(
+            '/api/v1/wordbooks/import/',
+            {'file': upload, 'category': 'daily', 'name': name, 'language': 'english'},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in streamed(response).decode('utf-8').splitlines()]
+
+
+class WordbookCreateIdempotencyTests(WordbookTestCase):
+    url = '/api/v1/wordbooks/save/'
+
+    def test_retry_with_same_key_replays_first_response(self):
+        first = self.client.post(self.url, selection(), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        retry = self.client.post(self.url, selection(), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(Wordbook.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Sentence.objects.filter(user=self.user).count(), 2)
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.client.post(self.url, selection(), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        conflict = self.client.post(self.url, selection(name='other'), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(conflict.status_code, 422)
+        self.assertEqual(Wordbook.objects.filter(user=self.user).count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.client.post(self.url, selection(), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        other = get_user_model().objects.create_user(username='other', password='pw')
+        self.client.force_authenticate(other)
+
+        response = self.client.post(self.url, selection(), format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(IdempotencyRecord.objects.filter(key='key-1').count(), 2)
+
+    def test_without_key_every_request_creates_a_wordbook(self):
+        self.client.post(self.url, selection(), format='json')
+        self.client.post(self.url, selection(), format='json')
+
+        self.assertEqual(Wordbook.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+
+class WordbookImportTests(WordbookTestCase):
+    @override_settings(WORDBOOK_IMPORT_CHUNK_SIZE=1)
+    def test_invalid_lines_are_reported_and_skipped(self):
+        lines = [
+            json.dumps({'text': 'Good line.', 'words': [{'text': 'good'}]}) + '\n',
+            'not json\n',
+            '\n',
+            json.dumps({'text': 'No words.'}) + '\n',
+            json.dumps({'text': 'Another good line.', 'words': []}) + '\n',
+        ]
+
+        events = self.import_lines(lines)
+
+        errors = [event['line'] for event in events if event['type'] == 'error']
+        self.assertEqual(errors, [2, 4])
+        self.assertEqual(events[-1], {
+            'type': 'complete', 'wordbook_id': events[0]['wordbook_id'], 'lines': 4, 'imported': 2, 'failed': 2,
+        })
+        self.assertEqual(Sentence.objects.filter(wordbook_id=events[0]['wordbook_id']).count(), 2)
+
+    def test_import_without_valid_lines_removes_the_wordbook(self):
+        events = self.import_lines(['not json\n'])
+
+        self.assertIsNone(events[-1]['wordbook_id'])
+        self.assertFalse(Wordbook.objects.filter(user=self.user).exists())
+
+    def test_only_ndjson_files_are_accepted(self):
+        upload = SimpleUploadedFile('book.csv', b'text\n')
+        response = self.client.post(
+            '/api/v1/wordbooks/import/',
+            {'file': upload, 'category': 'daily', 'name': 'csv', 'language': 'english'},
+            format='multipart',
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class WordbookExportTests(WordbookTestCase):
+    def export(self, wordbook_id, file_format):
+        response = self.client.get(f'/api/v1/wordbooks/{wordbook_id}/export/', {'file_format': file_format})
+        self.assertEqual(response.status_code, 200)
+        return streamed(response).decode('utf-8')
+
+    def test_ndjson_export_import_round_trip(self):
+        original = save_wordbook(self.user, selection())
+        exported = self.export(original.id, 'ndjson')
+
+        events = self.import_lines(exported.splitlines(keepends=True))
+
+        complete = events[-1]
+        self.assertEqual((complete['type'], complete['imported'], complete['failed']), ('complete', 2, 0))
+        reexported = self.export(complete['wordbook_id'], 'ndjson')
+        without_name = lambda text: [{**json.loads(line), 'wordbook': None} for line in text.splitlines()]
+        self.assertEqual(without_name(reexported), without_name(exported))
+        # 같은 사용자의 단어는 새로 만들지 않고 재사용
+        self.assertEqual(Word.objects.filter(user=self.user).count(), 3)
+
+    def test_csv_and_json_exports(self):
+        wordbook = save_wordbook(self.user, selection())
+
+        rows = self.export(wordbook.id, 'csv').lstrip('\ufeff').splitlines()
+        books = json.loads(self.export(wordbook.id, 'json'))
+
+        self.assertEqual(len(rows), 1 + 3)  # 헤더 + 문장-단어 쌍
+        self.assertEqual([sentence['text'] for sentence in books[0]['sentences']], ['I like apples.', 'Apples are red.'])
+        self.assertEqual(books[0]['sentences'][1]['start_ms'], 1000)
+
+    def test_export_of_another_users_wordbook_is_not_found(self):
+        other = get_user_model().objects.create_user(username='other', password='pw')
+        wordbook = save_wordbook(other, selection())
+
+        response = self.client.get(f'/api/v1/wordbooks/{wordbook.id}/export/')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class WordbookQueryCountTests(WordbookTestCase):
+    """목록/상세 조회의 쿼리 수가 단어장, 문장, 단어 수와 관계없이 일정함"""
+
+    def make_wordbooks(self, count, sentences_per_book, start=0):
+        for number in range(start, start + count):
+            save_wordbook(self.user, selection(
+                name=f'book {number}',
+                category=f'category {number % 2}',
+                sentences=[
+                    {
+                        'text': f'Sentence {number}-{i} shares a word.',
+                        'words': [{'text': 'shares', 'meaning': '공유하다'}, {'text': f'word{number}x{i}', 'meaning': '단어'}],
+                    }
+                    for i in range(sentences_per_book)
+                ],
+            ))
+
+    def test_list_query_count_is_constant(self):
+        self.make_wordbooks(1, 1)
+        with self.assertNumQueries(1):
+            small = self.client.get('/api/v1/wordbooks/')
+
+        self.make_wordbooks(5, 4, start=1)
+        with self.assertNumQueries(1):
+            large = self.client.get('/api/v1/wordbooks/')
+
+        self.assertEqual(small.json()['total_count'], 1)
+        self.assertEqual(large.json()['total_count'], 6)
+        summary = next(book for book in large.json()['wordbooks'] if book['name'] == 'book 5')
+        self.assertEqual((summary['sentence_count'], summary['word_count'], summary['due_count']), (4, 5, 5))
+
+    def test_list_filtered_by_category(self):
+        self.make_wordbooks(4, 1)
+        category = Category.objects.get(user=self.user, name='category 0')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/wordbooks/', {'category_id': category.id})
+
+        self.assertEqual(response.json()['total_count'], 2)
+        self.assertEqual(response.json()['category'], {'id': category.id, 'name': 'category 0'})
+
+    def test_detail_query_count_is_constant(self):
+        # 단어장+카테고리, 문장, 문장의 단어 연결, 단어, 다른 단어장의 연결, 다른 단어장 문장의 단어 연결
+        self.make_wordbooks(2, 1)
+        small_book = Wordbook.objects.get(user=self.user, name='book 0')
+        with self.assertNumQueries(6):
+            small = self.client.get(f'/api/v1/wordbooks/{small_book.id}/')
+
+        self.make_wordbooks(4, 10, start=2)
+        large_book = Wordbook.objects.get(user=self.user, name='book 5')
+        with self.assertNumQueries(6):
+            large = self.client.get(f'/api/v1/wordbooks/{large_book.id}/')
+
+        self.assertEqual(len(small.json()['words_with_sentences']), 2)
+        self.assertEqual(len(large.json()['words_with_sentences']), 11)
+        shares = next(word for word in large.json()['words_with_sentences'] if word['text'] == 'shares')
+        self.assertEqual(len(shares['sentences']), 2 + 4 * 10)
+
+    def test_detail_response_shape(self):
+        book = save_wordbook(self.user, selection())
+        other = save_wordbook(self.user, selection(name='another', category='travel', sentences=[
+            {'text': 'Red apples.', 'words': [{'text': 'apples', 'meaning': '사과들', 'pos': 'noun'}]},
+        ]))
+
+        data = self.client.get(f'/api/v1/wordbooks/{book.id}/').json()
+
+        self.assertEqual([sentence['text'] for sentence in data['sentences']], ['I like apples.', 'Apples are red.'])
+        self.assertEqual([word['text'] for word in data['words_with_sentences']], ['apples', 'like', 'red'])
+        apples = data['words_with_sentences'][0]['sentences']
+        self.assertEqual([sentence['text'] for sentence in apples], ['I like apples.', 'Red apples.'])
+        self.assertEqual(apples[0]['word_memo_in_context'], '복수형')
+        self.assertTrue(apples[0]['is_current_wordbook'])
+        self.assertEqual(apples[1]['word_meaning_in_context'], '사과들')
+        self.assertEqual(apples[1]['wordbook_info'], {'id': other.id, 'name': 'another', 'category_name': 'travel'})
+        self.assertEqual(apples[0]['words'], data['sentences'][0]['words'])
+
+    def test_detail_excludes_other_users_sentences(self):
+        book = save_wordbook(self.user, selection())
+        other = get_user_model().objects.create_user(username='other', password='pw')
+        save_wordbook(other, selection(name='theirs'))
+
+        data = self.client.get(f'/api/v1/wordbooks/{book.id}/').json()
+
+        books = {sentence['wordbook_info']['name'] for word in data['words_with_sentences'] for sentence in word['sentences']}
+        self.assertEqual(books, {'book'})
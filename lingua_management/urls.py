@@ -4,6 +4,8 @@ from .views.wordbook_views import (
     WordbookListView,
     WordbookCreateView,
     WordbookDetailView,
+    WordbookImportView,
+    WordbookExportView,
 )
 from .views.word_views import WordManageView, WordContextWithTextView
 from .views.sentence_views import SentenceManageView
@@ -21,6 +23,9 @@ urlpatterns = [
     # 1. Management APIs - Wordbook
     path('wordbooks/', WordbookListView.as_view(), name='wordbook-list'),
     path('wordbooks/save/', WordbookCreateView.as_view(), name='wordbook-create'),
+    path('wordbooks/import/', WordbookImportView.as_view(), name='wordbook-import'),
+    path('wordbooks/export/', WordbookExportView.as_view(), name='wordbook-export-all'),
+    path('wordbooks/<int:wordbook_id>/export/', WordbookExportView.as_view(), name='wordbook-export'),
     path('wordbooks/<int:wordbook_id>/', WordbookDetailView.as_view(), name='wordbook-detail'),
 
     # 2. Management APIs - Word
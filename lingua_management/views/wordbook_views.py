@@ -1,15 +1,44 @@
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
 from rest_framework import status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.db import IntegrityError
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 
-from ..models import Category, Wordbook, Sentence, Word, SentenceWord
-from ..serializers.wordbook_serializers import CommitSelectionSerializer, WordbookUpdateSerializer, WordbookSerializer
+from ..exporters import build_anki_package, csv_chunks, export_rows, json_chunks, ndjson_chunks
+from ..models import Category, Wordbook
+from ..serializers.wordbook_serializers import (
+    CommitSelectionSerializer,
+    DraftCommitSelectionSerializer,
+    WordbookImportSerializer,
+    WordbookSummarySerializer,
+    WordbookUpdateSerializer,
+    WordbookSerializer,
+)
+from ..services import (
+    IdempotencyKeyConflict,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    create_wordbook,
+    find_idempotent_response,
+    import_wordbook_lines,
+    request_fingerprint,
+    save_wordbook,
+    with_summary_counts,
+)
+from lingua_core.utils.analysis_drafts import delete_draft
+from lingua_core.utils.subtitles import iter_lines
 
 import logging
 
@@ -22,6 +51,7 @@ class WordbookListView(APIView):
     사용자의 단어장 목록을 조회하는 View
     - 카테고리가 없으면 모든 단어장 조회
     - 카테고리가 있으면 해당 카테고리의 단어장만 조회
+    - 단어장마다 요약(문장/단어/복습할 단어 수)만 반환, 문장과 단어는 상세 조회(wordbooks/<id>/)에서
     """
     permission_classes = [IsAuthenticated]
 
@@ -73,7 +103,6 @@ class WordbookListView(APIView):
         
         # 기본 쿼리셋
         wordbooks = Wordbook.objects.filter(user=user)
-        logger.info(f"wordbooks: {wordbooks}")
         
         category_info = None
         
@@ -98,15 +127,15 @@ class WordbookListView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # 정렬
-        wordbooks = wordbooks.order_by('-created_at')
+        # 정렬, 문장/단어/복습할 단어 수는 한 번의 집계 쿼리로
+        wordbooks = list(with_summary_counts(wordbooks).order_by('-created_at'))
         
-        # 시리얼라이즈
-        serializer = WordbookSerializer(wordbooks, many=True)
+        # 시리얼라이즈 (문장/단어 목록은 상세 조회에서만)
+        serializer = WordbookSummarySerializer(wordbooks, many=True)
         
         response_data = {
             'wordbooks': serializer.data,
-            'total_count': wordbooks.count()
+            'total_count': len(wordbooks)
         }
         
         # 카테고리 정보가 있으면 추가
@@ -121,73 +150,243 @@ class WordbookCreateView(APIView):
     단어장(노트)을 생성(저장)하는 View
     """
     permission_classes = [IsAuthenticated]
+    idempotency_scope = 'wordbook-create'
 
     @swagger_auto_schema(
         request_body=CommitSelectionSerializer,
-        operation_summary="분석된 단어/문장을 새 노트에 저장"
+        operation_summary="분석된 단어/문장을 새 노트에 저장",
+        operation_description=(
+            "분석 응답의 draft.id가 있으면 분석 결과 대신 draft_id와 고른 문장/단어의 index, "
+            "수정한 값만 보낼 수 있습니다. (DraftCommitSelectionSerializer)"
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'Idempotency-Key',
+                openapi.IN_HEADER,
+                description="재시도 시 같은 값을 보내면 단어장을 다시 만들지 않고 처음 응답을 반환 (Idempotent-Replayed: true)",
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ],
     )
     def post(self, request):
         """
         사용자가 선택한 단어와 문장을 새로운 단어장에 저장합니다.
+        draft_id가 있으면 서버에 저장된 분석 초안에서 문장/단어를 가져옵니다.
+        Idempotency-Key 헤더가 있으면 같은 키의 재시도에는 처음 응답을 그대로 돌려줍니다. (저장은 한 번만)
         """
-        serializer = CommitSelectionSerializer(data=request.data) # 형식 검증
+        user = request.user
+        idempotency_key = request.headers.get('Idempotency-Key')
+        fingerprint = request_fingerprint(request.data) if idempotency_key else None
+        if idempotency_key and len(idempotency_key) > 255:
+            return Response({'success': False, 'error': 'Idempotency-Key는 255자 이하여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+        if idempotency_key:
+            # 이미 처리된 재시도는 검증/저장 없이 조회 한 번으로 응답
+            try:
+                record = find_idempotent_response(user, self.idempotency_scope, idempotency_key, fingerprint)
+            except IdempotencyKeyConflict as e:
+                return Response({'success': False, 'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record:
+                return self._replay(record)
+
+        draft_id = request.data.get('draft_id')
+        if draft_id:
+            serializer = DraftCommitSelectionSerializer(data=request.data, context={'request': request})
+        else:
+            serializer = CommitSelectionSerializer(data=request.data) # 형식 검증
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data # 직렬화
         
-        user = request.user
-        
-        logger.info(f"data: {data}")
+        logger.debug(f"data: {data}")
         
         try:
-            now = timezone.now()
-            category, _ = Category.objects.get_or_create(
-                user=user, name=data['category'], language=data['language']
-            )
-            
-            wordbook = Wordbook.objects.create(
-                user=user,
-                name=data['name'],
-                category=category,
-                language=data['language'],
-                input_type=data['input_type'],  
-                created_at=now
-            )
-            
-            for sent in data['sentences']:
-                sentence = Sentence.objects.create(
-                    user=user,
-                    wordbook=wordbook,
-                    text=sent['text'],
-                    meaning=sent.get('meaning', ''),
-                    created_at=now
-                )
-                for word in sent['words']:
-                    word_obj, created = Word.objects.get_or_create(
-                        user=user,
-                        text=word['text'].lower(),
-                        defaults={
-                            'others': word.get('others', ''),
-                            'created_at': now
-                        }
-                    )
-                    
-                    # 기존 단어인 경우에도 others 필드 업데이트 (새로운 발음 정보가 있을 수 있음)
-                    if not created and word.get('others'):
-                        word_obj.others = word.get('others', '')
-                        word_obj.save()
-                    
-                    SentenceWord.objects.create(
-                        word=word_obj,
-                        sentence=sentence,
-                        meaning=word.get('meaning', ''),
-                        pos=word.get('pos', ''),
-                        memo=word.get('memo', ''),
-                    )
-                    
+            with transaction.atomic():
+                if idempotency_key:
+                    # 같은 키를 처리 중인 요청이 있으면 끝날 때까지 기다렸다가 그 응답을 사용
+                    try:
+                        record, claimed = claim_idempotency_key(user, self.idempotency_scope, idempotency_key, fingerprint)
+                    except IdempotencyKeyConflict as e:
+                        return Response({'success': False, 'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                    if not claimed:
+                        return self._replay(record)
+
+                # 문장/단어/연결을 한 트랜잭션에서 bulk INSERT (쿼리 수가 단어장 크기와 무관)
+                wordbook = save_wordbook(user, data)
+                body = {'success': True, 'wordbook_id': wordbook.id}
+                if idempotency_key:
+                    complete_idempotency_key(record, status.HTTP_201_CREATED, body)
         except IntegrityError as e:
             return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if draft_id:
+            delete_draft(draft_id)
             
-        return Response({'success': True, 'wordbook_id': wordbook.id}, status=status.HTTP_201_CREATED)
+        return Response(body, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _replay(record) -> Response:
+        response = Response(record.response_body, status=record.response_status)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+
+def _ndjson(payload: dict) -> str:
+    """NDJSON 한 줄"""
+    return json.dumps(payload, ensure_ascii=False, cls=DjangoJSONEncoder) + "\n"
+
+
+class WordbookImportView(APIView):
+    """
+    NDJSON 파일(한 줄에 문장 하나)로 새 단어장을 만드는 View (강의 단어장 등 대량 가져오기)
+    파일을 한 줄씩 읽어 검증하고, WORDBOOK_IMPORT_CHUNK_SIZE개씩 조각마다 한 트랜잭션으로 저장한다.
+    진행 상황은 NDJSON 스트리밍 응답으로 전달한다. (이미 저장된 조각은 중간에 연결이 끊겨도 남음)
+
+    응답 줄 (type 필드로 구분):
+    - start: {wordbook_id}
+    - error: {line, error} - 잘못된 줄 (건너뜀), line이 없으면 저장 중 오류로 가져오기 중단
+    - progress: {lines, imported, failed}
+    - complete: {wordbook_id, lines, imported, failed} - 가져온 문장이 없으면 단어장을 지우고 wordbook_id는 null
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="NDJSON 파일 (.ndjson, .jsonl)", type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('category', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('name', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('language', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('input_type', openapi.IN_FORM, type=openapi.TYPE_STRING, required=False),
+        ],
+        operation_summary="NDJSON 파일로 단어장 가져오기 (진행 상황 스트리밍)",
+        consumes=['multipart/form-data']
+    )
+    def post(self, request):
+        serializer = WordbookImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        user = request.user
+        wordbook = create_wordbook(user, data, timezone.now())
+        events = import_wordbook_lines(user, wordbook, iter_lines(data['file'].chunks()))
+        logger.info(f"단어장 가져오기 시작: {wordbook.id} ({data['file'].size} bytes)")
+
+        async def event_stream():
+            # 조각 저장은 DB 연결을 가진 동기 스레드에서 하나씩 진행
+            next_event = sync_to_async(next)
+            progress = {'lines': 0, 'imported': 0, 'failed': 0}
+            yield _ndjson({'type': 'start', 'wordbook_id': wordbook.id})
+
+            while True:
+                try:
+                    event = await next_event(events, None)
+                except Exception as e:
+                    logger.error(f"단어장 가져오기 오류: {wordbook.id} ({e})")
+                    yield _ndjson({'type': 'error', 'error': str(e), **progress})
+                    return
+                if event is None:
+                    break
+                if event['type'] == 'progress':
+                    progress = {key: event[key] for key in progress}
+                yield _ndjson(event)
+
+            wordbook_id = wordbook.id
+            if not progress['imported']:
+                await sync_to_async(wordbook.delete)()
+                wordbook_id = None
+            logger.info(f"단어장 가져오기 완료: {wordbook_id} ({progress})")
+            yield _ndjson({'type': 'complete', 'wordbook_id': wordbook_id, **progress})
+
+        response = StreamingHttpResponse(event_stream(), content_type='application/x-ndjson')
+        # nginx가 응답을 버퍼링하지 않고 진행 상황을 바로 전달하도록 설정
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+async def _aiter_text(chunks, size: int):
+    """동기 생성기(DB 서버 측 커서)에서 size개씩 모아 비동기로 전달 (ASGI가 응답 전체를 모으지 않도록)"""
+    take = sync_to_async(lambda: ''.join(islice(chunks, size)))
+    while True:
+        text = await take()
+        if not text:
+            break
+        yield text
+
+
+async def _aiter_file(fileobj, block_size: int = 64 * 1024):
+    """임시 파일을 블록 단위로 비동기 전달하고 다 보내면 닫음 (닫으면 지워짐)"""
+    read = sync_to_async(fileobj.read)
+    try:
+        while True:
+            block = await read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        fileobj.close()
+
+
+class WordbookExportView(APIView):
+    """
+    단어장(wordbook_id가 없으면 사용자의 모든 단어장)을 파일로 내보내는 View
+    문장/단어를 서버 측 커서로 조금씩 읽어서 바로 보내므로 단어장 크기와 관계없이 메모리 사용량이 일정하다.
+    - json: [{id, name, language, sentences: [{text, meaning, start_ms, end_ms, words: [...]}]}]
+    - csv: 문장-단어 한 쌍마다 한 줄
+    - ndjson: 한 줄에 문장 하나 (wordbooks/import/로 다시 가져올 수 있음)
+    - apkg: Anki 덱 패키지 (단어장마다 덱 하나, 디스크에서 만든 뒤 전송)
+    """
+    permission_classes = [IsAuthenticated]
+    # DRF가 format 쿼리 파라미터를 렌더러 선택에 쓰므로 file_format 사용
+    CONTENT_TYPES = {
+        'json': 'application/json; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+        'apkg': 'application/octet-stream',
+    }
+    CHUNK_WRITERS = {
+        'json': json_chunks,
+        'csv': csv_chunks,
+        'ndjson': ndjson_chunks,
+    }
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'file_format',
+                openapi.IN_QUERY,
+                description="내보낼 형식 (기본값 json)",
+                type=openapi.TYPE_STRING,
+                enum=['json', 'csv', 'ndjson', 'apkg'],
+                required=False
+            )
+        ],
+        operation_summary="단어장 내보내기 (JSON/CSV/NDJSON/Anki)"
+    )
+    def get(self, request, wordbook_id=None):
+        file_format = request.query_params.get('file_format', 'json')
+        if file_format not in self.CONTENT_TYPES:
+            return Response(
+                {'error': f"지원하지 않는 형식입니다. 지원 형식: {list(self.CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if wordbook_id is not None:
+            get_object_or_404(Wordbook, user=request.user, id=wordbook_id)
+
+        rows = export_rows(request.user, wordbook_id)
+        filename = f"wordbook-{wordbook_id}.{file_format}" if wordbook_id is not None else f"wordbooks.{file_format}"
+        logger.info(f"단어장 내보내기: user={request.user.id}, wordbook={wordbook_id}, format={file_format}")
+
+        if file_format == 'apkg':
+            package, notes = build_anki_package(rows)
+            logger.info(f"Anki 패키지 생성: 노트 {notes}개")
+            content = _aiter_file(package)
+        else:
+            content = _aiter_text(self.CHUNK_WRITERS[file_format](rows), settings.WORDBOOK_EXPORT_CHUNK_SIZE)
+
+        response = StreamingHttpResponse(content, content_type=self.CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class WordbookDetailView(APIView):
@@ -210,7 +409,9 @@ class WordbookDetailView(APIView):
     )
     def get(self, request, wordbook_id):
         logger.info(f"wordbook_id: {wordbook_id}")
-        wordbook = get_object_or_404(Wordbook, user=request.user, id=wordbook_id)
+        wordbook = get_object_or_404(
+            WordbookSerializer.setup_eager_loading(Wordbook.objects.all()), user=request.user, id=wordbook_id
+        )
         serializer = WordbookSerializer(wordbook)
         return Response(serializer.data)
     